@@ -1,59 +1,40 @@
-import re
+import os
 import sys
 import csv
-import matplotlib.pyplot as plt
-import numpy as np
+
+# Parsing is shared with the weather package next to the Flask app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "weather_app"))
+
+import weather
 
 """
-    Splits a weather forecast line into components using regex.
-    Returns a dictionary with the parsed date, condition, temperature, and wind information from each forecast line
-    Or None if the line format is not recognized.
+    Splits weather forecast lines into components using the weather package parser.
+    Returns a list of dictionaries with the parsed date, condition, temperature, wind and rain information,
+    one per recognized forecast line. Lines whose format is not recognized are skipped.
     """
-def split_weather_line(day_forecast):
-    lst = []
-    for line in lines:
-        # Regular expressions for each component
-        date_pattern = r"^Today|^Tonight|^\D{3} \d{1,2}"
-        condition_pattern = r"(Mostly Sunny|Sunny|Partly Cloudy|Mostly Cloudy|Scattered Showers|Few Showers|Showers|Light Rain|Rain and Snow|Rain|Snow)"
-        temp_pattern = r"\d{1,3}°/\d{1,3}°|--/\d{1,3}°"
-        wind_pattern = r"(?<=Wind)(\w{1,3}\d{1,2})mph"
+def split_weather_line(lines):
+    return weather.split_weather_line(lines)
 
-        # Extract components
-        try:
-            date_match = re.search(date_pattern, day_forecast)
-            condition_match = re.search(condition_pattern, day_forecast)
-            temp_match = re.search(temp_pattern, day_forecast)
-            wind_match = re.search(wind_pattern, day_forecast)
-    
-            dct = {}
-            dct["date"] = date_match.group(0) if date_match != None else None
-            dct["condition"] = condition_match.group(0) if condition_match != None else None
-            dct["temp"] = temp_match.group(0) if temp_match != None else None
-            dct["wind"] = wind_match.group(0) if wind_match != None else None
-          
-        except:
-            print("Error: split_weather_line()")
-            sys.exit()
-    return dct
-
-"""  
+"""
     Writes parsed weather data to a CSV file
     Writes weather data to a CSV file with separate temp columns
     """
-def write_weather_csv(weather_data, file_name):  
-    with open(file_name, 'w') as f:
-        f.write('date,condition,high_temp,low_temp,wind\n') # Header row
+def write_weather_csv(weather_data, file_name):
+    with open(file_name, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['date', 'condition', 'high_temp', 'low_temp', 'wind']) # Header row
         for day in weather_data:
-            high, low = day["temp"].split('/')
-            f.write(
-                f'{day["date"]},{day["condition"]},{high},{low},'
-                f'{day["wind"]}\n'
-            )
+            high = day["high_temp"] if day["high_temp"] is not None else "--"
+            writer.writerow([day["date"], day["condition"], high, day["low_temp"],
+                             f'{day["wind_direction"]}{day["wind_speed"]}'])
 
-"""  
+"""
     Generates matplotlib plots of temperature data stored in CSV file created with write_weather_csv()
     """
 def generate_weather_plot(csv_file):
+    import matplotlib.pyplot as plt
+    import numpy as np
+
     highs = []
     lows = []
     dates = []
@@ -63,7 +44,7 @@ def generate_weather_plot(csv_file):
         lines = f.readlines()
         reader = csv.reader([line.decode('utf-8', 'ignore') for line in lines])
         next(reader)
-        
+
         for row in reader:
             dates.append(row[0])
             try:
@@ -73,10 +54,10 @@ def generate_weather_plot(csv_file):
                 highs.append(None)
                 lows.append(None)
 
-    # Generate line graphs for temperature data and show plot        
+    # Generate line graphs for temperature data and show plot
     plt.plot(dates, highs, color='red')
     plt.plot(dates, lows, color='blue')
-    plt.plot(dates, highs, 'o', color='red', label='High') 
+    plt.plot(dates, highs, 'o', color='red', label='High')
     plt.plot(dates, lows, 'o', color='blue', label='Low')
     plt.legend()
     plt.ylim(0, 100)
@@ -85,14 +66,15 @@ def generate_weather_plot(csv_file):
     plt.title('Daily High and Low Temperatures')
     plt.tight_layout()
     plt.xticks(rotation=45)
-    plt.fill_between(dates, highs, lows, 
+    plt.fill_between(dates, highs, lows,
                     facecolor='plum', alpha=0.5)
 
     offset = 5
-    for i in range(len(dates)): 
+    for i in range(len(dates)):
+        if highs[i] is None:
+            continue
         plt.annotate(f"{highs[i]}°", xy = (dates[i],highs[i] + offset))
         plt.annotate(f"{lows[i]}°", xy = (dates[i],lows[i] - offset))
 
     plt.show()
     print('Graph generated with temperature axes fixes!')
-
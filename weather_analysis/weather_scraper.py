@@ -1,24 +1,9 @@
-import requests
-from bs4 import BeautifulSoup
-import re
 import sys
 import forecast_parser as fp
 from datetime import datetime
 
-def get_weather_forecast(zip_code):
-    url = f"https://weather.com/weather/tenday/l/{zip_code}"
-    response = requests.get(url)
-    response.raise_for_status()  # Raise an exception for bad status codes
-
-    soup = BeautifulSoup(response.content, "html.parser")
-
-    forecast_container = soup.find("div", class_=(re.compile("DailyForecast--DisclosureList")))
-
-    lst = []
-    for detail in forecast_container.find_all("details"):
-        lst.append(detail.find("div", class_=(re.compile("DetailsSummary"))).get_text(strip=True))
-
-    return lst
+# Fetching and extraction are shared with the weather package next to the Flask app, which forecast_parser puts on the path
+from weather.forecast import get_weather_forecast
 
 if __name__ == "__main__":
     zip_code = input("Enter 5-digit zip code: ")
@@ -26,14 +11,11 @@ if __name__ == "__main__":
     try:
         forecasts = get_weather_forecast(zip_code)
 
-        # Append parsed forecast data to a list
-        parsed_list = []
-        for forecast in forecasts: 
-            parsed_data = fp.split_weather_line(forecast)
-            parsed_list.append(parsed_data)
+        # Parse every forecast line at once; unrecognized lines are skipped
+        parsed_list = fp.split_weather_line(forecasts)
 
         #Store data in a custom CSV file
-        file_name = f"weather_{zip_code}_{today.strftime("%m%d%Y")}.csv"
+        file_name = f"weather_{zip_code}_{today.strftime('%m%d%Y')}.csv"
         fp.write_weather_csv(parsed_list, file_name)
         print(f"Forecast data stored to {file_name}")
     except:
@@ -1,24 +1,202 @@
-from flask import Flask, render_template, request
-from weather import get_weather_data
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Flask, render_template, request, jsonify, send_from_directory, url_for, abort
+from weather import get_weather_data, validate_zip_code, DEFAULT_MAX_WORKERS, FORECAST_URL, Pipeline, HttpFetcher, create_session
+from weather.cache import ForecastCache, MemoryBackend, SqliteBackend, DEFAULT_TTL
+from weather.refresher import BackgroundRefresher, DEFAULT_HOT_WINDOW
+from weather.scheduler import PollingScheduler, DEFAULT_RPS
+from weather.plots import PlotCache
+from weather.encoding import choose_encoding, compress_response, compress_stream
+from weather.locations import LocationMap
+from weather.queues import open_queue
+from weather.coordinator import progress
+from weather.metrics import REGISTRY
 
 app = Flask(__name__)
 
+# Forecasts are fetched, cached and polled per weather.com location, so neighboring ZIP codes share one entry.
+# Persist learned locations with WEATHER_LOCATIONS_PATH and preload an offline table with WEATHER_LOCATIONS_TABLE.
+locations = LocationMap(os.environ.get('WEATHER_LOCATIONS_PATH'))
+if os.environ.get('WEATHER_LOCATIONS_TABLE'):
+    locations.load_table(os.environ['WEATHER_LOCATIONS_TABLE'])
+
+# Every upstream request of this process reuses one pooled keep-alive session.
+# WEATHER_FORECAST_URL points the app at another forecast server, such as the offline stub server.
+session = create_session(DEFAULT_MAX_WORKERS)
+fetcher = HttpFetcher(session, os.environ.get('WEATHER_FORECAST_URL', FORECAST_URL))
+
+# Share the cache between gunicorn workers by pointing WEATHER_CACHE_PATH at a SQLite file
+cache_path = os.environ.get('WEATHER_CACHE_PATH')
+forecast_cache = ForecastCache(
+    Pipeline(fetcher, locations=locations).parse,
+    backend=SqliteBackend(cache_path) if cache_path else MemoryBackend(),
+    ttl=int(os.environ.get('WEATHER_CACHE_TTL', DEFAULT_TTL)),
+)
+
+# Serve cached forecasts immediately, re-scraping hot entries in the background when they near their TTL
+refresher = BackgroundRefresher(forecast_cache)
+
+# Requested ZIP codes are re-polled in the background, volatile and popular ones more often, within WEATHER_POLL_RPS.
+# Steady ZIP codes are polled just before the refresher would consider them due, so their reads never go stale.
+poller = PollingScheduler(
+    forecast_cache.refresh,
+    rps=float(os.environ.get('WEATHER_POLL_RPS', DEFAULT_RPS)),
+    base_interval=max(forecast_cache.ttl - refresher.refresh_margin, 1),
+    forget_after=DEFAULT_HOT_WINDOW,
+)
+
+# The background threads start with the first request rather than on import,
+# so importing the app (tests, tooling, a preloading gunicorn master) never polls upstream
+background_lock = threading.Lock()
+background_started = False
+
+@app.before_request
+def start_background():
+    global background_started
+    if background_started:
+        return
+    with background_lock:
+        if not background_started:
+            refresher.start()
+            poller.start()
+            background_started = True
+
+# Rendered plots are content-addressed, so browsers may cache them indefinitely
+plot_cache = PlotCache(os.environ.get('WEATHER_PLOT_DIR', os.path.join(app.instance_path, 'plots')))
+PLOT_MAX_AGE = 31536000
+
+# Point WEATHER_SWEEP_QUEUE at the queue of a distributed sweep to follow its progress at /sweep/progress
+sweep_queue = open_queue(os.environ['WEATHER_SWEEP_QUEUE']) if os.environ.get('WEATHER_SWEEP_QUEUE') else None
+
+def cache_hit_ratio():
+    lookups = forecast_cache.hits + forecast_cache.misses
+    return forecast_cache.hits / lookups if lookups else 0.0
+
+REGISTRY.gauge("weather_cache_hits", "Forecast cache hits since startup.", lambda: forecast_cache.hits)
+REGISTRY.gauge("weather_cache_misses", "Forecast cache misses since startup.", lambda: forecast_cache.misses)
+REGISTRY.gauge("weather_cache_hit_ratio", "Fraction of forecast cache lookups served from the cache.", cache_hit_ratio)
+REGISTRY.gauge("weather_cache_entries", "Forecasts currently held in the cache.", lambda: len(forecast_cache.backend))
+
+MAX_BULK_ZIPS = 100
+INVALID_ZIP_ERROR = "Invalid ZIP code format. Please provide a 5-digit ZIP code."
+FETCH_ERROR = "An error occurred while fetching the weather data."
+
+def forecast_payload(zip_code, df):
+    """
+    Serializes a forecast DataFrame as compact JSON: column names once, then one array of values per day.
+    """
+    payload = {
+        "zip_code": zip_code,
+        "columns": list(df.columns),
+        "data": json.loads(df.to_json(orient='values')),
+    }
+    return json.dumps(payload, separators=(',', ':'))
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
         zip_code = request.form['zip_code']
-        # df, plot_url = get_weather_data(zip_code)
-        df = get_weather_data(zip_code)
+        key = locations.resolve(zip_code)
+        df = get_weather_data(key, cache=refresher)
 
         if df is not None:
+            poller.record_request(key)
+            age = refresher.age(key)
             return render_template('result.html', 
                                    data=df.to_html(classes='table table-striped', index=False),
-                                #    plot_url=plot_url,
-                                   zip_code=zip_code)
+                                   plot_url=url_for('plot', plot_hash=plot_cache.get_or_render(df)),
+                                   zip_code=zip_code,
+                                   stale=refresher.is_stale(key),
+                                   age_minutes=int(age // 60) if age is not None else 0)
         else:
             return render_template('index.html', error="An error occurred while fetching the weather data.")
     
     return render_template('index.html')
 
+@app.route('/plot/<plot_hash>.png')
+def plot(plot_hash):
+    if not plot_hash.isalnum():
+        abort(404)
+    response = send_from_directory(plot_cache.directory, f'{plot_hash}.png', max_age=PLOT_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/api/forecast/<zip_code>')
+def api_forecast(zip_code):
+    if not validate_zip_code(zip_code):
+        return jsonify(error=INVALID_ZIP_ERROR), 400
+
+    key = locations.resolve(zip_code)
+    df = get_weather_data(key, cache=refresher)
+    if df is None:
+        return jsonify(error=FETCH_ERROR), 502
+    poller.record_request(key)
+
+    response = app.response_class(forecast_payload(zip_code, df), mimetype='application/json')
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest()[:32], weak=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = max(0, int(forecast_cache.ttl - (refresher.age(key) or 0)))
+    response.make_conditional(request)
+    return compress_response(response, request.accept_encodings)
+
+@app.route('/api/forecasts')
+def api_forecasts():
+    zip_codes = list(dict.fromkeys(z.strip() for z in request.args.get('zips', '').split(',') if z.strip()))
+    if not zip_codes or not all(validate_zip_code(z) for z in zip_codes):
+        return jsonify(error=INVALID_ZIP_ERROR), 400
+    if len(zip_codes) > MAX_BULK_ZIPS:
+        return jsonify(error=f"At most {MAX_BULK_ZIPS} ZIP codes may be requested at once."), 400
+
+    # Each ZIP code is written as its own NDJSON line as soon as its location finishes, not after the slowest one
+    groups = locations.plan(zip_codes)
+
+    def generate():
+        with ThreadPoolExecutor(max_workers=min(len(groups), DEFAULT_MAX_WORKERS)) as executor:
+            futures = {executor.submit(get_weather_data, key, refresher): key for key in groups}
+            for future in as_completed(futures):
+                key = futures[future]
+                df = future.result()
+                if df is not None:
+                    poller.record_request(key)
+                for zip_code in groups[key]:
+                    if df is None:
+                        line = json.dumps({"zip_code": zip_code, "error": FETCH_ERROR}, separators=(',', ':'))
+                    else:
+                        line = forecast_payload(zip_code, df)
+                    yield (line + '\n').encode()
+
+    encoding = choose_encoding(request.accept_encodings)
+    response = app.response_class(compress_stream(generate(), encoding), mimetype='application/x-ndjson')
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = True
+    return response
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(forecast_cache.stats())
+
+@app.route('/poller/stats')
+def poller_stats():
+    return jsonify(poller.stats())
+
+@app.route('/locations/stats')
+def locations_stats():
+    return jsonify(locations.stats())
+
+@app.route('/sweep/progress')
+def sweep_progress():
+    if sweep_queue is None:
+        abort(404)
+    return jsonify(progress(sweep_queue))
+
+@app.route('/metrics')
+def metrics():
+    return app.response_class(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(debug=True)
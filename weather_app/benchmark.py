@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+'''
+Offline benchmark of the fetch/parse/plot pipeline against the recorded fixture corpus.
+Times each stage separately (fetch, every extraction backend, `split_weather_line()`, DataFrame construction,
+`analyze_weather_data()`, multi-ZIP grouped analytics, forecast verification and plot rendering), reports throughput and peak memory, and flags regressions
+against a stored baseline. Fetches go to a local stub server, never to weather.com. Without a baseline to compare
+against the run fails, unless it saves one or is allowed to run without one.
+
+Usage: python benchmark.py [--save-baseline | --allow-missing-baseline] [--baseline PATH] [--tolerance 0.2]
+
+'''
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from weather.analytics import grouped_stats, grouped_correlations, RunningStats
+from weather.extractors import EXTRACTORS, compare_backends
+from weather.resilience import ResilientFetcher
+from weather.verification import verify
+from stub_server import StubServer, load_corpus, load_expected
+from weather import (get_weather_forecasts, split_weather_line, parse_forecasts_frame,
+                     analyze_weather_data, plot_weather_data)
+
+# Throughput depends on the machine, so the baseline is local and ignored by git
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Live weather.com ten day pages are roughly 1 MB, almost all of it outside the forecast container
+PAGE_PADDING_BYTES = 900_000
+DEFAULT_TOLERANCE = 0.2
+
+def measure(func, units, min_time=1.0):
+    """
+    Calls `func` repeatedly for at least `min_time` seconds, then once more under tracemalloc.
+
+    Args:
+        func (callable): Stage to benchmark, taking no arguments.
+        units (int): Work units (pages, lines, rows, ...) processed per call.
+        min_time (float): Minimum seconds to spend timing.
+
+    Returns:
+        result (dict): "throughput" in units per second and "peak_kib" of traced memory for one call.
+    """
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"throughput": calls * units / elapsed, "peak_kib": peak / 1024}
+
+def run_benchmarks(min_time=1.0):
+    """
+    Returns:
+        results (dict): Mapping of stage name to its `measure()` result and unit.
+    """
+    import pandas as pd
+
+    pages = load_corpus(PAGE_PADDING_BYTES)
+    expected = load_expected()
+    mismatches = compare_backends(load_corpus())
+    if mismatches:
+        raise AssertionError(f"Extraction backends disagree with html.parser: {mismatches}")
+
+    page_list = list(pages.values())
+    lines = [line for name in pages for line in expected[name]["forecasts"]]
+    parsed = split_weather_line(lines)
+    df = pd.DataFrame(expected["tenday_typical"]["parsed"])
+
+    results = {}
+    with StubServer(pages) as stub:
+        zip_codes = [f"{i:05d}" for i in range(10000, 10064)]
+        # No rate limit, so the stage measures the pipeline rather than the upstream request budget
+        upstream = ResilientFetcher(rate=None)
+        results["fetch"] = dict(measure(lambda: get_weather_forecasts(zip_codes, url_template=stub.url_template, upstream=upstream), len(zip_codes), min_time), unit="pages/s")
+
+    for name, extractor in EXTRACTORS.items():
+        try:
+            extractor(page_list[0])
+        except ImportError:
+            continue
+        results[f"extract:{name}"] = dict(measure(lambda: [extractor(page) for page in page_list], len(page_list), min_time), unit="pages/s")
+
+    batch = lines * 100
+    results["split_weather_line"] = dict(measure(lambda: split_weather_line(batch), len(batch), min_time), unit="lines/s")
+    results["dataframe"] = dict(measure(lambda: pd.DataFrame(split_weather_line(batch)), len(batch), min_time), unit="lines/s")
+    results["parse_forecasts_frame"] = dict(measure(lambda: parse_forecasts_frame(batch), len(batch), min_time), unit="lines/s")
+
+    def analyze():
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyze_weather_data(df)
+    results["analyze_weather_data"] = dict(measure(analyze, 1, min_time), unit="frames/s")
+
+    # One long frame of 1000 ZIP codes, as a regional sweep produces
+    sweep = {f"{i:05d}": expected[name]["parsed"] for i, name in zip(range(10000, 11000), sorted(pages) * 1000)}
+    long_df = pd.DataFrame([dict(weather_data, zip_code=zip_code) for zip_code, parsed_forecasts in sweep.items() for weather_data in parsed_forecasts])
+    long_df["zip_code"] = long_df["zip_code"].astype("category")
+    results["grouped_analytics"] = dict(measure(lambda: (grouped_stats(long_df), grouped_correlations(long_df)), len(long_df), min_time), unit="rows/s")
+    results["running_stats"] = dict(measure(lambda: RunningStats().update(long_df), len(long_df), min_time), unit="rows/s")
+
+    # A month of daily sweeps, relabelled with the dates each scrape day would have shown
+    history = pd.concat([long_df.assign(scrape_time=pd.Timestamp(2026, 1, 1, 9) + pd.Timedelta(days=day)) for day in range(30)], ignore_index=True)
+    lead = history.groupby(["zip_code", "scrape_time"], observed=True).cumcount()
+    labels = (history["scrape_time"].dt.normalize() + pd.to_timedelta(lead, unit="D")).dt.strftime("%a %d")
+    history["date"] = labels.mask(lead == 0, "Today").astype("category")
+    results["verification"] = dict(measure(lambda: verify(history, by="zip3"), len(history), min_time), unit="rows/s")
+    results["plot"] = dict(measure(lambda: plot_weather_data(df), 1, min_time), unit="plots/s")
+
+    assert len(parsed) == sum(len(expected[name]["parsed"]) for name in pages)
+    return results
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Returns:
+        regressions (list): Stage names whose throughput fell more than `tolerance` below the baseline.
+    """
+    return [
+        stage for stage, result in results.items()
+        if stage in baseline and result["throughput"] < baseline[stage]["throughput"] * (1 - tolerance)
+    ]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the weather pipeline on the offline fixture corpus.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help=f"Baseline file to compare against and save to (default: {os.path.basename(BASELINE_PATH)}, not tracked by git)")
+    parser.add_argument("--allow-missing-baseline", action="store_true", help="Only report throughput when there is no baseline, instead of failing")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed throughput drop before a stage counts as regressed")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds to time each stage for")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.min_time)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if not baseline and not args.save_baseline:
+        print(f"WARNING: no baseline at {args.baseline}, so no stage was checked for regressions. "
+              "Run with --save-baseline on a known good commit first.", file=sys.stderr)
+    unchecked = [stage for stage in results if baseline and stage not in baseline]
+    if unchecked and not args.save_baseline:
+        print(f"WARNING: no baseline for {', '.join(unchecked)}; re-save the baseline to check them.", file=sys.stderr)
+
+    regressions = compare(results, baseline, args.tolerance)
+    for stage, result in results.items():
+        change = ""
+        if stage in baseline:
+            change = f"{result['throughput'] / baseline[stage]['throughput'] - 1:+.0%}"
+        flag = "  REGRESSION" if stage in regressions else ""
+        print(f"{stage:<24} {result['throughput']:>12,.1f} {result['unit']:<9} peak {result['peak_kib']:>9,.0f} KiB  {change}{flag}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    if args.save_baseline:
+        sys.exit(0)
+    if not baseline and not args.allow_missing_baseline:
+        sys.exit(2)
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
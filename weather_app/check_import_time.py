@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+'''
+Import-time regression check for the short-lived scraping entry points.
+Imports each module in a fresh interpreter under `python -X importtime`, fails if its median cumulative
+import time exceeds the budget, or if it pulls in a heavy dependency that should only load on demand.
+
+Usage: python check_import_time.py [--runs N]
+
+'''
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Cumulative import time budget in milliseconds, per module
+IMPORT_BUDGETS_MS = {
+    "weather": 60,
+    "weather.line_parser": 20,
+    "weather.extractors": 30,
+    "weather_farm": 100,
+    "weather_sweep": 100,
+}
+
+# Dependencies that must stay lazy: importing the module alone should never load them
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib", "bs4", "requests"]
+
+def measure_import(module, runs=5):
+    """
+    Imports `module` in `runs` fresh interpreters.
+
+    Args:
+        module (str): Module name importable from this directory.
+        runs (int): Number of interpreters to start.
+
+    Returns:
+        tuple: (median_ms, loaded_heavy) with the median cumulative import time in milliseconds
+        and the heavy modules the import pulled in.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    check = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    timings = []
+    loaded_heavy = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", check],
+            cwd=here, capture_output=True, text=True, check=True,
+        )
+        # Lines look like "import time:   self [us] | cumulative | imported package"
+        for line in result.stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == module:
+                timings.append(int(fields[1]) / 1000)
+        loaded_heavy = [name for name in result.stdout.strip().split(",") if name]
+    return statistics.median(timings), loaded_heavy
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check import time budgets of the weather modules.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        median_ms, loaded_heavy = measure_import(module, args.runs)
+        status = "ok"
+        if median_ms > budget:
+            status = "OVER BUDGET"
+            failed = True
+        if loaded_heavy:
+            status = f"LOADS {', '.join(loaded_heavy)}"
+            failed = True
+        print(f"{module:<20} {median_ms:7.1f} ms / {budget} ms  {status}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+'''
+Local stand-in for weather.com used by the benchmarks and for offline runs.
+Serves the recorded ten day pages in `fixtures/` over HTTP/1.1 keep-alive, picking a page per ZIP code.
+Each page's canonical link names its fixture as the location key, as weather.com names the forecast location.
+`FaultInjectingHandler` additionally throttles, errors and stalls a share of requests to exercise the resilience layer.
+
+'''
+
+import glob
+import http.server
+import json
+import os
+import random
+import threading
+import time
+import zlib
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def load_corpus(padding=0):
+    """
+    Loads every recorded page in the fixture directory.
+
+    Args:
+        padding (int): Bytes of inert script to add to each page's head, so pages approach the ~1 MB size of live weather.com pages.
+
+    Returns:
+        pages (dict): Mapping of fixture name to raw HTML bytes.
+    """
+    filler = f"<script>/*{'x' * padding}*/</script></head>".encode() if padding else b"</head>"
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            pages[os.path.basename(path)[:-len(".html")]] = f.read().replace(b"</head>", filler, 1)
+    return pages
+
+def load_expected():
+    """
+    Returns:
+        expected (dict): Mapping of fixture name to its reference "forecasts" strings and "parsed" dictionaries.
+    """
+    with open(os.path.join(FIXTURE_DIR, "expected.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        key = self.path.rstrip("/").rsplit("/", 1)[-1]
+        pages = self.server.pages
+        # A page name is served as a location key; any other key (a ZIP code) is assigned a page by its hash
+        name = key if key in pages else sorted(pages)[zlib.crc32(key.encode()) % len(pages)]
+        canonical = f'<head><link rel="canonical" href="/weather/tenday/l/{name}"/>'.encode()
+        body = pages[name].replace(b"<head>", canonical, 1)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up, e.g. after its read timeout
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+class FaultInjectingHandler(StubHandler):
+    """
+    Fails a share of requests according to `server.faults`, a dict with keys:
+    "error_rate" (share answered with "status", default 503), "retry_after" (optional header value),
+    "delay_rate" (share that sleeps "delay" seconds before answering) and "down" (fail every request).
+    """
+
+    def do_GET(self):
+        faults = self.server.faults
+        self.server.requests += 1
+        if random.random() < faults.get("delay_rate", 0):
+            time.sleep(faults.get("delay", 0))
+        if faults.get("down") or random.random() < faults.get("error_rate", 0):
+            body = b"Service Unavailable"
+            self.send_response(faults.get("status", 503))
+            if faults.get("retry_after") is not None:
+                self.send_header("Retry-After", str(faults["retry_after"]))
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        super().do_GET()
+
+class StubServer:
+    """
+    Runs a threaded HTTP server on a free local port in a background thread. Usable as a context manager.
+    """
+
+    def __init__(self, pages=None, handler=StubHandler, faults=None):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.server.pages = pages if pages is not None else load_corpus()
+        self.server.faults = faults if faults is not None else {}
+        self.server.requests = 0
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url_template(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/weather/tenday/l/{{zip_code}}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# The weather package and the stub server live next to this directory rather than in an installed distribution
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer, FaultInjectingHandler, load_corpus, load_expected
+
+@pytest.fixture(scope="session")
+def expected():
+    return load_expected()
+
+@pytest.fixture
+def stub():
+    with StubServer() as server:
+        yield server
+
+@pytest.fixture
+def faulty_stub():
+    with StubServer(handler=FaultInjectingHandler) as server:
+        yield server
+
+def page_name(zip_code):
+    """
+    Returns:
+        name (str): Fixture the stub server serves for `zip_code`.
+    """
+    import zlib
+
+    pages = sorted(load_corpus())
+    return pages[zlib.crc32(zip_code.encode()) % len(pages)]
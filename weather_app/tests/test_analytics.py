@@ -0,0 +1,39 @@
+import pandas as pd
+
+import pytest
+
+from weather.analytics import RunningStats, grouped_correlations, grouped_stats
+from weather.records import ForecastBatch
+
+from conftest import page_name
+
+def forecasts(expected, zip_codes):
+    return {zip_code: expected[page_name(zip_code)]["parsed"] for zip_code in zip_codes}
+
+def test_rollup_accepts_later_updates(expected):
+    first = forecasts(expected, ["10001", "10002", "20002"])
+    later = forecasts(expected, ["10003", "30003"])
+    stats = RunningStats()
+    stats.update(first)
+
+    regional = stats.rollup(digits=2)
+    regional.update(later)
+
+    combined = RunningStats("zip2")
+    combined.update({**first, **later})
+    assert regional.rows == combined.rows
+    pd.testing.assert_frame_equal(regional.stats(), combined.stats())
+
+@pytest.mark.parametrize("by", ["zip_code", "condition", ["zip_code", "condition"], "zip3"])
+def test_updates_match_one_pass_over_all_rows(expected, by):
+    # Later batches add ZIP codes that sort before earlier ones, and revisit earlier ZIP codes
+    batches = [forecasts(expected, ["30003"]), forecasts(expected, ["20002", "10001"]), forecasts(expected, ["00004", "30003"])]
+    stats = RunningStats(by)
+    for batch in batches:
+        stats.update(batch)
+
+    frame = pd.concat([ForecastBatch.from_forecasts(batch).to_frame() for batch in batches], ignore_index=True)
+    # ZIP codes categorized in first-seen order, as one batch holding every row would have them
+    frame["zip_code"] = frame["zip_code"].astype(str).astype(pd.CategoricalDtype(list(dict.fromkeys(frame["zip_code"].astype(str)))))
+    pd.testing.assert_frame_equal(stats.stats(), grouped_stats(frame, by))
+    pd.testing.assert_frame_equal(stats.correlations(), grouped_correlations(frame, by))
@@ -0,0 +1,114 @@
+import importlib
+import os
+
+import pytest
+
+@pytest.fixture
+def app_module(stub, tmp_path, monkeypatch):
+    monkeypatch.setenv("WEATHER_FORECAST_URL", stub.url_template)
+    monkeypatch.setenv("WEATHER_PLOT_DIR", str(tmp_path / "plots"))
+    import app as app_module
+    app_module = importlib.reload(app_module)
+    yield app_module
+    app_module.poller.stop()
+    app_module.refresher.stop()
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+def test_background_threads_start_with_the_first_request(app_module, client):
+    assert app_module.poller._thread is None
+    assert app_module.refresher._thread is None
+    assert app_module.poller.base_interval < app_module.forecast_cache.ttl
+
+    client.get("/cache/stats")
+    assert app_module.poller._thread.is_alive()
+    assert app_module.refresher._thread.is_alive()
+
+def plot_url(response):
+    import re
+
+    return re.search(r'<img src="([^"]+)" alt="Temperature Plot">', response.get_data(as_text=True)).group(1)
+
+def test_plot_is_content_addressed_and_rendered_once(app_module, client, monkeypatch):
+    import weather.plots
+    from weather.plots import plot_hash
+
+    renders = []
+    plot_weather_data = weather.plots.plot_weather_data
+    monkeypatch.setattr(weather.plots, "plot_weather_data", lambda df: renders.append(df) or plot_weather_data(df))
+
+    url = plot_url(client.post("/", data={"zip_code": "10001"}))
+    assert url == f"/plot/{plot_hash(renders[0])}.png"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert response.get_data().startswith(b"\x89PNG")
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == app_module.PLOT_MAX_AGE
+
+    # The same forecast reuses the rendered file
+    assert plot_url(client.post("/", data={"zip_code": "10001"})) == url
+    assert len(renders) == 1
+    assert os.listdir(app_module.plot_cache.directory) == [url.rsplit("/", 1)[1]]
+
+    assert client.get("/plot/0123456789abcdef.png").status_code == 404
+    assert client.get("/plot/..%2Fapp.png").status_code == 404
+
+def test_api_forecast_json(app_module, client, expected):
+    from conftest import page_name
+
+    response = client.get("/api/forecast/10001")
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+    payload = response.get_json()
+    assert set(payload) == {"zip_code", "columns", "data"}
+    assert payload["zip_code"] == "10001"
+    assert payload["columns"][:2] == ["date", "condition"]
+    days = [dict(zip(payload["columns"], row)) for row in payload["data"]]
+    assert [day["date"] for day in days] == [day["date"] for day in expected[page_name("10001")]["parsed"]]
+
+    # Unchanged forecasts revalidate without a body
+    assert client.get("/api/forecast/10001", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+@pytest.mark.parametrize("zip_code", ["1234", "123456", "abcde"])
+def test_api_forecast_rejects_bad_zip(client, zip_code):
+    response = client.get(f"/api/forecast/{zip_code}")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid ZIP code format. Please provide a 5-digit ZIP code."}
+
+def test_api_forecasts_streams_ndjson(client):
+    import json
+
+    response = client.get("/api/forecasts?zips=10001,20002,10001,30003")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.is_streamed
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    # Duplicates are answered once, in completion order
+    assert sorted(line["zip_code"] for line in lines) == ["10001", "20002", "30003"]
+    assert all(set(line) == {"zip_code", "columns", "data"} for line in lines)
+
+@pytest.mark.parametrize("query", ["", "?zips=", "?zips=10001,abcde", "?zips=" + ",".join(f"{n:05d}" for n in range(101))])
+def test_api_forecasts_rejects_bad_requests(client, query):
+    response = client.get(f"/api/forecasts{query}")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+def test_metrics_endpoint(app_module, client):
+    client.get("/api/forecast/10001")
+    client.get("/api/forecast/10001")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert "# TYPE weather_cache_hit_ratio gauge" in text
+    samples = dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+    stats = app_module.forecast_cache.stats()
+    assert float(samples["weather_cache_hits"]) == stats["hits"]
+    assert float(samples["weather_cache_misses"]) == stats["misses"] > 0
+    assert float(samples["weather_cache_entries"]) == stats["entries"] > 0
+    assert 'weather_upstream_responses_total{status="200"}' in samples
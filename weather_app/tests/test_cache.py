@@ -0,0 +1,65 @@
+import threading
+import time
+
+from weather.cache import ForecastCache, SqliteBackend
+
+class CountingLoader:
+    """
+    Loader that counts its calls and can be held until `release` is set.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, key):
+        self.calls += 1
+        self.release.wait()
+        return f"forecast for {key}"
+
+def test_refresh_after_a_finished_load_uses_the_stored_value():
+    loader = CountingLoader()
+    cache = ForecastCache(loader, ttl=60)
+    assert cache.get("10001") == "forecast for 10001"
+
+    # A caller that missed before the first load finished arrives once it left `_inflight`
+    assert cache.refresh("10001", max_age=cache.ttl) == "forecast for 10001"
+    assert loader.calls == 1
+
+    # Without max_age the loader always runs
+    cache.refresh("10001")
+    assert loader.calls == 2
+
+def test_concurrent_misses_load_once():
+    loader = CountingLoader()
+    loader.release.clear()
+    cache = ForecastCache(loader, ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("10001"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    loader.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["forecast for 10001"] * 8
+    assert loader.calls == 1
+
+def test_sqlite_hits_do_not_write_but_still_count_for_eviction(tmp_path):
+    backend = SqliteBackend(str(tmp_path / "cache.db"), max_entries=2)
+    backend.set("10001", ["a"], time.time())
+    time.sleep(0.01)
+    backend.set("20002", ["b"], time.time())
+    time.sleep(0.01)
+
+    conn = backend._connect()
+    changes = conn.total_changes
+    assert backend.get("10001")[0] == ["a"]
+    assert conn.total_changes == changes
+
+    # 10001 was read after 20002 was stored, so 20002 is the least recently used entry
+    backend.set("30003", ["c"], time.time())
+    assert backend.get("20002") is None
+    assert backend.get("10001") is not None and backend.get("30003") is not None
+    assert backend.evictions == 1
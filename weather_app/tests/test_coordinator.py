@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+from weather.coordinator import plan_units, sweep_worker, drain
+from weather.cube import ForecastCube
+from weather.queues import SqliteQueue
+
+ZIP_CODES = ["10001", "20002", "30003", "40004", "50005", "60006"]
+
+def complete_units(work_queue, results):
+    """
+    Leases every unit and completes them in the order of `results`, a list of (scrape_time, parsed) pairs.
+    """
+    leases = [work_queue.lease("worker") for _ in results]
+    for lease, (scrape_time, parsed) in zip(leases, results):
+        assert work_queue.complete(lease, "worker", {"scrape_time": scrape_time.isoformat(timespec="seconds"),
+                                                     "parsed": parsed, "errors": {}})
+
+def test_sweep_worker_outage_does_not_complete_units(faulty_stub, tmp_path):
+    work_queue = SqliteQueue(str(tmp_path / "queue.db"), max_attempts=2)
+    work_queue.enqueue(plan_units(ZIP_CODES, unit_size=2))
+    faulty_stub.server.faults["down"] = True
+
+    completed = sweep_worker(work_queue, url_template=faulty_stub.url_template, rate=0, threads=2, poll_interval=0)
+
+    assert completed == 0
+    counts = work_queue.counts()
+    assert counts["done"] == 0 and counts["pending"] == 0 and counts["leased"] == 0
+    assert counts["dead"] == 3
+    assert all("ZIP codes failed" in error for error in work_queue.failures().values())
+
+def test_sweep_worker_completes_units(stub, tmp_path):
+    work_queue = SqliteQueue(str(tmp_path / "queue.db"))
+    work_queue.enqueue(plan_units(ZIP_CODES, unit_size=2))
+
+    completed = sweep_worker(work_queue, url_template=stub.url_template, rate=0, threads=2, poll_interval=0)
+
+    assert completed == 3
+    assert work_queue.counts()["done"] == 3
+
+def test_drain_writes_out_of_order_results_into_cube(expected, tmp_path):
+    forecasts = next(iter(expected.values()))["parsed"]
+    work_queue = SqliteQueue(str(tmp_path / "queue.db"))
+    work_queue.enqueue(plan_units(ZIP_CODES[:3], unit_size=1))
+    now = datetime(2026, 10, 18, 12)
+    # The newest scrape completes first and fixes the cube origin; the older ones arrive in later batches
+    complete_units(work_queue, [
+        (now, {"10001": forecasts}),
+        (now - timedelta(days=1), {"20002": forecasts}),
+        (now - timedelta(days=2), {"30003": forecasts}),
+    ])
+
+    with ForecastCube(str(tmp_path / "cube")) as cube:
+        written, errors = drain(work_queue, cube, batch_size=1)
+        assert (written, errors) == (3, {})
+        assert cube.origin == now - timedelta(days=2)
+        for days_ago, zip_code in enumerate(["10001", "20002", "30003"]):
+            issue = cube.issue_index(now - timedelta(days=days_ago))
+            assert cube.select("present", zip_code, lead_day=0)[issue]
+            assert cube.select("high_temp", zip_code, lead_day=0)[issue] == forecasts[0]["high_temp"]
+    assert work_queue.counts()["written"] == 3
+
+class RejectingSink:
+    """
+    Sink that raises on one ZIP code and keeps the rest.
+    """
+
+    def __init__(self, bad_zip_code):
+        self.bad_zip_code = bad_zip_code
+        self.rows = {}
+
+    def append(self, zip_code, parsed_forecasts, scrape_time=None):
+        if zip_code == self.bad_zip_code:
+            raise ValueError(f"cannot store {zip_code}")
+        self.rows[zip_code] = parsed_forecasts
+
+    def flush(self):
+        pass
+
+def test_drain_gives_up_units_the_sink_rejects(expected, tmp_path):
+    forecasts = next(iter(expected.values()))["parsed"]
+    work_queue = SqliteQueue(str(tmp_path / "queue.db"))
+    work_queue.enqueue(plan_units(ZIP_CODES[:3], unit_size=1))
+    now = datetime(2026, 10, 18, 12)
+    complete_units(work_queue, [(now, {zip_code: forecasts}) for zip_code in ZIP_CODES[:3]])
+
+    sink = RejectingSink("20002")
+    written, errors = drain(work_queue, sink)
+
+    assert written == 2 and set(sink.rows) == {"10001", "30003"}
+    assert errors == {"sweep-000001": "ValueError: cannot store 20002"}
+    counts = work_queue.counts()
+    assert counts["written"] == 2 and counts["dead"] == 1 and counts["done"] == 0
+    assert work_queue.failures() == errors
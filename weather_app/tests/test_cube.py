@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from weather.cube import ForecastCube
+from weather.records import MISSING_TEMP
+
+from conftest import page_name
+
+T0 = datetime(2026, 10, 18, 7)
+SLOT = timedelta(hours=6)
+ZIP_CODES = ["10001", "20002", "30003"]
+
+@pytest.fixture
+def scrapes(expected):
+    # Two days of six hour scrapes of each ZIP code, with the high temperature of the first day marking the slot
+    scrapes = []
+    for slot in range(8):
+        for zip_code in ZIP_CODES:
+            parsed_forecasts = [dict(day) for day in expected[page_name(zip_code)]["parsed"]]
+            parsed_forecasts[0]["high_temp"] = slot
+            scrapes.append((zip_code, parsed_forecasts, T0 + slot * SLOT))
+    return scrapes
+
+def test_slices_are_views_of_the_stored_scrapes(tmp_path, scrapes, expected):
+    with ForecastCube(str(tmp_path / "cube"), zip_capacity=2) as cube:
+        for zip_code, parsed_forecasts, scrape_time in scrapes:
+            cube.append(zip_code, parsed_forecasts, scrape_time)
+
+        # Growing past the ZIP capacity kept every earlier row
+        assert cube.zip_capacity == 4
+        assert cube.shape == (3, 8, cube.lead_days)
+        assert cube.origin == datetime(2026, 10, 18, 6)
+
+        first_day = cube.select("high_temp", lead_day=0)
+        assert first_day.shape == (3, 8)
+        assert (first_day == np.arange(8)).all()
+        assert np.shares_memory(first_day, cube.fields["high_temp"])
+
+        # Bounds select whole slots: `start` rounds down to its slot, `end` stops before the slot it falls in only at its start
+        window = cube.select("high_temp", zip_code="20002", start=T0 + 2 * SLOT, end=cube.issue_time(5), lead_day=0)
+        assert window.tolist() == [2, 3, 4]
+        assert cube.select("high_temp", zip_code="20002", start=T0 + 2 * SLOT, end=T0 + 5 * SLOT, lead_day=0).tolist() == [2, 3, 4, 5]
+        assert cube.last(1, "high_temp", lead_day=0, now=T0 + 7 * SLOT).tolist() == [[3, 4, 5, 6, 7]] * 3
+
+        parsed = expected[page_name("30003")]["parsed"]
+        lows = cube.masked("low_temp", zip_code="30003", lead_day=slice(0, len(parsed) + 1))[0]
+        assert lows[:len(parsed)].tolist() == [day["low_temp"] for day in parsed]
+        assert lows.mask[len(parsed)]
+
+    with ForecastCube(str(tmp_path / "cube"), readonly=True) as cube:
+        assert cube.select("high_temp", lead_day=0).tolist() == [list(range(8))] * 3
+        with pytest.raises(PermissionError):
+            cube.append("10001", [], T0)
+
+def test_missing_high_temperatures_are_masked(tmp_path, expected):
+    parsed = expected["tenday_tonight"]["parsed"]
+    with ForecastCube(str(tmp_path / "cube")) as cube:
+        cube.append("10001", parsed, T0)
+        assert cube.select("high_temp", lead_day=0)[0, 0] == MISSING_TEMP
+        assert cube.masked("high_temp", lead_day=0).mask[0, 0]
+        assert cube.to_frame()["high_temp"].isna().tolist() == [day["high_temp"] is None for day in parsed]
+
+def test_back_fill_before_the_origin(tmp_path, scrapes):
+    with ForecastCube(str(tmp_path / "cube")) as cube:
+        late = scrapes[:3]
+        for zip_code, parsed_forecasts, scrape_time in scrapes[3:]:
+            cube.append(zip_code, parsed_forecasts, scrape_time)
+        assert cube.origin == datetime(2026, 10, 18, 12)
+        assert cube.select("high_temp", lead_day=0).tolist() == [list(range(1, 8))] * 3
+
+        # The first slot arrives last and moves the origin back one slot, keeping later slots at their times
+        for zip_code, parsed_forecasts, scrape_time in late:
+            cube.append(zip_code, parsed_forecasts, scrape_time)
+        assert cube.origin == datetime(2026, 10, 18, 6)
+        assert cube.select("high_temp", lead_day=0).tolist() == [list(range(8))] * 3
+
+        df = cube.to_frame(lead_day=0)
+        assert sorted(set(df["issue_time"])) == [datetime(2026, 10, 18, 6) + slot * SLOT for slot in range(8)]
+        assert (df["high_temp"] == (df["issue_time"] - datetime(2026, 10, 18, 6)) // SLOT).all()
+
+    with ForecastCube(str(tmp_path / "cube"), readonly=True) as cube:
+        assert cube.origin == datetime(2026, 10, 18, 6)
+        assert cube.select("high_temp", lead_day=0).tolist() == [list(range(8))] * 3
@@ -0,0 +1,34 @@
+import pytest
+
+from weather.extractors import EXTRACTORS, DEFAULT_BACKEND, compare_backends, get_extractor
+
+from stub_server import load_corpus
+
+@pytest.fixture(scope="module")
+def pages():
+    return load_corpus()
+
+def installed(name, content):
+    try:
+        EXTRACTORS[name](content)
+    except ImportError as e:
+        pytest.skip(f"{name} backend is not installed: {e}")
+
+@pytest.mark.parametrize("backend", [name for name in EXTRACTORS if name != "html.parser"])
+def test_backend_matches_html_parser(backend, pages):
+    installed(backend, next(iter(pages.values())))
+    assert compare_backends(pages, [backend]) == []
+
+@pytest.mark.parametrize("backend", list(EXTRACTORS))
+def test_backend_matches_expected_forecasts(backend, pages, expected):
+    installed(backend, next(iter(pages.values())))
+    for name, content in pages.items():
+        assert EXTRACTORS[backend](content) == expected[name]["forecasts"], name
+
+def test_default_backend_is_installed(pages):
+    extractor = get_extractor(DEFAULT_BACKEND)
+    assert extractor(next(iter(pages.values())))
+
+def test_missing_container_raises():
+    with pytest.raises(ValueError):
+        get_extractor("stream")(b"<html><body>No forecast here</body></html>")
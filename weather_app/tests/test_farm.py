@@ -0,0 +1,32 @@
+from weather.farm import run_farm
+from weather.history import HistoryStore
+from weather.metrics import REGISTRY, UPSTREAM_RESPONSES
+
+ZIP_CODES = ["10001", "20002", "30003", "40004", "50005", "60006", "70007", "80008"]
+
+def test_farm_resumes_from_checkpoint(faulty_stub, tmp_path):
+    db_path = str(tmp_path / "history.db")
+    checkpoint_path = tmp_path / "checkpoint.txt"
+    checkpoint_path.write_text("".join(f"{zip_code}\n" for zip_code in ZIP_CODES[:3]))
+    options = dict(workers=2, threads=2, chunk_size=2, flush_every=2, url_template=faulty_stub.url_template, rate=0)
+
+    written, errors = run_farm(ZIP_CODES, db_path, str(checkpoint_path), **options)
+
+    assert (written, errors) == (5, {})
+    assert faulty_stub.server.requests == 5
+    assert sorted(checkpoint_path.read_text().split()) == ZIP_CODES
+    with HistoryStore(db_path) as history:
+        assert sorted(history.zip_codes()) == ZIP_CODES[3:]
+
+    # Everything is checkpointed now, so a second run fetches nothing
+    assert run_farm(ZIP_CODES, db_path, str(checkpoint_path), **options) == (0, {})
+    assert faulty_stub.server.requests == 5
+
+def test_farm_merges_worker_metrics_once(stub, tmp_path):
+    REGISTRY.reset()
+    UPSTREAM_RESPONSES.inc(7, status="200")
+
+    written, _ = run_farm(ZIP_CODES, str(tmp_path / "history.db"), workers=2, threads=2, url_template=stub.url_template, rate=0)
+
+    # Workers are forked with the 7 responses above; only their own responses may come back
+    assert UPSTREAM_RESPONSES.value(status="200") == 7 + written
@@ -0,0 +1,74 @@
+import os
+
+import pandas as pd
+import pytest
+
+from weather.forecast import get_weather_forecast, get_weather_forecasts, parse_forecasts_frame, split_weather_line
+from weather.resilience import ResilientFetcher
+
+from conftest import page_name
+
+ZIP_CODES = ["10001", "20002", "30003", "40004", "50005", "60006", "70007", "80008"]
+
+def test_batch_fetch_matches_fixtures(faulty_stub, expected):
+    # No faults are set, the fault injecting stub is only used for its request count
+    results, errors = get_weather_forecasts(ZIP_CODES + ZIP_CODES[:2], max_workers=4, url_template=faulty_stub.url_template,
+                                            upstream=ResilientFetcher(rate=0))
+
+    assert errors == {}
+    assert list(results) == ZIP_CODES
+    for zip_code, forecasts in results.items():
+        assert forecasts == expected[page_name(zip_code)]["forecasts"]
+    # Duplicate ZIP codes are fetched once
+    assert faulty_stub.server.requests == len(ZIP_CODES)
+
+def test_single_fetch_matches_fixture(stub, expected):
+    assert get_weather_forecast("10001", url_template=stub.url_template) == expected[page_name("10001")]["forecasts"]
+
+@pytest.mark.parametrize("zip_code", ["1234", "123456", "abcde", " 10001", 10001, None])
+def test_invalid_zip_code_is_rejected_before_fetching(faulty_stub, zip_code):
+    with pytest.raises(ValueError, match="Invalid ZIP code format"):
+        get_weather_forecast(zip_code, url_template=faulty_stub.url_template)
+    assert faulty_stub.server.requests == 0
+
+def test_analysis_scraper_uses_the_package(monkeypatch):
+    import weather.forecast
+
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "weather_analysis"))
+    import weather_scraper
+    assert weather_scraper.get_weather_forecast is weather.forecast.get_weather_forecast
+
+def test_batch_fetch_reports_failed_zip_codes(faulty_stub):
+    faulty_stub.server.faults["down"] = True
+    results, errors = get_weather_forecasts(ZIP_CODES[:3], max_workers=3, url_template=faulty_stub.url_template,
+                                            upstream=ResilientFetcher(rate=0, max_retries=0))
+
+    assert results == {}
+    assert set(errors) == set(ZIP_CODES[:3])
+
+def forecast_lines(expected):
+    lines = [line for page in expected.values() for line in page["forecasts"]]
+    # A missing high, a line without wind that is dropped, and an unknown condition that is dropped
+    return lines + ["TonightPartly Cloudy--/23°Rain2%WindWNW 19 mph", "TodaySunny35°/23°Rain0%", "Mon 13Cloudy40°/30°WindE 4 mph"]
+
+def test_parse_forecasts_frame_dtypes(expected):
+    df = parse_forecasts_frame(forecast_lines(expected))
+
+    assert isinstance(df["condition"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["wind_direction"].dtype, pd.CategoricalDtype)
+    assert df["high_temp"].dtype == "Int16"
+    assert df["high_temp"].isna().sum() >= 1
+    assert (df["low_temp"].dtype, df["wind_speed"].dtype, df["rain_chance"].dtype) == ("int16", "int8", "int16")
+
+def test_parse_forecasts_frame_matches_split_weather_line(expected):
+    lines = forecast_lines(expected)
+    df = parse_forecasts_frame(lines)
+    reference = pd.DataFrame(split_weather_line(lines))
+
+    assert list(df.columns) == list(reference.columns)
+    assert len(df) == len(reference)
+    for column in ["date", "condition", "wind_direction"]:
+        assert df[column].astype(str).tolist() == reference[column].tolist()
+    pd.testing.assert_series_equal(df["high_temp"].astype("float"), reference["high_temp"].astype("float"))
+    for column in ["low_temp", "wind_speed", "rain_chance"]:
+        assert df[column].tolist() == reference[column].tolist()
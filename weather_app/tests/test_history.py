@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import random
+
+import pandas as pd
+import pytest
+
+from weather.history import HistoryStore, IncrementalHistoryStore
+
+from conftest import page_name
+
+T0 = datetime(2026, 10, 18, 6)
+
+@pytest.fixture
+def forecasts(expected):
+    return [expected[page_name(zip_code)]["parsed"] for zip_code in ["10001", "20002", "30003"]]
+
+def test_append_and_query(tmp_path, forecasts):
+    with HistoryStore(str(tmp_path / "history.db"), batch_size=10) as history:
+        for hours, parsed_forecasts in enumerate(forecasts):
+            history.append("10001", parsed_forecasts, T0 + timedelta(hours=hours))
+        history.append("20002", forecasts[0], T0)
+
+        df = history.query("10001")
+        assert history.zip_codes() == ["10001", "20002"]
+
+    assert len(df) == sum(len(parsed_forecasts) for parsed_forecasts in forecasts)
+    assert df["scrape_time"].is_monotonic_increasing
+    first = df[df["scrape_time"] == T0]
+    assert first["lead_day"].tolist() == list(range(len(forecasts[0])))
+    assert first["forecast_date"].tolist() == [day["date"] for day in forecasts[0]]
+    assert first["condition"].astype(str).tolist() == [day["condition"] for day in forecasts[0]]
+    assert first["high_temp"].astype("float").fillna(-1).tolist() == [-1 if day["high_temp"] is None else day["high_temp"] for day in forecasts[0]]
+    assert first["rain_chance"].tolist() == [day["rain_chance"] for day in forecasts[0]]
+
+def test_query_time_range(tmp_path, forecasts):
+    with HistoryStore(str(tmp_path / "history.db")) as history:
+        for hours, parsed_forecasts in enumerate(forecasts):
+            history.append("10001", parsed_forecasts, T0 + timedelta(hours=hours))
+
+        def scrape_times(**bounds):
+            return sorted(set(history.query("10001", **bounds)["scrape_time"]))
+
+        assert scrape_times(start=T0 + timedelta(hours=1)) == [pd.Timestamp(T0 + timedelta(hours=h)) for h in (1, 2)]
+        assert scrape_times(end=T0 + timedelta(hours=1)) == [pd.Timestamp(T0 + timedelta(hours=h)) for h in (0, 1)]
+        assert scrape_times(start=T0 + timedelta(minutes=30), end=T0 + timedelta(minutes=90)) == [pd.Timestamp(T0 + timedelta(hours=1))]
+        assert history.query("10001", start=T0 + timedelta(days=1)).empty
+        assert history.query("99999").empty
+
+def test_rewriting_a_scrape_replaces_it(tmp_path, forecasts):
+    path = str(tmp_path / "history.db")
+    with HistoryStore(path) as history:
+        history.append("10001", forecasts[0], T0)
+    # A second writer, e.g. a coordinator draining the same unit again after a crash
+    with HistoryStore(path) as history:
+        history.append("10001", forecasts[0], T0)
+        assert len(history.query("10001")) == len(forecasts[0])
+
+def test_incremental_out_of_order_scrape(tmp_path, forecasts):
+    a = forecasts[0][:2]
+    b = [dict(a[0], high_temp=(a[0]["high_temp"] or 0) + 10), a[1]]
+    with IncrementalHistoryStore(str(tmp_path / "history.db")) as history:
+        history.append("10001", a, T0)
+        assert history.append("10001", a, T0 + timedelta(hours=2)) == 0
+        # The scrape between the two arrives last
+        history.append("10001", b, T0 + timedelta(hours=1))
+
+        assert history.as_of("10001", T0) == a
+        assert history.as_of("10001", T0 + timedelta(hours=1)) == b
+        assert history.as_of("10001", T0 + timedelta(hours=2)) == a
+        # Later in-order scrapes still diff against the latest scrape
+        assert history.append("10001", a, T0 + timedelta(hours=3)) == 0
+        assert history.as_of("10001") == a
+
+def test_incremental_matches_full_store_in_any_order(tmp_path, forecasts):
+    rng = random.Random(0)
+    dates = [day["date"] for day in forecasts[0]]
+    scrapes = []
+    for hours in range(30):
+        # Sliding windows over a few alternating versions of each day
+        start = rng.randrange(len(dates) - 3)
+        scrapes.append((T0 + timedelta(hours=hours), [
+            dict(rng.choice(forecasts)[0], date=date) for date in dates[start:start + 4]
+        ]))
+    rng.shuffle(scrapes)
+
+    with HistoryStore(str(tmp_path / "full.db")) as full, IncrementalHistoryStore(str(tmp_path / "incremental.db"), batch_size=7) as incremental:
+        for scrape_time, parsed_forecasts in scrapes:
+            full.append("10001", parsed_forecasts, scrape_time)
+            incremental.append("10001", parsed_forecasts, scrape_time)
+        pd.testing.assert_frame_equal(incremental.query("10001"), full.query("10001"))
+        for scrape_time, parsed_forecasts in scrapes:
+            assert incremental.as_of("10001", scrape_time) == parsed_forecasts
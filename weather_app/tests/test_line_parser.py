@@ -0,0 +1,87 @@
+import random
+import re
+
+import pytest
+
+from weather.line_parser import FORECAST_LINE_PATTERN, FORECAST_PARSER, CONDITION_OPTIONS, WIND_DIRECTION_OPTIONS
+
+def reference_split_weather_line(forecasts):
+    """
+    The original per-field `re.search` implementation of `split_weather_line()`, kept as the reference output.
+    """
+    wind_direction_options = "|".join(WIND_DIRECTION_OPTIONS)
+    condition_options = "|".join(CONDITION_OPTIONS)
+    date_pattern = r"^Today|^Tonight|^\D{3} \d{1,2}"
+    wind_pattern = fr"Wind({wind_direction_options})\s{{0,1}}(\d{{1,2}})\s{{0,1}}mph"
+    condition_pattern = fr"({condition_options})"
+    temp_pattern = r"\d{1,3}°/\d{1,3}°|--/\d{1,3}°"
+
+    results = []
+    for line in forecasts:
+        date_match = re.search(date_pattern, line)
+        condition_match = re.search(condition_pattern, line)
+        temp_match = re.search(temp_pattern, line)
+        wind_match = re.search(wind_pattern, line)
+        if all([date_match, condition_match, temp_match, wind_match]):
+            high_temp, low_temp = temp_match.group(0).split("/")
+            high_temp = high_temp.replace("°", "")
+            low_temp = low_temp.replace("°", "")
+            rain_match = re.search(r"Rain(\d{1,3})%", line)
+            results.append({
+                "date": date_match.group(0),
+                "condition": condition_match.group(0),
+                "high_temp": int(high_temp) if high_temp.isdigit() else None,
+                "low_temp": int(low_temp),
+                "wind_direction": wind_match.group(1),
+                "wind_speed": int(wind_match.group(2)),
+                "rain_chance": int(rain_match.group(1)) if rain_match else 0,
+            })
+    return results
+
+EDGE_CASES = [
+    "TonightPartly CloudyPartly Cloudy--/23°Rain2%WindWNW 19 mph",
+    "TodaySunnySunny35°/23°Rain0%",
+    "Wed 08Partly Cloudy33°/21°Rain4%WindWNW 18 mph",
+    "Thu 09SunnySunny--/21°WindNW 22 mph",
+    "Fri 10Rain and SnowRain and Snow38°/23°Rain80%WindN5mph",
+    "Sat 11Mostly SunnyMostly Sunny--°/23°Rain2%WindNW 12 mph",
+    "Sun 12Scattered ThunderstormsScattered Thunderstorms90°/71°Rain60%WindSSW 9 mph",
+    "Mon 13Cloudy40°/30°Rain10%WindE 4 mph",
+    "Tonight",
+    "",
+]
+
+def test_fixture_lines_match_reference(expected):
+    lines = [line for page in expected.values() for line in page["forecasts"]]
+    assert FORECAST_PARSER.parse_batch(lines) == reference_split_weather_line(lines)
+
+@pytest.mark.parametrize("line", EDGE_CASES)
+def test_edge_cases_match_reference(line):
+    assert FORECAST_PARSER.parse_batch([line]) == reference_split_weather_line([line])
+
+def test_missing_fields():
+    assert FORECAST_PARSER.parse_line("TodaySunnySunny35°/23°Rain0%") is None
+    assert FORECAST_PARSER.parse_line(EDGE_CASES[0])["high_temp"] is None
+    assert FORECAST_PARSER.parse_line(EDGE_CASES[0])["date"] == "Tonight"
+    assert FORECAST_PARSER.parse_line("Thu 09SunnySunny--/21°WindNW 22 mph")["rain_chance"] == 0
+
+def test_fuzzed_lines_match_reference():
+    rng = random.Random(6)
+    pieces = ["Today", "Tonight", "Wed 08", "Thu 9", "xx", " ", "Rain", "Wind", "mph", " mph", "°", "/", "--", "%",
+              "12", "7", "100", "4", *CONDITION_OPTIONS, *WIND_DIRECTION_OPTIONS]
+    lines = ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 14))) for _ in range(5000)]
+    # Well-formed lines with one field dropped or mangled at random
+    for _ in range(5000):
+        fields = [rng.choice(["Today", "Tonight", "Mon 13", "Tue 1"]), rng.choice(CONDITION_OPTIONS),
+                  rng.choice(["35°/23°", "--/23°", "5°/100°"]), f"Rain{rng.randint(0, 100)}%",
+                  f"Wind{rng.choice(WIND_DIRECTION_OPTIONS)}{rng.choice(['', ' '])}{rng.randint(0, 99)}{rng.choice(['', ' '])}mph"]
+        # An index past the end keeps every field
+        drop = rng.randrange(len(fields) + 2)
+        if drop < len(fields):
+            del fields[drop]
+        lines.append("".join(fields))
+
+    assert all(FORECAST_LINE_PATTERN.match(line) is not None for line in lines)
+    parsed = FORECAST_PARSER.parse_batch(lines)
+    assert len(parsed) > 2000
+    assert parsed == reference_split_weather_line(lines)
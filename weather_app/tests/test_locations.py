@@ -0,0 +1,43 @@
+from weather import HttpFetcher, Pipeline
+from weather.locations import LocationMap
+
+from conftest import page_name
+
+def zip_codes_sharing_a_page(count=2):
+    by_page = {}
+    for n in range(10000, 20000):
+        zip_code = f"{n:05d}"
+        by_page.setdefault(page_name(zip_code), []).append(zip_code)
+        if len(by_page[page_name(zip_code)]) == count:
+            return by_page[page_name(zip_code)]
+
+def test_zip_codes_of_one_location_are_fetched_once(faulty_stub, expected, tmp_path):
+    first, second = zip_codes_sharing_a_page()
+    locations = LocationMap(str(tmp_path / "locations.db"))
+    pipeline = Pipeline(HttpFetcher(url_template=faulty_stub.url_template), locations=locations)
+
+    # Unknown ZIP codes are fetched under their own code, and the pages teach their location
+    results, errors = pipeline.run([first])
+    assert not errors
+    assert faulty_stub.server.requests == 1
+    assert locations.get(first) == page_name(first)
+    locations.update({second: page_name(second)})
+
+    results, errors = pipeline.run([first, second, first])
+    assert not errors
+    assert faulty_stub.server.requests == 2
+    assert results[first] == results[second] == expected[page_name(first)]["parsed"]
+
+    # Mappings persist across processes
+    assert LocationMap(str(tmp_path / "locations.db")).plan([second, first]) == {page_name(first): [second, first]}
+
+def test_learning_ignores_location_keys_and_self_mappings(stub):
+    locations = LocationMap()
+    pipeline = Pipeline(HttpFetcher(url_template=stub.url_template), locations=locations)
+    name = page_name("10001")
+    pipeline.parse(name)
+    assert len(locations) == 0
+
+    pipeline.parse("10001")
+    assert locations.resolve("10001") == name
+    assert locations.stats() == {"zip_codes": 1, "locations": 1, "learned": 1}
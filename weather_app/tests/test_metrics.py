@@ -0,0 +1,14 @@
+from weather.metrics import Registry
+
+def test_label_values_and_help_are_escaped():
+    registry = Registry()
+    counter = registry.counter("weather_errors_total", 'Errors by "kind",\ncounted \\ per process.', ["kind"])
+    counter.inc(kind='bad "quote"\\path\nnext')
+    histogram = registry.histogram("weather_seconds", "Latency.", ["stage"], buckets=(1.0,))
+    histogram.observe(0.5, stage='a"b')
+
+    lines = registry.render().splitlines()
+    assert lines[0] == '# HELP weather_errors_total Errors by "kind",\\ncounted \\\\ per process.'
+    assert 'weather_errors_total{kind="bad \\"quote\\"\\\\path\\nnext"} 1' in lines
+    assert 'weather_seconds_bucket{stage="a\\"b",le="1.0"} 1' in lines
+    assert 'weather_seconds_count{stage="a\\"b"} 1' in lines
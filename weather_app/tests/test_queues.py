@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from weather.queues import RedisQueue, SqliteQueue, open_queue
+
+RESULT = {"scrape_time": "2026-10-18T12:00:00", "parsed": {"10001": []}, "errors": {}}
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    # Runs the Redis queue's Lua scripts in-process; skipped where fakeredis or its Lua runtime is not installed
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    import redis
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, "from_url", classmethod(lambda cls, url: fakeredis.FakeRedis(server=server)))
+    return fakeredis.FakeRedis(server=server)
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_queue(request, tmp_path):
+    if request.param == "redis":
+        request.getfixturevalue("fake_redis")
+
+    def make_queue(tmp_path, max_attempts=3):
+        if request.param == "redis":
+            work_queue = RedisQueue("redis://localhost:6379/0", "test", max_attempts)
+        else:
+            work_queue = SqliteQueue(str(tmp_path / "queue.db"), max_attempts)
+        work_queue.enqueue({"sweep-000000": ["10001"]})
+        return work_queue
+    return make_queue
+
+def test_expired_lease_is_reclaimed_and_late_result_discarded(make_queue, tmp_path):
+    work_queue = make_queue(tmp_path)
+    first = work_queue.lease("worker-a", lease_seconds=0.05)
+    assert work_queue.lease("worker-b") is None
+
+    time.sleep(0.1)
+    second = work_queue.lease("worker-b")
+    assert second.unit_id == first.unit_id and second.token != first.token
+
+    # The first worker lost the unit: it can neither renew nor complete it
+    assert not work_queue.renew(first)
+    assert not work_queue.complete(first, "worker-a", RESULT)
+    assert work_queue.complete(second, "worker-b", RESULT)
+    assert work_queue.counts()["done"] == 1
+    assert work_queue.completed() == [("sweep-000000", RESULT)]
+
+def test_renewed_lease_is_not_reclaimed(make_queue, tmp_path):
+    work_queue = make_queue(tmp_path)
+    lease = work_queue.lease("worker-a", lease_seconds=0.1)
+    for _ in range(3):
+        time.sleep(0.05)
+        assert work_queue.renew(lease, lease_seconds=0.1)
+    assert work_queue.lease("worker-b") is None
+    assert work_queue.counts()["leased"] == 1
+
+def test_unit_is_dead_after_max_attempts(make_queue, tmp_path):
+    work_queue = make_queue(tmp_path, max_attempts=2)
+    work_queue.lease("worker-a", lease_seconds=0)
+    time.sleep(0.01)
+    work_queue.lease("worker-b", lease_seconds=0)
+    time.sleep(0.01)
+
+    assert work_queue.lease("worker-c") is None
+    assert work_queue.counts()["dead"] == 1
+    assert work_queue.failures() == {"sweep-000000": "lease expired"}
+
+def test_redis_keys_share_one_hash_tag(fake_redis):
+    work_queue = open_queue("redis://localhost:6379/0#nightly")
+    work_queue.enqueue({"sweep-000000": ["10001"], "sweep-000001": ["20002"]})
+    lease = work_queue.lease("worker-a")
+    work_queue.complete(lease, "worker-a", RESULT)
+    work_queue.release(work_queue.lease("worker-a"), "failed")
+
+    keys = sorted(key.decode() for key in fake_redis.keys("*"))
+    assert "weather:{nightly}:units" in keys and "weather:{nightly}:worker:worker-a" in keys
+    # Redis Cluster hashes only the part between the first braces, so every key maps to one slot
+    assert all(key.startswith("weather:{nightly}:") for key in keys)
+    assert work_queue.counts() == {"pending": 1, "leased": 0, "done": 1, "written": 0, "dead": 0}
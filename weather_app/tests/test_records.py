@@ -0,0 +1,61 @@
+import pytest
+
+from weather.line_parser import CONDITION_OPTIONS, WIND_DIRECTION_OPTIONS
+from weather.records import ForecastBatch, ForecastRecord, Condition, WindDirection
+
+from conftest import page_name
+
+ZIP_CODES = ["10001", "20002", "30003"]
+
+def every_enum_value():
+    """
+    Returns:
+        parsed_forecasts (list): One day per condition and wind direction, with a missing high every third day.
+    """
+    return [
+        {
+            "date": f"Day {i}",
+            "condition": CONDITION_OPTIONS[i % len(CONDITION_OPTIONS)],
+            "high_temp": None if i % 3 == 0 else 40 + i,
+            "low_temp": -10 + i,
+            "wind_direction": WIND_DIRECTION_OPTIONS[i % len(WIND_DIRECTION_OPTIONS)],
+            "wind_speed": i,
+            "rain_chance": 100 - i,
+        }
+        for i in range(max(len(CONDITION_OPTIONS), len(WIND_DIRECTION_OPTIONS)))
+    ]
+
+@pytest.fixture
+def forecasts(expected):
+    forecasts = {zip_code: expected[page_name(zip_code)]["parsed"] for zip_code in ZIP_CODES}
+    forecasts["99999"] = every_enum_value()
+    return forecasts
+
+def test_record_dict_round_trip(forecasts):
+    for parsed_forecasts in forecasts.values():
+        for weather_data in parsed_forecasts:
+            record = ForecastRecord.from_dict(weather_data)
+            assert isinstance(record.condition, Condition) and isinstance(record.wind_direction, WindDirection)
+            assert record.to_dict() == weather_data
+
+def test_batch_dict_round_trip(forecasts):
+    batch = ForecastBatch.from_forecasts(forecasts)
+    assert len(batch) == sum(len(parsed_forecasts) for parsed_forecasts in forecasts.values())
+    assert batch.to_forecasts() == forecasts
+
+def test_batch_frame_round_trip(forecasts):
+    df = ForecastBatch.from_forecasts(forecasts).to_frame()
+    assert df["high_temp"].isna().sum() == sum(day["high_temp"] is None for days in forecasts.values() for day in days)
+    assert ForecastBatch.from_frame(df).to_forecasts() == forecasts
+
+@pytest.mark.parametrize("field, value", [("condition", "Fog"), ("wind_direction", "NORTH")])
+def test_unknown_enum_values_are_rejected(field, value):
+    weather_data = dict(every_enum_value()[1], **{field: value})
+    with pytest.raises(KeyError):
+        ForecastRecord.from_dict(weather_data)
+    batch = ForecastBatch()
+    with pytest.raises(KeyError):
+        batch.append("10001", [every_enum_value()[0], weather_data])
+    # The valid first day is kept and no column holds part of the rejected one
+    assert {len(column) for column in [batch.zip_code, batch.date, batch.condition, batch.high_temp, batch.low_temp,
+                                       batch.wind_direction, batch.wind_speed, batch.rain_chance]} == {1}
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from weather.cache import ForecastCache
+from weather.refresher import BackgroundRefresher
+
+class HeldLoader:
+    """
+    Loader that numbers its results and blocks until `release` is set.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, key):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return f"forecast {self.calls} for {key}"
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+@pytest.fixture
+def loader():
+    loader = HeldLoader()
+    yield loader
+    loader.release.set()
+
+@pytest.fixture
+def refresher(loader):
+    refresher = BackgroundRefresher(ForecastCache(loader, ttl=60), refresh_margin=10)
+    yield refresher
+    refresher.stop()
+
+def test_stale_entry_is_served_while_one_refresh_runs(refresher, loader):
+    refresher.cache.backend.set("10001", "old forecast", time.time() - 90)
+
+    # Every reader gets the stale entry at once, while a single background refresh waits on upstream
+    assert [refresher.get("10001") for _ in range(5)] == ["old forecast"] * 5
+    assert loader.started.wait(5)
+    assert refresher.is_stale("10001")
+    assert refresher.get("10001") == "old forecast"
+    assert loader.calls == 1
+
+    loader.release.set()
+    wait_for(lambda: refresher.cache.lookup("10001")[0] == "forecast 1 for 10001")
+    assert not refresher.is_stale("10001")
+    assert refresher.get("10001") == "forecast 1 for 10001"
+    assert loader.calls == 1
+
+def test_entry_close_to_its_ttl_is_refreshed_early(refresher, loader):
+    loader.release.set()
+    refresher.cache.backend.set("10001", "old forecast", time.time() - 55)
+    assert refresher.get("10001") == "old forecast"
+    assert not refresher.is_stale("10001")
+    wait_for(lambda: refresher.cache.lookup("10001")[0] == "forecast 1 for 10001")
+
+def test_fresh_entry_is_not_refreshed(refresher, loader):
+    refresher.cache.backend.set("10001", "forecast", time.time() - 10)
+    assert refresher.get("10001") == "forecast"
+    time.sleep(0.1)
+    assert loader.calls == 0
+
+def test_missing_or_too_old_entry_blocks_on_upstream(refresher, loader):
+    loader.release.set()
+    assert refresher.get("10001") == "forecast 1 for 10001"
+
+    refresher.cache.backend.set("10001", "ancient forecast", time.time() - refresher.max_stale - 1)
+    assert refresher.get("10001") == "forecast 2 for 10001"
+
+def test_sweep_refreshes_hot_keys_before_they_expire(refresher, loader):
+    loader.release.set()
+    refresher.get("10001")
+    refresher.get("20002")
+    refresher.cache.backend.set("10001", "aging forecast", time.time() - 55)
+
+    refresher.sweep()
+    wait_for(lambda: refresher.cache.lookup("10001")[0] != "aging forecast")
+    # The other hot key is still fresh, and keys idle past the hot window are forgotten
+    assert refresher.cache.lookup("20002")[0] == "forecast 2 for 20002"
+    refresher.hot_window = 0
+    time.sleep(0.01)
+    refresher.sweep()
+    assert not refresher._hot
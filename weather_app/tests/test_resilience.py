@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+from weather.resilience import CircuitBreaker, CircuitOpenError, ResilientFetcher, RetryBudget
+
+class FailingSession:
+    """
+    Session whose requests raise `error`, standing in for failures that are not connection errors.
+    """
+
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        raise self.error
+
+def make_fetcher(recovery_time=0.05):
+    return ResilientFetcher(rate=0, max_retries=0, retry_budget=RetryBudget(),
+                            breaker=CircuitBreaker(failure_threshold=2, recovery_time=recovery_time))
+
+def open_breaker(fetcher, url):
+    for _ in range(fetcher.breaker.failure_threshold):
+        with pytest.raises(requests.ConnectionError):
+            fetcher.get(url, FailingSession(requests.ConnectionError("refused")))
+    assert fetcher.breaker.state == CircuitBreaker.OPEN
+
+def test_breaker_opens_then_closes_after_successful_probe(faulty_stub):
+    fetcher = make_fetcher()
+    url = faulty_stub.url_template.format(zip_code="10001")
+    open_breaker(fetcher, url)
+    with pytest.raises(CircuitOpenError):
+        fetcher.get(url)
+
+    time.sleep(0.06)
+    response = fetcher.get(url)
+    assert response.status_code == 200
+    assert fetcher.breaker.state == CircuitBreaker.CLOSED
+
+def test_failed_probe_reopens_breaker(faulty_stub):
+    fetcher = make_fetcher()
+    url = faulty_stub.url_template.format(zip_code="10001")
+    open_breaker(fetcher, url)
+
+    faulty_stub.server.faults["down"] = True
+    time.sleep(0.06)
+    assert fetcher.get(url).status_code == 503
+    assert fetcher.breaker.state == CircuitBreaker.OPEN
+
+def test_probe_raising_other_error_does_not_wedge_breaker(stub):
+    fetcher = make_fetcher()
+    url = stub.url_template.format(zip_code="10001")
+    open_breaker(fetcher, url)
+
+    time.sleep(0.06)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        fetcher.get(url, FailingSession(requests.exceptions.ChunkedEncodingError("truncated body")))
+    assert fetcher.breaker.state == CircuitBreaker.OPEN
+
+    # The failed probe re-opened the circuit rather than leaving a probe in flight forever
+    time.sleep(0.06)
+    assert fetcher.get(url).status_code == 200
+    assert fetcher.breaker.state == CircuitBreaker.CLOSED
+
+def test_local_errors_do_not_count_as_upstream_failures(stub):
+    fetcher = make_fetcher()
+    url = stub.url_template.format(zip_code="10001")
+    for error in [ValueError("bad url"), KeyboardInterrupt()]:
+        for _ in range(fetcher.breaker.failure_threshold):
+            with pytest.raises(type(error)):
+                fetcher.get(url, FailingSession(error))
+        assert fetcher.breaker.state == CircuitBreaker.CLOSED
+
+    # A local error during the half-open probe frees the probe slot without re-opening the circuit
+    open_breaker(fetcher, url)
+    time.sleep(0.06)
+    with pytest.raises(KeyboardInterrupt):
+        fetcher.get(url, FailingSession(KeyboardInterrupt()))
+    assert fetcher.breaker.state == CircuitBreaker.HALF_OPEN
+    assert fetcher.get(url).status_code == 200
+    assert fetcher.breaker.state == CircuitBreaker.CLOSED
+
+def test_non_retryable_status_counts_as_success(faulty_stub):
+    fetcher = make_fetcher()
+    url = faulty_stub.url_template.format(zip_code="10001")
+    faulty_stub.server.faults.update(down=True, status=404)
+    for _ in range(fetcher.breaker.failure_threshold):
+        assert fetcher.get(url).status_code == 404
+    assert fetcher.breaker.state == CircuitBreaker.CLOSED
+
+def test_async_probe_raising_other_error_does_not_wedge_breaker(stub):
+    from weather.async_weather import HostLimiter, async_fetch_page
+
+    fetcher = make_fetcher()
+    url = stub.url_template.format(zip_code="10001")
+    open_breaker(fetcher, url)
+
+    time.sleep(0.06)
+    with pytest.raises(ValueError):
+        asyncio.run(async_fetch_page(FailingSession(ValueError("bad url")), url, HostLimiter(), max_retries=0, upstream=fetcher))
+    assert fetcher.breaker.state == CircuitBreaker.HALF_OPEN
+    assert not fetcher.breaker._probing
+
+def test_async_client_errors_count_as_upstream_failures(stub):
+    import aiohttp
+
+    from weather.async_weather import HostLimiter, async_fetch_page
+
+    fetcher = make_fetcher()
+    url = stub.url_template.format(zip_code="10001")
+    for _ in range(fetcher.breaker.failure_threshold):
+        with pytest.raises(aiohttp.ClientPayloadError):
+            asyncio.run(async_fetch_page(FailingSession(aiohttp.ClientPayloadError("truncated body")), url, HostLimiter(),
+                                         max_retries=0, upstream=fetcher))
+    assert fetcher.breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,23 @@
+import os
+import stat
+
+import pytest
+
+from weather.snapshots import SnapshotStore, UMASK
+
+def test_save_writes_readable_meta(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.save("10001", b"<html></html>", {"ETag": '"abc"'}, ["Today Sunny"])
+
+    assert store.load_forecasts("10001") == ["Today Sunny"]
+    assert store.conditional_headers("10001") == {"If-None-Match": '"abc"'}
+    mode = stat.S_IMODE(os.stat(tmp_path / "10001" / "meta.json").st_mode)
+    assert mode == 0o666 & ~UMASK
+    assert sorted(name for name in os.listdir(tmp_path / "10001") if not name.endswith(".html.gz")) == ["meta.json"]
+
+def test_failed_save_leaves_no_temp_file(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    with pytest.raises(TypeError):
+        store.save("10001", b"<html></html>", {}, [object()])
+
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path / "10001"))
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from weather.analytics import REGION_KEY
+from weather.cube import ForecastCube
+from weather.history import HistoryStore
+from weather.verification import load_history, resolve_dates, verify
+
+DAY0 = datetime(2026, 10, 18)
+
+def label(day):
+    return (DAY0 + timedelta(days=day)).strftime("%a %d")
+
+def day(date, high, low, rain):
+    return {"date": date, "condition": "Sunny", "high_temp": high, "low_temp": low,
+            "wind_direction": "N", "wind_speed": 5, "rain_chance": rain}
+
+# Scrapes of each ZIP code on three mornings: forecasts for the next days, then the "Today" row of the day itself.
+# High temperature errors of 100xx are +2 and -1 at lead 1 and +4 at lead 2; 200xx is off by twice as much.
+SCRAPES = {
+    0: lambda k: [day("Today", 70, 50, 0), day(label(1), 70 + 2 * k, 52, 80), day(label(2), 60 + 4 * k, 44, 20)],
+    1: lambda k: [day("Today", 70, 51, 90), day(label(2), 60 - k, 41, 40)],
+    2: lambda k: [day("Today", 60, 42, 10)],
+}
+ZIP_CODES = {"10001": 1, "10002": 1, "20002": 2}
+
+def history_frame(tmp_path):
+    with HistoryStore(str(tmp_path / "history.db")) as store:
+        for offset, scrape in SCRAPES.items():
+            for zip_code, k in ZIP_CODES.items():
+                store.append(zip_code, scrape(k), DAY0 + timedelta(days=offset, hours=7))
+        return load_history(store)
+
+def test_resolve_dates():
+    labels = pd.Series(["Today", "Tonight", label(1), label(14), "Mon 01", "Xyz 99"])
+    dates = resolve_dates(labels, pd.Series([DAY0 + timedelta(hours=20)] * len(labels)))
+    expected = [DAY0, DAY0, DAY0 + timedelta(days=1), DAY0 + timedelta(days=14), pd.NaT, pd.NaT]
+    # Nov 1 2026 is a Sunday, so "Mon 01" cannot be resolved
+    assert dates.tolist() == expected
+
+def test_scores_by_lead_day(tmp_path):
+    scores = verify(history_frame(tmp_path))
+    assert scores.index.tolist() == [1, 2]
+    assert scores["pairs"].tolist() == [6, 3]
+    # Lead 1: errors +2, +2, +4 on day 1 and -1, -1, -2 on day 2
+    assert scores.loc[1, "high_bias"] == pytest.approx(4 / 6)
+    assert scores.loc[1, "high_mae"] == pytest.approx(12 / 6)
+    assert scores.loc[2, "high_bias"] == pytest.approx((4 + 4 + 8) / 3)
+    # Rain chances of 80% and 40% ahead of a rainy and a dry day
+    assert scores.loc[1, "brier"] == pytest.approx((0.2 ** 2 + 0.4 ** 2) / 2)
+    assert scores.loc[1, "rain_rate"] == 0.5
+
+def test_scores_by_region(tmp_path):
+    scores = verify(history_frame(tmp_path), by=REGION_KEY)
+    assert scores.index.tolist() == [("100", 1), ("100", 2), ("200", 1), ("200", 2)]
+    assert scores["pairs"].tolist() == [4, 2, 2, 1]
+    assert scores.loc[("100", 1), "high_bias"] == pytest.approx(0.5)
+    assert scores.loc[("200", 1), "high_bias"] == pytest.approx(1.0)
+    assert scores.loc[("200", 2), "high_mae"] == pytest.approx(8)
+
+def test_cube_and_history_score_the_same(tmp_path):
+    with ForecastCube(str(tmp_path / "cube")) as cube:
+        for offset, scrape in SCRAPES.items():
+            for zip_code, k in ZIP_CODES.items():
+                cube.append(zip_code, scrape(k), DAY0 + timedelta(days=offset, hours=7))
+        cube_scores = verify(cube.to_frame())
+    pd.testing.assert_frame_equal(cube_scores, verify(history_frame(tmp_path)))
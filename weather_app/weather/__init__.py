@@ -0,0 +1,31 @@
+'''
+Weather package: scrapes "ten day" weather forecasts for ZIP codes from weather.com.
+Every entry point (the Flask app, `weather_farm.py`, `python -m weather` and the legacy scripts) runs the same
+`Pipeline` of swappable stages:
+
+    fetcher    fetchers.HttpFetcher, CachedFetcher or SnapshotFetcher
+    extractor  any backend in extractors.EXTRACTORS
+    parser     line_parser.FORECAST_PARSER
+    sink       sinks.CsvSink, history.HistoryStore, history.IncrementalHistoryStore or records.ForecastBatch
+
+Heavy dependencies are imported on first use, so importing the package stays cheap.
+
+'''
+
+from .fetchers import FORECAST_URL, DEFAULT_MAX_WORKERS, create_session, HttpFetcher, CachedFetcher, SnapshotFetcher
+from .forecast import (
+    validate_zip_code,
+    get_weather_forecast,
+    get_weather_forecasts,
+    extract_forecasts,
+    split_weather_line,
+    parse_forecasts_frame,
+    analyze_weather_data,
+    plot_weather_data,
+    get_parsed_forecast,
+    get_weather_data,
+    __author__,
+    __version__,
+)
+from .pipeline import Pipeline, parse_lines
+from .sinks import CsvSink, FanOutSink
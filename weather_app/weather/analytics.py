@@ -0,0 +1,468 @@
+'''
+Batch analytics over the forecasts of many ZIP codes at once.
+Everything works on one long frame with a `zip_code` column plus the forecast columns, such as `ForecastBatch.to_frame()`
+or concatenated `HistoryStore.query()` results, instead of looping over one small frame per ZIP code. Grouped statistics,
+correlations and regional rollups by ZIP prefix are vectorized reductions over integer group codes.
+
+`RunningStats` keeps mergeable count/mean/variance/co-moment accumulators per group, so new scrapes update the
+statistics without recomputing them from the whole history. It is also a pipeline sink.
+
+'''
+
+from itertools import combinations_with_replacement
+
+from .records import ForecastBatch
+
+# Numeric forecast columns that statistics and correlations are computed over
+NUMERIC_COLUMNS = ["high_temp", "low_temp", "wind_speed", "rain_chance"]
+
+# Group key computed from `zip_code` rather than read from a column: the 3-digit sectional center prefix.
+# Any other `zip<digits>` key, such as "zip2" from `RunningStats.rollup(2)`, is computed the same way
+REGION_KEY = "zip3"
+REGION_DIGITS = 3
+
+MOMENT_COLUMNS = ["n", "mean_a", "mean_b", "m2_a", "m2_b", "c"]
+
+def to_long_frame(data):
+    """
+    Args:
+        data: A long DataFrame with a `zip_code` column, a `ForecastBatch`, or a dict mapping
+            zip codes to parsed forecasts as returned by `Pipeline.run()`.
+
+    Returns:
+        df (DataFrame): One row per forecast day of every ZIP code.
+    """
+    if isinstance(data, dict):
+        data = ForecastBatch.from_forecasts(data)
+    if isinstance(data, ForecastBatch):
+        return data.to_frame()
+    return data
+
+def zip_prefix(zip_codes, digits=REGION_DIGITS):
+    """
+    Maps ZIP codes to their leading `digits` digits. Categorical input is mapped once per category instead of once per row.
+
+    Args:
+        zip_codes (Series): ZIP codes as strings or a categorical.
+        digits (int): Prefix length.
+
+    Returns:
+        prefixes (Series): Categorical series of prefixes aligned with `zip_codes`.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if not isinstance(zip_codes.dtype, pd.CategoricalDtype):
+        zip_codes = zip_codes.astype(str).astype("category")
+    prefix_codes, prefixes = pd.factorize(zip_codes.cat.categories.astype(str).str[:digits], sort=True)
+    codes = zip_codes.cat.codes.to_numpy()
+    codes = np.where(codes < 0, -1, prefix_codes[codes])
+    return pd.Series(pd.Categorical.from_codes(codes, prefixes), index=zip_codes.index, name=f"zip{digits}")
+
+def group_keys(df, by):
+    """
+    Resolves `by` into groupby keys, computing ZIP prefix keys such as `REGION_KEY` from `zip_code` when the frame
+    has no such column.
+
+    Args:
+        df (DataFrame): Long forecast frame.
+        by (str or list): Column name(s) to group on.
+
+    Returns:
+        keys (list): Series to pass to `groupby()`.
+    """
+    names = [by] if isinstance(by, str) else list(by)
+    keys = []
+    for name in names:
+        if name not in df and name.startswith("zip") and name[3:].isdigit():
+            keys.append(zip_prefix(df["zip_code"], int(name[3:])))
+        else:
+            keys.append(df[name])
+    return keys
+
+def _group_codes(df, by):
+    """
+    Returns:
+        tuple: (codes, index) with each row's integer group number (-1 for rows with a missing key) and the group labels.
+    """
+    grouped = df.groupby(group_keys(df, by), observed=True, sort=True)
+    return grouped.ngroup().to_numpy(), grouped.size().index
+
+def pair_moments(df, by="zip_code", columns=NUMERIC_COLUMNS):
+    """
+    Computes the per-group moments behind means, variances and correlations. Each pair of columns only uses
+    the rows where both are present, as `DataFrame.corr()` does.
+
+    Args:
+        df (DataFrame): Long forecast frame.
+        by (str or list): Column name(s) to group on, or `REGION_KEY`.
+        columns (list): Numeric columns.
+
+    Returns:
+        moments (dict): Mapping of each (column_a, column_b) pair, including a column with itself, to a DataFrame
+        indexed by group with the row count `n`, the means `mean_a`/`mean_b`, the sums of squared deviations
+        `m2_a`/`m2_b` and the co-moment `c`.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, index = _group_codes(df, by)
+    keep = codes >= 0
+    codes = codes[keep]
+    values = {column: df[column].to_numpy(dtype="float64", na_value=np.nan)[keep] for column in columns}
+    present = {column: ~np.isnan(values[column]) for column in columns}
+
+    def sums(weights):
+        return np.bincount(codes, weights=weights, minlength=len(index))
+
+    moments = {}
+    for a, b in combinations_with_replacement(columns, 2):
+        valid = present[a] & present[b]
+        xa = np.where(valid, values[a], 0.0)
+        xb = np.where(valid, values[b], 0.0)
+        n = sums(valid.astype("float64"))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_a = np.where(n > 0, sums(xa) / n, 0.0)
+            mean_b = np.where(n > 0, sums(xb) / n, 0.0)
+        # Deviations from the group mean rather than raw sums of squares, which lose precision on large groups
+        da = np.where(valid, xa - mean_a[codes], 0.0)
+        db = np.where(valid, xb - mean_b[codes], 0.0)
+        moments[(a, b)] = pd.DataFrame({
+            "n": n, "mean_a": mean_a, "mean_b": mean_b, "m2_a": sums(da * da), "m2_b": sums(db * db), "c": sums(da * db),
+        }, index=index)
+    return moments
+
+def merge_moments(left, right):
+    """
+    Combines the moments of two disjoint sets of rows group by group (Chan et al. parallel update).
+
+    Args:
+        left (DataFrame): Moments of one pair of columns, as in `pair_moments()`.
+        right (DataFrame): Moments of the same pair over other rows.
+
+    Returns:
+        merged (DataFrame): Moments over the rows of both, indexed by the union of their groups.
+    """
+    import numpy as np
+
+    index = left.index.union(right.index)
+    left = left.reindex(index, fill_value=0.0)
+    right = right.reindex(index, fill_value=0.0)
+    n = left["n"] + right["n"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = (right["n"] / n).fillna(0.0)
+        weight = (left["n"] * right["n"] / n).fillna(0.0)
+    delta_a = right["mean_a"] - left["mean_a"]
+    delta_b = right["mean_b"] - left["mean_b"]
+    merged = left.copy()
+    merged["n"] = n
+    merged["mean_a"] = left["mean_a"] + delta_a * share
+    merged["mean_b"] = left["mean_b"] + delta_b * share
+    merged["m2_a"] = left["m2_a"] + right["m2_a"] + delta_a * delta_a * weight
+    merged["m2_b"] = left["m2_b"] + right["m2_b"] + delta_b * delta_b * weight
+    merged["c"] = left["c"] + right["c"] + delta_a * delta_b * weight
+    return merged
+
+def rollup_moments(moments, keys):
+    """
+    Combines the moments of groups that share a key, e.g. every ZIP code of a ZIP3 region.
+
+    Args:
+        moments (DataFrame): Moments of one pair of columns indexed by group.
+        keys (Series or array): Coarser group of each row of `moments`.
+
+    Returns:
+        rolled (DataFrame): Moments indexed by the coarser groups.
+    """
+    import numpy as np
+
+    grouped = moments.groupby(keys, observed=True, sort=True)
+    n = grouped["n"].sum()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_a = ((moments["n"] * moments["mean_a"]).groupby(keys, observed=True, sort=True).sum() / n).fillna(0.0)
+        mean_b = ((moments["n"] * moments["mean_b"]).groupby(keys, observed=True, sort=True).sum() / n).fillna(0.0)
+    # Within-group moments plus the spread of each group's mean around the combined mean
+    da = moments["mean_a"] - mean_a.reindex(keys).to_numpy()
+    db = moments["mean_b"] - mean_b.reindex(keys).to_numpy()
+    spread = moments.assign(
+        m2_a=moments["m2_a"] + moments["n"] * da * da,
+        m2_b=moments["m2_b"] + moments["n"] * db * db,
+        c=moments["c"] + moments["n"] * da * db,
+    )[["m2_a", "m2_b", "c"]].groupby(keys, observed=True, sort=True).sum()
+    return spread.assign(n=n, mean_a=mean_a, mean_b=mean_b)[MOMENT_COLUMNS]
+
+def moments_to_stats(moments, columns=NUMERIC_COLUMNS):
+    """
+    Returns:
+        stats (DataFrame): Per group `count`, `mean` and sample `std` of each column, with (column, statistic) columns.
+    """
+    import numpy as np
+    import pandas as pd
+
+    stats = {}
+    for column in columns:
+        diagonal = moments[(column, column)]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(diagonal["m2_a"] / (diagonal["n"] - 1)).where(diagonal["n"] > 1)
+        stats[(column, "count")] = diagonal["n"].astype("int64")
+        stats[(column, "mean")] = diagonal["mean_a"].where(diagonal["n"] > 0)
+        stats[(column, "std")] = std
+    return pd.DataFrame(stats)
+
+def moments_to_correlations(moments, columns=NUMERIC_COLUMNS):
+    """
+    Returns:
+        correlations (DataFrame): Pearson correlation matrix of each group, stacked like `groupby(...).corr()`,
+        with (group, column) rows and one column per numeric column.
+    """
+    import numpy as np
+    import pandas as pd
+
+    index = moments[(columns[0], columns[0])].index
+    matrix = np.full((len(index), len(columns), len(columns)), np.nan)
+    for (a, b), pair in moments.items():
+        pair = pair.reindex(index)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            r = (pair["c"] / np.sqrt(pair["m2_a"] * pair["m2_b"])).to_numpy()
+        i, j = columns.index(a), columns.index(b)
+        matrix[:, i, j] = matrix[:, j, i] = np.clip(r, -1.0, 1.0)
+
+    groups = [group if isinstance(group, tuple) else (group,) for group in index]
+    rows = pd.MultiIndex.from_tuples([group + (column,) for group in groups for column in columns], names=list(index.names) + [None])
+    return pd.DataFrame(matrix.reshape(-1, len(columns)), index=rows, columns=columns)
+
+def grouped_stats(data, by="zip_code", columns=NUMERIC_COLUMNS):
+    """
+    Summary statistics of every group in one pass, replacing a `describe()` call per ZIP code.
+
+    Args:
+        data: Long frame, `ForecastBatch` or dict of parsed forecasts (see `to_long_frame()`).
+        by (str or list): Column name(s) to group on, or `REGION_KEY` for ZIP3 regions.
+        columns (list): Numeric columns to summarize.
+
+    Returns:
+        stats (DataFrame): One row per group with (column, statistic) columns for count, mean, std, min and max.
+    """
+    df = to_long_frame(data)
+    values = df[columns].astype("float64")
+    return values.groupby(group_keys(df, by), observed=True, sort=True).agg(["count", "mean", "std", "min", "max"])
+
+def grouped_correlations(data, by="zip_code", columns=NUMERIC_COLUMNS):
+    """
+    Correlation matrix of every group, matching `df.groupby(by)[columns].corr()` without a Python-level loop over groups.
+
+    Args:
+        data: Long frame, `ForecastBatch` or dict of parsed forecasts (see `to_long_frame()`).
+        by (str or list): Column name(s) to group on, or `REGION_KEY` for ZIP3 regions.
+        columns (list): Numeric columns to correlate.
+
+    Returns:
+        correlations (DataFrame): Stacked correlation matrices with (group, column) rows.
+    """
+    return moments_to_correlations(pair_moments(to_long_frame(data), by, columns), columns)
+
+def regional_rollup(data, digits=REGION_DIGITS, columns=NUMERIC_COLUMNS):
+    """
+    Rolls forecasts up to ZIP prefix regions.
+
+    Args:
+        data: Long frame, `ForecastBatch` or dict of parsed forecasts (see `to_long_frame()`).
+        digits (int): ZIP prefix length that defines a region.
+        columns (list): Numeric columns to summarize.
+
+    Returns:
+        rollup (DataFrame): One row per region with the number of ZIP codes and forecast days,
+        the share of days with a rain chance of 50% or more, and the mean and std of each column.
+    """
+    df = to_long_frame(data)
+    region = zip_prefix(df["zip_code"], digits)
+    grouped = df.assign(rainy=df["rain_chance"] >= 50).groupby(region, observed=True, sort=True)
+    rollup = grouped.agg(zip_codes=("zip_code", "nunique"), days=("zip_code", "size"), rainy_share=("rainy", "mean"))
+    stats = df[columns].astype("float64").groupby(region, observed=True, sort=True).agg(["mean", "std"])
+    stats.columns = [f"{column}_{stat}" for column, stat in stats.columns]
+    return rollup.join(stats)
+
+def analyze_forecasts(data, digits=REGION_DIGITS):
+    """
+    Prints per ZIP code statistics, the regional rollup and regional correlations of a multi-ZIP scrape.
+    The batch counterpart of `analyze_weather_data()`.
+
+    Args:
+        data: Long frame, `ForecastBatch` or dict of parsed forecasts (see `to_long_frame()`).
+        digits (int): ZIP prefix length that defines a region.
+    """
+    df = to_long_frame(data)
+    print("\nPer ZIP Code Statistics:")
+    print(grouped_stats(df))
+
+    print(f"\nRegional Rollup (ZIP{digits}):")
+    print(regional_rollup(df, digits))
+
+    print(f"\nRegional Correlation Matrices (ZIP{digits}):")
+    region = f"zip{digits}"
+    print(grouped_correlations(df.assign(**{region: zip_prefix(df["zip_code"], digits)}), region))
+
+class RunningStats:
+    """
+    Incrementally maintained per-group count, mean, variance, min/max and correlation of the numeric forecast columns.
+    Each `update()` reduces only the new rows and merges them into the stored moments, so statistics over a growing
+    history never need the old rows again. Also usable as a pipeline sink: appended forecasts are buffered
+    and folded in on `flush()`.
+    """
+
+    def __init__(self, by="zip_code", columns=NUMERIC_COLUMNS):
+        """
+        Args:
+            by (str or list): Column name(s) to group on, or `REGION_KEY` (any `zip<digits>`) for ZIP prefix regions.
+            columns (list): Numeric columns to track.
+        """
+        self.by = by
+        self.columns = list(columns)
+        self.moments = {}
+        self.extremes = None
+        # Categories of each categorical group key, in the order a groupby over every row seen so far lists them
+        self.categories = None
+        self.rows = 0
+        self._pending = ForecastBatch()
+
+    def update(self, data):
+        """
+        Folds new forecast rows into the accumulators.
+
+        Args:
+            data: Long frame, `ForecastBatch` or dict of parsed forecasts (see `to_long_frame()`).
+        """
+        import pandas as pd
+
+        df = to_long_frame(data)
+        if len(df) == 0:
+            return
+        keys = group_keys(df, self.by)
+        moments = pair_moments(df, self.by, self.columns)
+        extremes = df[self.columns].astype("float64").groupby(keys, observed=True, sort=True).agg(["min", "max"])
+        self._merge(moments, extremes, [list(key.cat.categories) if isinstance(key.dtype, pd.CategoricalDtype) else None for key in keys])
+        self.rows += len(df)
+
+    def _merge(self, moments, extremes, categories):
+        import numpy as np
+
+        if self.categories is None:
+            self.categories = categories
+        else:
+            merged = []
+            for name, seen, new in zip(self.moments[(self.columns[0], self.columns[0])].index.names, self.categories, categories):
+                if seen is None or new is None:
+                    merged.append(None)
+                    continue
+                seen_set = set(seen)
+                seen = seen + [category for category in new if category not in seen_set]
+                # ZIP prefix regions are factorized in sorted order
+                merged.append(sorted(seen) if name is not None and name.startswith("zip") and name[3:].isdigit() else seen)
+            self.categories = merged
+        for pair, batch in moments.items():
+            self.moments[pair] = merge_moments(self.moments[pair], batch) if pair in self.moments else batch
+        if self.extremes is None:
+            self.extremes = extremes
+        else:
+            index = self.extremes.index.union(extremes.index)
+            old, new = self.extremes.reindex(index), extremes.reindex(index)
+            merged = old.copy()
+            for column in self.columns:
+                merged[(column, "min")] = np.fmin(old[(column, "min")], new[(column, "min")])
+                merged[(column, "max")] = np.fmax(old[(column, "max")], new[(column, "max")])
+            self.extremes = merged
+
+    def merge(self, other):
+        """
+        Folds in the accumulators of another `RunningStats` over different rows, e.g. from another worker process.
+        """
+        if other.moments:
+            self._merge(other.moments, other.extremes, other.categories)
+        self.rows += other.rows
+
+    def append(self, zip_code, parsed_forecasts, scrape_time=None):
+        self._pending.append(zip_code, parsed_forecasts)
+
+    def flush(self):
+        pending, self._pending = self._pending, ForecastBatch()
+        self.update(pending)
+
+    def stats(self):
+        """
+        Returns:
+            stats (DataFrame): The same layout as `grouped_stats()` over every row seen so far.
+        """
+        import pandas as pd
+
+        if not self.moments:
+            return pd.DataFrame()
+        moments, extremes = self._ordered()
+        stats = moments_to_stats(moments, self.columns).join(extremes)
+        return stats[[(column, stat) for column in self.columns for stat in ["count", "mean", "std", "min", "max"]]]
+
+    def correlations(self):
+        """
+        Returns:
+            correlations (DataFrame): The same layout as `grouped_correlations()` over every row seen so far.
+        """
+        import pandas as pd
+
+        if not self.moments:
+            return pd.DataFrame()
+        return moments_to_correlations(self._ordered()[0], self.columns)
+
+    def _ordered(self):
+        """
+        Merged groups come out in the order of an index union, so sort them back into groupby order:
+        categorical keys by their categories, any other key by value.
+
+        Returns:
+            tuple: (moments, extremes) reordered, with categorical index levels like `grouped_stats()`.
+        """
+        import numpy as np
+        import pandas as pd
+
+        index = self.moments[(self.columns[0], self.columns[0])].index
+        levels = []
+        sort_keys = []
+        for i, categories in enumerate(self.categories):
+            level = index.get_level_values(i)
+            if categories is None:
+                sort_keys.append(pd.factorize(level, sort=True)[0])
+            else:
+                level = pd.CategoricalIndex(level, categories=categories, name=level.name)
+                sort_keys.append(level.codes)
+            levels.append(level)
+        order = np.lexsort(sort_keys[::-1])
+        ordered = (levels[0] if len(levels) == 1 else pd.MultiIndex.from_arrays(levels))[order]
+
+        moments = {pair: frame.reindex(index).iloc[order].set_axis(ordered) for pair, frame in self.moments.items()}
+        return moments, self.extremes.reindex(index).iloc[order].set_axis(ordered)
+
+    def rollup(self, digits=REGION_DIGITS):
+        """
+        Combines per ZIP code accumulators into ZIP prefix regions without revisiting any rows. The result is grouped
+        by `zip<digits>`, so later updates and merges keep adding to the same regions.
+
+        Args:
+            digits (int): ZIP prefix length that defines a region.
+
+        Returns:
+            regional (RunningStats): Accumulators keyed by region.
+        """
+        import pandas as pd
+
+        if self.by != "zip_code":
+            raise ValueError(f"Only accumulators grouped by zip_code can be rolled up, not {self.by!r}")
+        regional = RunningStats(f"zip{digits}", self.columns)
+        regional.rows = self.rows
+        if not self.moments:
+            return regional
+        index = self.moments[(self.columns[0], self.columns[0])].index
+        keys = zip_prefix(pd.Series(index.astype(str), index=index), digits)
+        for pair, moments in self.moments.items():
+            regional.moments[pair] = rollup_moments(moments, keys)
+        regional.categories = [list(keys.cat.categories)]
+        # Extremes columns are (column, "min") and (column, "max"), so each is reduced by its own statistic
+        regional.extremes = self.extremes.groupby(keys, observed=True, sort=True).agg({column: column[1] for column in self.extremes.columns})
+        return regional
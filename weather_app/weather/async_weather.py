@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+'''
+Asynchronous version of the fetch and parse pipeline in `pipeline.py` for sweeping large lists of ZIP codes.
+Requests run on a shared aiohttp session with a concurrency limit per host and backoff on throttled or failed responses,
+while HTML extraction runs in an executor so the event loop never blocks on parsing.
+
+'''
+
+import asyncio
+import sys
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from .forecast import FORECAST_URL, extract_forecasts, split_weather_line
+from .metrics import stage_timer, summary, BYTES_DOWNLOADED, UPSTREAM_RESPONSES
+from .resilience import UPSTREAM, RETRY_STATUSES, DEFAULT_MAX_RETRIES, DEFAULT_BACKOFF, backoff_delay
+from .sinks import CsvSink
+
+DEFAULT_HOST_LIMIT = 32
+
+class HostLimiter:
+    """
+    Hands out one semaphore per host so each upstream gets its own concurrency limit.
+    """
+
+    def __init__(self, limit=DEFAULT_HOST_LIMIT):
+        self.limit = limit
+        self._semaphores = {}
+
+    def get(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.limit)
+        return self._semaphores[host]
+
+async def async_fetch_page(session, url, limiter, max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF, upstream=UPSTREAM):
+    """
+    Downloads a page, retrying with jittered exponential backoff on 429 and 5xx responses.
+    Shares the rate limit, retry budget and circuit breaker of `upstream` with the synchronous fetchers.
+
+    Args:
+        session (ClientSession): Shared aiohttp session.
+        url (str): Page to download.
+        limiter (HostLimiter): Per-host concurrency limiter.
+        max_retries (int): Number of retries after the first attempt.
+        backoff (float): Base backoff delay in seconds.
+        upstream (ResilientFetcher): Rate limit, retry budget and circuit breaker to respect.
+
+    Returns:
+        content (bytes): Raw response body.
+
+    Raises:
+        CircuitOpenError: If weather.com has been failing and the circuit breaker is open.
+    """
+    upstream.retry_budget.record_request()
+    for attempt in range(max_retries + 1):
+        wait = upstream.bucket.try_acquire() if upstream.bucket is not None else 0
+        while wait:
+            await asyncio.sleep(wait)
+            wait = upstream.bucket.try_acquire()
+        upstream.breaker.before_request()
+
+        # Only hold the host slot while the request is in flight, not while backing off
+        retry_after = None
+        settled = False
+        try:
+            async with limiter.get(url):
+                with stage_timer("fetch"):
+                    async with session.get(url) as response:
+                        UPSTREAM_RESPONSES.inc(status=response.status)
+                        settled = True
+                        if response.status not in RETRY_STATUSES:
+                            upstream.breaker.record_success()
+                            response.raise_for_status()
+                            content = await response.read()
+                            BYTES_DOWNLOADED.inc(len(content))
+                            return content
+                        upstream.breaker.record_failure()
+                        if not upstream.may_retry(attempt, max_retries):
+                            response.raise_for_status()
+                        retry_after = response.headers.get("Retry-After")
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            UPSTREAM_RESPONSES.inc(status="error")
+            upstream.breaker.record_failure()
+            if not upstream.may_retry(attempt, max_retries):
+                raise
+        except aiohttp.ClientError:
+            # Upstream failed in some other way before answering; not worth retrying
+            if not settled:
+                UPSTREAM_RESPONSES.inc(status="error")
+                upstream.breaker.record_failure()
+            raise
+        except BaseException:
+            # Local errors and cancellation say nothing about upstream, but must still free a half-open probe
+            if not settled:
+                upstream.breaker.release()
+            raise
+        await asyncio.sleep(backoff_delay(attempt, retry_after, backoff))
+
+async def async_get_weather_forecast(session, zip_code, limiter, executor=None, url_template=FORECAST_URL, **fetch_options):
+    """
+    Asynchronously retrieves and parses the weather forecast for a given zip code.
+
+    Args:
+        session (ClientSession): Shared aiohttp session.
+        zip_code (str): 5-digit zip code.
+        limiter (HostLimiter): Per-host concurrency limiter.
+        executor (Executor): Executor used for HTML parsing. Defaults to the event loop's default executor.
+        url_template (str): Forecast URL with a `{zip_code}` placeholder.
+
+    Returns:
+        parsed_forecasts (list): A list of dictionaries as returned by `split_weather_line()`.
+    """
+    content = await async_fetch_page(session, url_template.format(zip_code=zip_code), limiter, **fetch_options)
+
+    loop = asyncio.get_running_loop()
+    forecasts = await loop.run_in_executor(executor, extract_forecasts, content)
+    return split_weather_line(forecasts)
+
+def create_client_session(host_limit=DEFAULT_HOST_LIMIT, timeout=30):
+    """
+    Creates a keep-alive aiohttp session whose connector matches the per-host limit.
+
+    Args:
+        host_limit (int): Maximum concurrent connections per host.
+        timeout (float): Total timeout in seconds for a single request.
+
+    Returns:
+        session (ClientSession): Session to share across forecast requests.
+    """
+    connector = aiohttp.TCPConnector(limit=0, limit_per_host=host_limit, keepalive_timeout=60, ttl_dns_cache=300)
+    return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout))
+
+async def async_generate_weather_files(zip_codes, host_limit=DEFAULT_HOST_LIMIT, executor=None, url_template=FORECAST_URL, history=None, **fetch_options):
+    """
+    Fetches, parses and writes a CSV file for every zip code concurrently.
+
+    Args:
+        zip_codes (list): 5-digit zip codes to process.
+        host_limit (int): Maximum concurrent requests per host.
+        executor (Executor): Executor used for HTML parsing and CSV writing.
+        url_template (str): Forecast URL with a `{zip_code}` placeholder.
+        history (HistoryStore): Optional history store. When given, forecasts are appended to it instead of written as CSV files.
+
+    Returns:
+        tuple: (csv_filenames, errors) mapping each zip code to its CSV filename (or history store path) or to the exception it raised.
+    """
+    csv_sink = CsvSink()
+    limiter = HostLimiter(host_limit)
+    loop = asyncio.get_running_loop()
+
+    async def process(session, zip_code):
+        parsed_forecasts = await async_get_weather_forecast(session, zip_code, limiter, executor, url_template, **fetch_options)
+        if history is not None:
+            history.append(zip_code, parsed_forecasts)
+            return history.path
+        await loop.run_in_executor(executor, csv_sink.append, zip_code, parsed_forecasts)
+        return csv_sink.path(zip_code)
+
+    zip_codes = list(dict.fromkeys(zip_codes))
+    async with create_client_session(host_limit) as session:
+        outcomes = await asyncio.gather(*(process(session, zip_code) for zip_code in zip_codes), return_exceptions=True)
+    if history is not None:
+        history.flush()
+
+    csv_filenames = {}
+    errors = {}
+    for zip_code, outcome in zip(zip_codes, outcomes):
+        if isinstance(outcome, Exception):
+            errors[zip_code] = outcome
+        else:
+            csv_filenames[zip_code] = outcome
+    return csv_filenames, errors
+
+if __name__ == "__main__":
+    # ZIP codes are read one per line from the file given as the first argument, or from stdin
+    source = open(sys.argv[1]) if len(sys.argv) > 1 else sys.stdin
+    zip_codes = [line.strip() for line in source if line.strip()]
+
+    csv_filenames, errors = asyncio.run(async_generate_weather_files(zip_codes))
+    print(f"Files generated for {len(csv_filenames)} ZIP codes, {len(errors)} failed")
+    for zip_code, error in errors.items():
+        print(f"{zip_code}: {error}")
+    print(summary())
@@ -0,0 +1,232 @@
+'''
+TTL forecast cache keyed on ZIP code with LRU eviction and request coalescing.
+Ships an in-process backend and a SQLite backend that can be shared by several gunicorn workers.
+
+'''
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+DEFAULT_TTL = 900
+DEFAULT_MAX_ENTRIES = 10000
+
+class MemoryBackend:
+    """
+    In-process LRU store of (value, stored_at) pairs.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, stored_at):
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+class SqliteBackend:
+    """
+    On-disk LRU store backed by a SQLite file, safe to share between processes.
+    Values are stored as JSON, so they must be JSON serializable. Reads never write: the access times of hits are
+    collected in memory and written with the next `set()`, the only place they matter as it evicts the oldest entries.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._local = threading.local()
+        self._accessed = {}
+        self._accessed_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS forecast_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS forecast_cache_accessed ON forecast_cache (accessed_at)")
+
+    def _connect(self):
+        # SQLite connections cannot be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute("SELECT value, stored_at FROM forecast_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self._accessed_lock:
+            self._accessed[key] = time.time()
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, stored_at):
+        with self._accessed_lock:
+            accessed, self._accessed = self._accessed, {}
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE forecast_cache SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, accessed_key) for accessed_key, accessed_at in accessed.items()],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO forecast_cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), stored_at, time.time()),
+            )
+            overflow = conn.execute("SELECT COUNT(*) FROM forecast_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM forecast_cache WHERE key IN "
+                    "(SELECT key FROM forecast_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM forecast_cache WHERE key = ?", (key,))
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM forecast_cache").fetchone()[0]
+
+class ForecastCache:
+    """
+    Read-through cache in front of a forecast loader such as `get_parsed_forecast()`.
+    Concurrent misses for the same key within a process are coalesced into a single call to the loader.
+    """
+
+    def __init__(self, loader, backend=None, ttl=DEFAULT_TTL):
+        self.loader = loader
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached value for `key`, calling the loader if it is missing or older than the TTL.
+
+        Args:
+            key (str): Cache key, normally a 5-digit zip code.
+
+        Returns:
+            value: Value produced by the loader.
+        """
+        entry = self.backend.get(key)
+        if entry is not None and time.time() - entry[1] < self.ttl:
+            with self._lock:
+                self.hits += 1
+            return entry[0]
+
+        with self._lock:
+            self.misses += 1
+        return self.refresh(key, max_age=self.ttl)
+
+    def lookup(self, key, max_age=None):
+        """
+        Returns the cached value for `key` even if it is past the TTL, without calling the loader.
+
+        Args:
+            key (str): Cache key, normally a 5-digit zip code.
+            max_age (float): Optional age in seconds beyond which the entry counts as missing.
+
+        Returns:
+            tuple: (value, age) with the entry's age in seconds, or None if nothing usable is cached.
+        """
+        entry = self.backend.get(key)
+        age = time.time() - entry[1] if entry is not None else None
+        with self._lock:
+            if age is None or (max_age is not None and age > max_age):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry[0], age
+
+    def age(self, key):
+        """
+        Returns:
+            age (float): Seconds since `key` was last loaded, or None if nothing is cached.
+        """
+        entry = self.backend.get(key)
+        return time.time() - entry[1] if entry is not None else None
+
+    def refresh(self, key, max_age=None):
+        """
+        Calls the loader for `key` and stores the result, joining a load that is already in flight for the same key.
+
+        Args:
+            key (str): Cache key, normally a 5-digit zip code.
+            max_age (float): Optional age in seconds under which a cached entry is returned instead of loading,
+                e.g. one stored by a load that finished after the caller found the entry stale.
+
+        Returns:
+            value: Value produced by the loader.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        # Followers wait for the leader's fetch instead of hitting upstream themselves
+        if not leader:
+            return future.result()
+
+        try:
+            # Checked after taking the lead, as an earlier leader stores its value before it leaves `_inflight`
+            entry = self.backend.get(key) if max_age is not None else None
+            if entry is not None and time.time() - entry[1] < max_age:
+                value = entry[0]
+            else:
+                value = self.loader(key)
+                self.backend.set(key, value, time.time())
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def invalidate(self, key):
+        self.backend.delete(key)
+
+    def stats(self):
+        """
+        Returns:
+            stats (dict): Hit, miss and eviction counters plus the current number of entries.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "entries": len(self.backend),
+        }
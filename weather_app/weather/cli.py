@@ -0,0 +1,127 @@
+'''
+Command line entry point of the weather package: scrapes one or more ZIP codes through a `Pipeline`,
+writes the `weather_forecast_[ZIP_CODE]_[DATE].csv` and `temperature_plot_[ZIP_CODE]_[DATE].png` files
+and prints the analysis. `weather_analysis/weather.py` and `weather_API/weather0.9.2.py` wrap this module.
+
+Usage: python -m weather [ZIP_CODE ...] [--out DIR] [--extractor NAME] [--history DB [--incremental]] [--cube DIR] [--locations DB]
+
+'''
+
+import argparse
+import os
+
+from .extractors import EXTRACTORS
+from .fetchers import FORECAST_URL, DEFAULT_MAX_WORKERS, HttpFetcher, create_session
+from .forecast import validate_zip_code, analyze_weather_data, plot_weather_data
+from .locations import LocationMap
+from .metrics import summary
+from .pipeline import Pipeline
+from .sinks import CsvSink, FanOutSink
+
+def write_plot(parsed_forecasts, path):
+    """
+    Renders the temperature plot of one ZIP code's parsed forecasts to a PNG file.
+
+    Args:
+        parsed_forecasts (list): A list of dictionaries as returned by `split_weather_line()`.
+        path (str): File to write the PNG image to.
+    """
+    import pandas as pd
+
+    with open(path, "wb") as f:
+        f.write(plot_weather_data(pd.DataFrame(parsed_forecasts)))
+
+def generate_weather_files(zip_code, directory=".", pipeline=None):
+    """
+    Generates both CSV and PNG files with dynamic names based on zip code and date.
+
+    Args:
+        zip_code (str): 5-digit zip code
+        directory (str): Directory to write the files to.
+        pipeline (Pipeline): Optional pipeline to scrape with. Defaults to a live weather.com pipeline.
+
+    Returns:
+        tuple: (csv_filename, plot_filename)
+    """
+    sink = CsvSink(directory)
+    parsed_forecasts = (pipeline or Pipeline()).parse(zip_code)
+    sink.append(zip_code, parsed_forecasts)
+
+    plot_filename = os.path.join(directory, f"temperature_plot_{zip_code}_{sink.date}.png")
+    write_plot(parsed_forecasts, plot_filename)
+    return sink.path(zip_code), plot_filename
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="weather", description="Scrape ten day weather.com forecasts into CSV files and plots.")
+    parser.add_argument("zip_codes", nargs="*", help="5-digit ZIP codes, prompted for if omitted")
+    parser.add_argument("--out", default=".", help="Directory to write the CSV and PNG files to")
+    parser.add_argument("--extractor", choices=sorted(EXTRACTORS), help="HTML extraction backend (default: WEATHER_EXTRACTOR, else the fastest installed of selectolax, lxml and stream)")
+    parser.add_argument("--url-template", default=FORECAST_URL, help="Forecast URL with a {zip_code} placeholder")
+    parser.add_argument("--history", help="Also append the forecasts to this history store SQLite file")
+    parser.add_argument("--incremental", action="store_true", help="Only store forecast days that changed since the last scrape")
+    parser.add_argument("--cube", help="Also write the forecasts to this memory-mapped forecast cube directory")
+    parser.add_argument("--locations", help="ZIP code to forecast location SQLite file, so ZIP codes sharing a location are fetched once")
+    parser.add_argument("--location-table", help="CSV file of zip_code,location_key rows to load into the location map")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Concurrent requests")
+    parser.add_argument("--no-analysis", action="store_true", help="Skip the printed statistics and the plots")
+    args = parser.parse_args(argv)
+
+    zip_codes = args.zip_codes or [input("Enter 5-digit zip code: ").strip()]
+    invalid = [zip_code for zip_code in zip_codes if not validate_zip_code(zip_code)]
+    if invalid:
+        parser.error(f"invalid ZIP code(s): {', '.join(invalid)}")
+
+    csv_sink = CsvSink(args.out)
+    sinks = [csv_sink]
+    if args.history:
+        from .history import HistoryStore, IncrementalHistoryStore
+
+        sinks.append(IncrementalHistoryStore(args.history) if args.incremental else HistoryStore(args.history))
+    if args.cube:
+        from .cube import ForecastCube
+
+        sinks.append(ForecastCube(args.cube))
+    sink = FanOutSink(sinks) if len(sinks) > 1 else csv_sink
+
+    locations = None
+    if args.locations or args.location_table:
+        locations = LocationMap(args.locations)
+        if args.location_table:
+            locations.load_table(args.location_table)
+
+    session = create_session(args.workers)
+    pipeline = Pipeline(HttpFetcher(session, args.url_template), args.extractor, sink=sink, locations=locations)
+    try:
+        results, errors = pipeline.run(zip_codes, max_workers=args.workers)
+    finally:
+        session.close()
+
+    for zip_code in zip_codes:
+        if zip_code in errors:
+            print(f"Error: {zip_code}: {errors[zip_code]}")
+            continue
+        if zip_code not in results:
+            continue
+        print(f"\nData saved to {csv_sink.path(zip_code)}")
+        if args.no_analysis:
+            continue
+
+        import pandas as pd
+
+        df = pd.DataFrame(results[zip_code])
+        print("\nWeather Forecast DataFrame:")
+        print(df)
+        # Several ZIP codes are analyzed together below rather than one frame at a time
+        if len(results) == 1:
+            analyze_weather_data(df)
+        plot_filename = os.path.join(args.out, f"temperature_plot_{zip_code}_{csv_sink.date}.png")
+        write_plot(results[zip_code], plot_filename)
+        print(f"Plot saved as {plot_filename}")
+
+    if len(results) > 1 and not args.no_analysis:
+        from .analytics import analyze_forecasts
+
+        analyze_forecasts(results)
+
+    print(f"\n{summary()}")
+    return 1 if errors else 0
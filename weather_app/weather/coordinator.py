@@ -0,0 +1,268 @@
+'''
+Distributed sweep coordinator for ZIP code sweeps that outgrow one host.
+
+The ZIP universe is split into work units on a queue backend from `queues`: a SQLite file for tests and single host
+sweeps, or Redis for workers on several hosts. Workers lease one unit at a time, scrape it through the usual
+`Pipeline` while a heartbeat renews the lease, and post the parsed forecasts back to the queue. A unit whose worker
+dies is leased again once its lease runs out. A single coordinator drains completed units into the history store and
+cube. Each unit's result carries the scrape time it was fetched at, and only the first completion of a unit is
+accepted, so writing a result again after a coordinator crash stores the same rows rather than new ones. A unit the
+history store or cube rejects is marked dead rather than holding up the units behind it.
+`progress()` reports the queue state and the throughput of every worker.
+
+Usage: python weather_sweep.py {submit,work,drain,progress} QUEUE ...
+
+'''
+
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from .fetchers import FORECAST_URL, HttpFetcher, create_session
+from .farm import DEFAULT_THREADS_PER_WORKER, DEFAULT_CHUNK_SIZE
+from .locations import LocationMap
+from .pipeline import Pipeline
+from .queues import DEFAULT_LEASE_SECONDS
+from .resilience import ResilientFetcher, DEFAULT_RATE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_DRAIN_BATCH = 100
+
+def plan_units(zip_codes, unit_size=DEFAULT_CHUNK_SIZE, locations=None, sweep="sweep"):
+    """
+    Splits ZIP codes into work units of `unit_size` forecast locations, keeping the ZIP codes of one location together
+    so each location is fetched once in the whole sweep.
+
+    Args:
+        zip_codes (list): 5-digit zip codes, duplicates allowed.
+        unit_size (int): Locations (ZIP codes without a location map) per unit.
+        locations (LocationMap): Optional location map to group ZIP codes by.
+        sweep (str): Name of the sweep, the prefix of the unit ids.
+
+    Returns:
+        units (dict): Mapping of unit id to its list of ZIP codes. The same input always gives the same units.
+    """
+    if locations is not None:
+        groups = list(locations.plan(zip_codes).values())
+    else:
+        groups = [[zip_code] for zip_code in dict.fromkeys(zip_codes)]
+    return {
+        f"{sweep}-{index:06d}": [zip_code for group in groups[start:start + unit_size] for zip_code in group]
+        for index, start in enumerate(range(0, len(groups), unit_size))
+    }
+
+def default_worker_id():
+    """
+    Returns:
+        worker_id (str): `host:pid` of the calling process.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+@contextmanager
+def heartbeat(work_queue, lease, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Renews a lease from a background thread every third of `lease_seconds` until the block exits.
+
+    Yields:
+        lost (Event): Set once a renewal finds the lease expired, i.e. the unit may already be leased elsewhere.
+    """
+    stop = threading.Event()
+    lost = threading.Event()
+
+    def renew():
+        while not stop.wait(lease_seconds / 3):
+            try:
+                held = work_queue.renew(lease, lease_seconds)
+            except Exception as e:
+                # A missed renewal is retried on the next beat; the lease only runs out after several in a row
+                logger.warning(f"Renewing lease of {lease.unit_id} failed: {e}")
+                continue
+            if not held:
+                lost.set()
+                return
+
+    thread = threading.Thread(target=renew, name=f"heartbeat-{lease.unit_id}", daemon=True)
+    thread.start()
+    try:
+        yield lost
+    finally:
+        stop.set()
+        thread.join()
+
+def sweep_worker(work_queue, worker_id=None, threads=DEFAULT_THREADS_PER_WORKER, url_template=FORECAST_URL, rate=DEFAULT_RATE,
+                 lease_seconds=DEFAULT_LEASE_SECONDS, locations_path=None, poll_interval=DEFAULT_POLL_INTERVAL, max_units=None):
+    """
+    Leases and scrapes work units until the queue has no pending or leased units left.
+
+    Args:
+        work_queue: Queue backend such as `SqliteQueue` or `RedisQueue`.
+        worker_id (str): Name shown in the progress view. Defaults to `host:pid`.
+        threads (int): Concurrent requests within this worker.
+        url_template (str): Forecast URL with a `{zip_code}` placeholder.
+        rate (float): Requests per second this worker may send upstream, 0 for no limit.
+        lease_seconds (float): Lease duration; the lease is renewed while the unit is being scraped.
+        locations_path (str): Optional `LocationMap` SQLite file, to learn and persist locations from fetched pages.
+        poll_interval (float): Seconds to wait before asking again while other workers hold the remaining units,
+            and before the next lease after a unit in which every ZIP code failed.
+        max_units (int): Optional number of units after which to stop.
+
+    Returns:
+        completed (int): Number of units whose result the queue accepted.
+    """
+    worker_id = worker_id or default_worker_id()
+    locations = LocationMap(locations_path) if locations_path else None
+    session = create_session(threads)
+    pipeline = Pipeline(HttpFetcher(session, url_template, ResilientFetcher(rate=rate)), locations=locations)
+    completed = 0
+    try:
+        while max_units is None or completed < max_units:
+            lease = work_queue.lease(worker_id, lease_seconds)
+            if lease is None:
+                counts = work_queue.counts()
+                if not counts["pending"] and not counts["leased"]:
+                    break
+                # Units leased by other workers come back here if those workers die
+                time.sleep(poll_interval)
+                continue
+
+            scrape_time = datetime.now()
+            try:
+                with heartbeat(work_queue, lease, lease_seconds) as lost:
+                    parsed, errors = pipeline.run(lease.zip_codes, max_workers=threads)
+            except BaseException as e:
+                # Hand the unit back right away rather than leaving it until the lease runs out
+                work_queue.release(lease, f"{type(e).__name__}: {e}")
+                if not isinstance(e, Exception):
+                    raise
+                logger.warning(f"Unit {lease.unit_id} failed: {e}")
+                continue
+
+            if lost.is_set():
+                logger.warning(f"Lease of unit {lease.unit_id} expired while it was scraped, result discarded")
+                continue
+            if errors and not parsed:
+                # Nothing was fetched, e.g. upstream is down: retry the unit later, until it runs out of attempts
+                error = next(iter(errors.values()))
+                work_queue.release(lease, f"All {len(errors)} ZIP codes failed, e.g. {type(error).__name__}: {error}")
+                logger.warning(f"Every ZIP code of unit {lease.unit_id} failed: {error}")
+                time.sleep(poll_interval)
+                continue
+
+            result = {
+                "scrape_time": scrape_time.isoformat(timespec="seconds"),
+                "parsed": parsed,
+                "errors": {zip_code: str(e) for zip_code, e in errors.items()},
+            }
+            if work_queue.complete(lease, worker_id, result):
+                completed += 1
+            else:
+                logger.warning(f"Lease of unit {lease.unit_id} expired before it was completed, result discarded")
+    finally:
+        session.close()
+    return completed
+
+def drain(work_queue, sink, batch_size=DEFAULT_DRAIN_BATCH):
+    """
+    Writes every completed unit to a sink under the scrape time its worker recorded, then marks the units written.
+    Units are only marked after the sink is flushed, so a crash in between writes the same rows again on the next drain.
+    Each batch is written oldest scrape first, as workers complete units in no particular order. A unit the sink
+    raises on is marked dead and reported under its unit id; rows it appended before the error are kept.
+
+    Args:
+        work_queue: Queue backend.
+        sink: Object with `append(zip_code, parsed_forecasts, scrape_time)` and `flush()`, such as a `HistoryStore`.
+        batch_size (int): Units written per flush.
+
+    Returns:
+        tuple: (written, errors) with the number of ZIP codes written and a mapping of failed ZIP codes and unit ids
+        to error messages.
+    """
+    written = 0
+    errors = {}
+    while True:
+        batch = work_queue.completed(batch_size)
+        if not batch:
+            return written, errors
+        batch.sort(key=lambda unit: unit[1]["scrape_time"])
+        dead = {}
+        for unit_id, result in batch:
+            scrape_time = datetime.fromisoformat(result["scrape_time"])
+            try:
+                for zip_code, parsed_forecasts in result["parsed"].items():
+                    sink.append(zip_code, parsed_forecasts, scrape_time)
+            except Exception as e:
+                dead[unit_id] = f"{type(e).__name__}: {e}"
+                logger.warning(f"Writing unit {unit_id} failed, giving it up: {e}")
+                continue
+            written += len(result["parsed"])
+            errors.update(result["errors"])
+        sink.flush()
+        work_queue.mark_written([unit_id for unit_id, _ in batch if unit_id not in dead])
+        work_queue.mark_dead(dead)
+        errors.update(dead)
+
+def run_coordinator(work_queue, sink, poll_interval=DEFAULT_POLL_INTERVAL, batch_size=DEFAULT_DRAIN_BATCH):
+    """
+    Drains completed units into a sink until no unit is pending, leased or waiting to be written.
+
+    Returns:
+        tuple: (written, errors) as returned by `drain()`, with dead units reported under their unit id.
+    """
+    written = 0
+    errors = {}
+    while True:
+        batch_written, batch_errors = drain(work_queue, sink, batch_size)
+        written += batch_written
+        errors.update(batch_errors)
+        if batch_written:
+            logger.info(format_progress(progress(work_queue)))
+        counts = work_queue.counts()
+        if not counts["pending"] and not counts["leased"] and not counts["done"]:
+            break
+        time.sleep(poll_interval)
+    errors.update(work_queue.failures())
+    return written, errors
+
+def progress(work_queue, now=None):
+    """
+    Returns:
+        report (dict): Unit counts by state, and per worker the units, ZIP codes and errors completed, its throughput
+        in ZIP codes per second between its first lease and its last activity, and the seconds since that activity.
+    """
+    now = now or time.time()
+    workers = []
+    for worker in work_queue.workers():
+        elapsed = worker["updated_at"] - worker["started_at"]
+        workers.append(dict(
+            worker,
+            zip_codes_per_second=worker["zip_codes"] / elapsed if elapsed > 0 else 0.0,
+            idle_seconds=now - worker["updated_at"],
+        ))
+    return {
+        "units": work_queue.counts(),
+        "workers": workers,
+        "zip_codes_per_second": sum(worker["zip_codes_per_second"] for worker in workers),
+    }
+
+def format_progress(report):
+    """
+    Returns:
+        text (str): The report of `progress()` as a plain table for the command line.
+    """
+    units = report["units"]
+    lines = [" ".join(f"{state}={count}" for state, count in units.items())]
+    lines.append(f"{'worker':<32} {'units':>7} {'zip codes':>10} {'errors':>7} {'zip/s':>8} {'idle s':>8}")
+    for worker in report["workers"]:
+        lines.append(
+            f"{worker['worker_id']:<32} {worker['units']:>7} {worker['zip_codes']:>10} {worker['errors']:>7} "
+            f"{worker['zip_codes_per_second']:>8.1f} {worker['idle_seconds']:>8.0f}"
+        )
+    lines.append(f"{'total':<32} {sum(w['units'] for w in report['workers']):>7} {sum(w['zip_codes'] for w in report['workers']):>10} "
+                 f"{sum(w['errors'] for w in report['workers']):>7} {report['zip_codes_per_second']:>8.1f}")
+    return "\n".join(lines)
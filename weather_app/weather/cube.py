@@ -0,0 +1,372 @@
+'''
+Memory-mapped forecast cube for historical analysis: every stored value sits at (issue time, ZIP code, lead day)
+in one fixed-width NumPy file per field, so slices such as "all ZIP codes, lead day 3, last 90 days" are
+strided views of the mapped files instead of a scan over CSV files or DataFrames.
+
+Issue times are bucketed into slots of `interval` seconds from the cube's origin. The issue axis is outermost on
+disk, so new slots are appended to the end of each file without moving existing data. A scrape older than the origin,
+such as one that reaches a writer late, moves the origin back and rewrites the files once. Cells that were never
+written are marked by the `present` field. `condition`, `wind_direction` and `date` are stored as small-int codes.
+
+'''
+
+import json
+import math
+import os
+from datetime import datetime, timedelta
+
+from .line_parser import CONDITION_OPTIONS, WIND_DIRECTION_OPTIONS
+from .records import CONDITION_CODES, WIND_DIRECTION_CODES, MISSING_TEMP
+
+# Six hour issue slots: weather.com updates ten day forecasts a few times a day
+DEFAULT_ISSUE_INTERVAL = 6 * 3600
+# Ten day pages list up to 15 dayparts ("Tonight" plus 14 days)
+DEFAULT_LEAD_DAYS = 16
+DEFAULT_ZIP_CAPACITY = 1024
+# Issue slots added at a time when the cube runs out, 30 days of six hour slots
+ISSUE_GROWTH = 120
+
+# On-disk dtype of every field. `date` codes index the cube's `date_labels`, which hold at most 7 x 31 + 2 labels.
+FIELD_DTYPES = {
+    "present": "bool",
+    "date": "uint8",
+    "condition": "uint8",
+    "high_temp": "int16",
+    "low_temp": "int16",
+    "wind_direction": "uint8",
+    "wind_speed": "uint8",
+    "rain_chance": "uint8",
+}
+
+META_FILE = "cube.json"
+
+class ForecastCube:
+    """
+    On-disk (issue time x ZIP code x lead day) cube of parsed forecasts, written incrementally and read through memory maps.
+    Usable as a pipeline sink.
+    """
+
+    def __init__(self, directory, origin=None, interval=DEFAULT_ISSUE_INTERVAL, lead_days=DEFAULT_LEAD_DAYS,
+                 zip_capacity=DEFAULT_ZIP_CAPACITY, readonly=False):
+        """
+        Opens the cube in `directory`, creating it if it does not exist yet. Layout arguments only apply to a new cube.
+
+        Args:
+            directory (str): Directory holding the field files and `cube.json`.
+            origin (datetime): Start of the first issue slot. Defaults to the slot of the first appended scrape.
+            interval (int): Length of an issue slot in seconds. Scrapes within one slot overwrite each other.
+            lead_days (int): Forecast days kept per scrape; later days are dropped.
+            zip_capacity (int): ZIP codes to allocate room for up front. The cube is rewritten with double the room when full.
+            readonly (bool): Map the files read-only, e.g. for analysis while another process appends.
+        """
+        self.directory = directory
+        self.readonly = readonly
+        self.fields = {}
+        meta_path = os.path.join(directory, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self.origin = datetime.fromisoformat(meta["origin"]) if meta["origin"] else None
+            self.interval = meta["interval"]
+            self.lead_days = meta["lead_days"]
+            self.zip_capacity = meta["zip_capacity"]
+            self.issue_capacity = meta["issue_capacity"]
+            self.zip_codes = meta["zip_codes"]
+            self.date_labels = meta["date_labels"]
+            self.issues = meta["issues"]
+        else:
+            if readonly:
+                raise FileNotFoundError(f"No forecast cube in {directory}")
+            os.makedirs(directory, exist_ok=True)
+            self.origin = self._slot_start(origin, interval) if origin is not None else None
+            self.interval = interval
+            self.lead_days = lead_days
+            self.zip_capacity = zip_capacity
+            self.issue_capacity = 0
+            self.zip_codes = []
+            self.date_labels = []
+            self.issues = 0
+            self._write_meta()
+        self._zip_index = {zip_code: i for i, zip_code in enumerate(self.zip_codes)}
+        self._date_index = {label: i for i, label in enumerate(self.date_labels)}
+        self._map()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _slot_start(when, interval):
+        seconds = (when - datetime.min).total_seconds()
+        return datetime.min + timedelta(seconds=seconds - seconds % interval)
+
+    def _path(self, field):
+        return os.path.join(self.directory, f"{field}.dat")
+
+    def _map(self):
+        import numpy as np
+
+        self.fields = {}
+        if self.issue_capacity == 0:
+            return
+        shape = (self.issue_capacity, self.zip_capacity, self.lead_days)
+        for field, dtype in FIELD_DTYPES.items():
+            self.fields[field] = np.memmap(self._path(field), dtype=dtype, mode="r" if self.readonly else "r+", shape=shape)
+
+    def _write_meta(self):
+        meta = {
+            "origin": self.origin.isoformat() if self.origin else None,
+            "interval": self.interval,
+            "lead_days": self.lead_days,
+            "zip_capacity": self.zip_capacity,
+            "issue_capacity": self.issue_capacity,
+            "issues": self.issues,
+            "zip_codes": self.zip_codes,
+            "date_labels": self.date_labels,
+            "dtypes": FIELD_DTYPES,
+        }
+        # Written to a temporary file and renamed, so readers never see a half-written layout
+        tmp_path = os.path.join(self.directory, f"{META_FILE}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.directory, META_FILE))
+
+    def _grow(self, issue_capacity, zip_capacity, issue_offset=0):
+        """
+        Enlarges every field file. More issue slots only extend the files, as the issue axis is outermost;
+        more ZIP codes change the row stride and `issue_offset` new slots before the origin shift every row,
+        so in those cases the files are rewritten.
+        """
+        import numpy as np
+
+        self.flush()
+        cell_count = zip_capacity * self.lead_days
+        for field, dtype in FIELD_DTYPES.items():
+            path = self._path(field)
+            size = issue_capacity * cell_count * np.dtype(dtype).itemsize
+            if (zip_capacity == self.zip_capacity and not issue_offset) or self.issue_capacity == 0:
+                # Extending a file fills it with zeros, which reads as "not present"
+                with open(path, "ab") as f:
+                    f.truncate(size)
+                continue
+            old = self.fields[field]
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.truncate(size)
+            new = np.memmap(tmp_path, dtype=dtype, mode="r+", shape=(issue_capacity, zip_capacity, self.lead_days))
+            new[issue_offset:issue_offset + self.issue_capacity, :self.zip_capacity] = old
+            new.flush()
+            del new
+            os.replace(tmp_path, path)
+        if issue_offset:
+            self.origin = self.issue_time(-issue_offset)
+            self.issues += issue_offset
+        self.issue_capacity = issue_capacity
+        self.zip_capacity = zip_capacity
+        self._map()
+        self._write_meta()
+
+    def _intern_zip(self, zip_code):
+        index = self._zip_index.get(zip_code)
+        if index is None:
+            index = self._zip_index[zip_code] = len(self.zip_codes)
+            self.zip_codes.append(zip_code)
+        return index
+
+    def _intern_date(self, label):
+        code = self._date_index.get(label)
+        if code is None:
+            if len(self.date_labels) > 255:
+                raise ValueError(f"Too many distinct date labels for the uint8 date codes: {label!r}")
+            code = self._date_index[label] = len(self.date_labels)
+            self.date_labels.append(label)
+        return code
+
+    def issue_index(self, when):
+        """
+        Returns:
+            index (int): Issue slot of the time `when`, which may be negative for times before the origin.
+        """
+        return int((when - self.origin).total_seconds() // self.interval)
+
+    def issue_time(self, index):
+        """
+        Returns:
+            when (datetime): Start of issue slot `index`.
+        """
+        return self.origin + timedelta(seconds=index * self.interval)
+
+    def append(self, zip_code, parsed_forecasts, scrape_time=None):
+        """
+        Writes one scrape of a ZIP code into its issue slot, replacing an earlier scrape in the same slot.
+
+        Args:
+            zip_code (str): 5-digit zip code.
+            parsed_forecasts (list): Dictionaries as returned by `split_weather_line()`.
+            scrape_time (datetime): When the forecast was scraped. Defaults to now.
+        """
+        if self.readonly:
+            raise PermissionError("Forecast cube was opened read-only")
+        scrape_time = scrape_time or datetime.now()
+        if self.origin is None:
+            self.origin = self._slot_start(scrape_time, self.interval)
+        issue = self.issue_index(scrape_time)
+        if issue < 0:
+            # Back-fill: add the missing slots in front of the origin
+            self._grow(self.issue_capacity - issue, self.zip_capacity, -issue)
+            issue = 0
+
+        zip_index = self._intern_zip(zip_code)
+        if issue >= self.issue_capacity or zip_index >= self.zip_capacity:
+            zip_capacity = self.zip_capacity
+            while zip_index >= zip_capacity:
+                zip_capacity *= 2
+            self._grow(max(self.issue_capacity, issue + ISSUE_GROWTH - issue % ISSUE_GROWTH), zip_capacity)
+
+        days = parsed_forecasts[:self.lead_days]
+        n = len(days)
+        # One row write per field rather than one per cell
+        row = (issue, zip_index)
+        fields = self.fields
+        fields["present"][row] = False
+        fields["present"][row][:n] = True
+        fields["date"][row][:n] = [self._intern_date(weather_data["date"]) for weather_data in days]
+        fields["condition"][row][:n] = [CONDITION_CODES[weather_data["condition"]] for weather_data in days]
+        fields["high_temp"][row][:n] = [MISSING_TEMP if weather_data["high_temp"] is None else weather_data["high_temp"] for weather_data in days]
+        fields["low_temp"][row][:n] = [weather_data["low_temp"] for weather_data in days]
+        fields["wind_direction"][row][:n] = [WIND_DIRECTION_CODES[weather_data["wind_direction"]] for weather_data in days]
+        fields["wind_speed"][row][:n] = [weather_data["wind_speed"] for weather_data in days]
+        fields["rain_chance"][row][:n] = [weather_data["rain_chance"] for weather_data in days]
+        self.issues = max(self.issues, issue + 1)
+
+    def flush(self):
+        """
+        Writes mapped pages and the layout (ZIP codes, date labels, filled issue slots) to disk.
+        """
+        if self.readonly:
+            return
+        for array in self.fields.values():
+            array.flush()
+        self._write_meta()
+
+    def close(self):
+        self.flush()
+        self.fields = {}
+
+    @property
+    def shape(self):
+        """
+        Returns:
+            shape (tuple): (ZIP codes, filled issue slots, lead days).
+        """
+        return (len(self.zip_codes), self.issues, self.lead_days)
+
+    def issue_slice(self, start=None, end=None):
+        """
+        Args:
+            start (datetime): Earliest scrape time to include.
+            end (datetime): Scrape time to stop before.
+
+        Returns:
+            slots (slice): The filled issue slots between `start` and `end`.
+        """
+        if self.origin is None:
+            return slice(0, 0)
+        first = 0 if start is None else min(max(self.issue_index(start), 0), self.issues)
+        last = self.issues if end is None else min(max(math.ceil((end - self.origin).total_seconds() / self.interval), 0), self.issues)
+        return slice(first, max(last, first))
+
+    def select(self, field, zip_code=None, start=None, end=None, lead_day=None):
+        """
+        Slices one field as a view of the mapped file, without copying, in (ZIP code, issue slot, lead day) order.
+        Axes fixed by `zip_code` or `lead_day` are dropped.
+
+        Args:
+            field (str): One of `FIELD_DTYPES`, e.g. "high_temp" or "present".
+            zip_code (str): Restrict to one ZIP code. Defaults to all.
+            start (datetime): Earliest scrape time to include.
+            end (datetime): Scrape time to stop before.
+            lead_day (int or slice): Lead day(s) to keep, 0 being the first day of each scrape. Defaults to all.
+
+        Returns:
+            view (ndarray): Read-only when the cube is, with codes for `condition`, `wind_direction` and `date`,
+            and `MISSING_TEMP` for missing high temperatures. Check `present` for cells that were never written.
+
+        Raises:
+            KeyError: If `zip_code` has never been stored.
+        """
+        import numpy as np
+
+        if field not in self.fields:
+            shape = (len(self.zip_codes), 0, self.lead_days)
+            return np.empty(shape, dtype=FIELD_DTYPES[field])[self._zip_key(zip_code), :, slice(None) if lead_day is None else lead_day]
+        # Mapped arrays are (issue, zip, lead) on disk; the transpose is a view
+        cube = self.fields[field][:, :len(self.zip_codes)].transpose(1, 0, 2)
+        return cube[self._zip_key(zip_code), self.issue_slice(start, end), slice(None) if lead_day is None else lead_day]
+
+    def _zip_key(self, zip_code):
+        return slice(None) if zip_code is None else self._zip_index[zip_code]
+
+    def masked(self, field, zip_code=None, start=None, end=None, lead_day=None):
+        """
+        Same selection as `select()`, as a masked array that hides unwritten cells and missing high temperatures.
+        The data is still a view of the mapped file; only the mask is computed.
+
+        Returns:
+            values (MaskedArray): Selected values.
+        """
+        import numpy as np
+
+        values = self.select(field, zip_code, start, end, lead_day)
+        mask = ~self.select("present", zip_code, start, end, lead_day)
+        if field == "high_temp":
+            mask = mask | (values == MISSING_TEMP)
+        return np.ma.MaskedArray(values, mask=mask)
+
+    def last(self, days, field, lead_day=None, zip_code=None, now=None):
+        """
+        Convenience slice of the most recent `days` days, e.g. `cube.last(90, "high_temp", lead_day=3)`.
+        """
+        now = now or datetime.now()
+        return self.select(field, zip_code, now - timedelta(days=days), None, lead_day)
+
+    def to_frame(self, start=None, end=None, lead_day=None):
+        """
+        Copies the written cells of a time range into a long DataFrame for `analytics`.
+
+        Args:
+            start (datetime): Earliest scrape time to include.
+            end (datetime): Scrape time to stop before.
+            lead_day (int): Only keep this lead day. Defaults to all.
+
+        Returns:
+            df (DataFrame): One row per written cell with `zip_code`, `issue_time`, `lead_day` and the usual
+            forecast columns, categorical and nullable like `ForecastBatch.to_frame()`.
+        """
+        import numpy as np
+        import pandas as pd
+
+        slots = self.issue_slice(start, end)
+        present = self.select("present", start=start, end=end)
+        if lead_day is not None:
+            present = present & (np.arange(self.lead_days) == lead_day)
+        zip_index, issue_index, lead = np.nonzero(present)
+
+        def column(field):
+            return self.select(field, start=start, end=end)[zip_index, issue_index, lead]
+
+        high_temp = column("high_temp")
+        return pd.DataFrame({
+            "zip_code": pd.Categorical.from_codes(zip_index, self.zip_codes),
+            "issue_time": pd.to_datetime(self.origin) + pd.to_timedelta((issue_index + slots.start) * self.interval, unit="s"),
+            "lead_day": lead.astype("uint8"),
+            "date": pd.Categorical.from_codes(column("date"), self.date_labels),
+            "condition": pd.Categorical.from_codes(column("condition"), CONDITION_OPTIONS),
+            "high_temp": pd.Series(high_temp, dtype="Int16").mask(high_temp == MISSING_TEMP),
+            "low_temp": column("low_temp"),
+            "wind_direction": pd.Categorical.from_codes(column("wind_direction"), WIND_DIRECTION_OPTIONS),
+            "wind_speed": column("wind_speed"),
+            "rain_chance": column("rain_chance"),
+        })
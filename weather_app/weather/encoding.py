@@ -0,0 +1,81 @@
+'''
+Response compression helpers for the JSON API.
+Brotli is used when the optional `brotli` package is installed and the client accepts it, otherwise gzip.
+
+'''
+
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+def choose_encoding(accept_encodings):
+    """
+    Args:
+        accept_encodings (MIMEAccept): The request's parsed `Accept-Encoding` header.
+
+    Returns:
+        encoding (str): "br", "gzip" or None for identity.
+    """
+    if brotli is not None and "br" in accept_encodings:
+        return "br"
+    if "gzip" in accept_encodings:
+        return "gzip"
+    return None
+
+def compress_response(response, accept_encodings):
+    """
+    Compresses a complete (non-streamed) response body in place.
+
+    Args:
+        response (Response): Flask response with a buffered body.
+        accept_encodings (MIMEAccept): The request's parsed `Accept-Encoding` header.
+
+    Returns:
+        response (Response): The same response, compressed if worthwhile.
+    """
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None or response.status_code != 200 or response.direct_passthrough:
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_SIZE:
+        return response
+
+    response.set_data(brotli.compress(body) if encoding == "br" else gzip.compress(body, compresslevel=6))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+def compress_stream(chunks, encoding):
+    """
+    Compresses a stream of chunks incrementally, flushing after every chunk so each one reaches the client immediately.
+
+    Args:
+        chunks (iterable): Byte strings to send.
+        encoding (str): "br", "gzip" or None for identity.
+
+    Yields:
+        chunk (bytes): Compressed data.
+    """
+    if encoding is None:
+        yield from chunks
+        return
+
+    if encoding == "br":
+        compressor = brotli.Compressor()
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
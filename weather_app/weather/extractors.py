@@ -0,0 +1,221 @@
+'''
+Interchangeable backends for pulling the daily forecast strings out of a weather.com ten day forecast page.
+Every backend returns the same list of strings as the original full BeautifulSoup tree build;
+the faster ones only parse the forecast container, or stop reading as soon as it closes.
+
+Every third-party parser (bs4, lxml, selectolax) is only imported when its backend is used;
+the streaming backend needs nothing beyond the standard library. The default is the fastest backend whose parser
+is installed: selectolax, then lxml, then the streaming one.
+
+'''
+
+import importlib.util
+import os
+import re
+from html.parser import HTMLParser
+
+from .metrics import stage_timer
+
+CONTAINER_CLASS = "DailyForecast--DisclosureList"
+SUMMARY_CLASS = "DetailsSummary"
+
+def _default_backend():
+    # Only checks that the package is installed, so importing this module stays cheap
+    for name in ["selectolax", "lxml"]:
+        if importlib.util.find_spec(name) is not None:
+            return name
+    return "stream"
+
+DEFAULT_BACKEND = _default_backend()
+
+container_regex = re.compile(CONTAINER_CLASS)
+summary_regex = re.compile(SUMMARY_CLASS)
+
+def _summaries(forecast_container):
+    if not forecast_container:
+        raise ValueError("No forecast container found in page")
+
+    forecasts = []
+    for detail in forecast_container.find_all("details"):
+        forecasts.append(detail.find("div", class_=summary_regex).text)
+    return forecasts
+
+def extract_html_parser(content):
+    """
+    Reference backend: builds the full page tree with BeautifulSoup's html.parser.
+    """
+    from bs4 import BeautifulSoup
+
+    with stage_timer("html_parse"):
+        soup = BeautifulSoup(content, "html.parser")
+    with stage_timer("container_lookup"):
+        return _summaries(soup.find("div", class_=container_regex))
+
+def extract_strainer(content):
+    """
+    Builds a BeautifulSoup tree of the forecast container only, skipping the rest of the page.
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    with stage_timer("html_parse"):
+        soup = BeautifulSoup(content, "html.parser", parse_only=SoupStrainer("div", class_=container_regex))
+    with stage_timer("container_lookup"):
+        return _summaries(soup.find("div", class_=container_regex))
+
+def extract_lxml(content):
+    """
+    Uses lxml's C parser and XPath to locate the container and its summaries.
+    """
+    import lxml.html
+
+    with stage_timer("html_parse"):
+        root = lxml.html.fromstring(content)
+    with stage_timer("container_lookup"):
+        containers = root.xpath(f"//div[contains(@class, '{CONTAINER_CLASS}')]")
+        if not containers:
+            raise ValueError("No forecast container found in page")
+
+        forecasts = []
+        for detail in containers[0].iter("details"):
+            summary = detail.xpath(f".//div[contains(@class, '{SUMMARY_CLASS}')]")[0]
+            forecasts.append(summary.text_content())
+    return forecasts
+
+def extract_selectolax(content):
+    """
+    Uses selectolax's Lexbor parser and CSS selectors to locate the container and its summaries.
+    """
+    from selectolax.lexbor import LexborHTMLParser
+
+    with stage_timer("html_parse"):
+        tree = LexborHTMLParser(content)
+    with stage_timer("container_lookup"):
+        forecast_container = tree.css_first(f'div[class*="{CONTAINER_CLASS}"]')
+        if forecast_container is None:
+            raise ValueError("No forecast container found in page")
+
+        forecasts = []
+        for detail in forecast_container.css("details"):
+            forecasts.append(detail.css_first(f'div[class*="{SUMMARY_CLASS}"]').text(deep=True))
+    return forecasts
+
+class _StopParsing(Exception):
+    pass
+
+class ForecastTokenizer(HTMLParser):
+    """
+    Streaming tokenizer that collects the text of the first summary div inside each `details` element of
+    the forecast container, and stops as soon as the container is closed.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forecasts = []
+        self.found = False
+        self._div_depth = 0
+        self._in_details = False
+        self._summary_depth = None
+        self._summary_done = False
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        classes = dict(attrs).get("class") or ""
+        if not self.found:
+            if tag == "div" and any(CONTAINER_CLASS in name for name in classes.split()):
+                self.found = True
+                self._div_depth = 1
+            return
+
+        if tag == "div":
+            self._div_depth += 1
+            if (self._in_details and self._summary_depth is None and not self._summary_done
+                    and any(SUMMARY_CLASS in name for name in classes.split())):
+                self._summary_depth = self._div_depth
+                self._text = []
+        elif tag == "details":
+            self._in_details = True
+            self._summary_done = False
+
+    def handle_endtag(self, tag):
+        if not self.found:
+            return
+
+        if tag == "div":
+            if self._summary_depth == self._div_depth:
+                self.forecasts.append("".join(self._text))
+                self._summary_depth = None
+                self._summary_done = True
+            self._div_depth -= 1
+            if self._div_depth == 0:
+                raise _StopParsing
+        elif tag == "details":
+            self._in_details = False
+
+    def handle_data(self, data):
+        if self._summary_depth is not None:
+            self._text.append(data)
+
+def extract_stream(content, chunk_size=65536):
+    """
+    Feeds the page through `ForecastTokenizer` in chunks, never building a tree and never reading past the container.
+    The container is found while tokenizing, so all of the time is recorded as the html_parse stage.
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8", errors="replace")
+
+    tokenizer = ForecastTokenizer()
+    with stage_timer("html_parse"):
+        try:
+            for start in range(0, len(content), chunk_size):
+                tokenizer.feed(content[start:start + chunk_size])
+            tokenizer.close()
+        except _StopParsing:
+            pass
+
+    if not tokenizer.found:
+        raise ValueError("No forecast container found in page")
+    return tokenizer.forecasts
+
+EXTRACTORS = {
+    "html.parser": extract_html_parser,
+    "strainer": extract_strainer,
+    "lxml": extract_lxml,
+    "selectolax": extract_selectolax,
+    "stream": extract_stream,
+}
+
+def get_extractor(name=None):
+    """
+    Looks up an extraction backend by name.
+
+    Args:
+        name (str): One of `EXTRACTORS`. Defaults to the `WEATHER_EXTRACTOR` environment variable, then `DEFAULT_BACKEND`.
+
+    Returns:
+        extractor (callable): Function taking raw HTML and returning the list of forecast strings.
+    """
+    name = name or os.environ.get("WEATHER_EXTRACTOR") or DEFAULT_BACKEND
+    try:
+        return EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(f"Unknown extractor backend {name!r}. Choose from: {', '.join(EXTRACTORS)}")
+
+def compare_backends(pages, backends=None):
+    """
+    Runs every backend over a corpus of pages and reports where any of them disagrees with the reference backend.
+
+    Args:
+        pages (dict): Mapping of page name to raw HTML.
+        backends (list): Backend names to check. Defaults to every registered backend.
+
+    Returns:
+        mismatches (list): (page_name, backend_name) pairs whose output differs from `html.parser`.
+    """
+    backends = backends or [name for name in EXTRACTORS if name != "html.parser"]
+    mismatches = []
+    for page_name, content in pages.items():
+        expected = extract_html_parser(content)
+        for backend in backends:
+            if EXTRACTORS[backend](content) != expected:
+                mismatches.append((page_name, backend))
+    return mismatches
@@ -0,0 +1,185 @@
+'''
+Multi-process scrape farm for large ZIP code sweeps, driven by the `weather-farm` command.
+The ZIP list is sharded across one worker process per core. Each worker runs its own pooled `Pipeline`, and streams
+results back through a queue to a single writer that appends them to a `HistoryStore` in batches. Finished ZIP codes
+are checkpointed after every flush, so an interrupted sweep resumes where it stopped. With a location map, ZIP codes
+that share a forecast location are sharded together and fetched once.
+
+'''
+
+import logging
+import multiprocessing
+import os
+import queue
+
+from .fetchers import FORECAST_URL, HttpFetcher, create_session
+from .cube import ForecastCube
+from .history import HistoryStore, IncrementalHistoryStore
+from .locations import LocationMap
+from .metrics import REGISTRY
+from .pipeline import Pipeline
+from .resilience import ResilientFetcher, DEFAULT_RATE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THREADS_PER_WORKER = 8
+DEFAULT_CHUNK_SIZE = 32
+DEFAULT_FLUSH_EVERY = 500
+
+def load_checkpoint(path):
+    """
+    Returns:
+        done (set): ZIP codes already written by a previous run, empty if there is no checkpoint.
+    """
+    if path is None or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+def shard(zip_codes, n_shards):
+    """
+    Splits ZIP codes round-robin into `n_shards` lists of near-equal size.
+    """
+    return [zip_codes[i::n_shards] for i in range(n_shards)]
+
+def farm_worker(worker_id, zip_codes, results, threads=DEFAULT_THREADS_PER_WORKER, chunk_size=DEFAULT_CHUNK_SIZE, url_template=FORECAST_URL, rate=DEFAULT_RATE,
+                locations_path=None):
+    """
+    Fetches and parses one shard of ZIP codes, putting one message per chunk on the results queue.
+
+    Args:
+        worker_id (int): Index of this worker.
+        zip_codes (list): The shard of 5-digit zip codes to process.
+        results (Queue): Queue of ("batch", parsed_by_zip, errors_by_zip) messages, ended by ("done", worker_id, metrics_snapshot).
+        threads (int): Concurrent requests within this worker.
+        chunk_size (int): Number of zip codes fetched per batch.
+        url_template (str): Forecast URL with a `{zip_code}` placeholder.
+        rate (float): Requests per second this worker may send upstream, 0 for no limit.
+        locations_path (str): Optional `LocationMap` SQLite file. Each chunk then holds `chunk_size` locations rather than
+            ZIP codes, and locations learned by this worker are persisted for later sweeps.
+    """
+    # A forked worker starts with the parent's counts; clear them so the snapshot sent back holds only this worker's
+    REGISTRY.reset()
+    # The map is opened here rather than inherited, as SQLite connections must not cross a fork
+    locations = LocationMap(locations_path) if locations_path else None
+    groups = list(locations.plan(zip_codes).values()) if locations is not None else [[zip_code] for zip_code in zip_codes]
+    session = create_session(threads)
+    pipeline = Pipeline(HttpFetcher(session, url_template, ResilientFetcher(rate=rate)), locations=locations)
+    try:
+        for start in range(0, len(groups), chunk_size):
+            chunk = [zip_code for group in groups[start:start + chunk_size] for zip_code in group]
+            parsed, errors = pipeline.run(chunk, max_workers=threads)
+            results.put(("batch", parsed, {zip_code: str(e) for zip_code, e in errors.items()}))
+    finally:
+        session.close()
+        results.put(("done", worker_id, REGISTRY.snapshot()))
+
+def run_farm(zip_codes, db_path, checkpoint_path=None, workers=None, threads=DEFAULT_THREADS_PER_WORKER,
+             chunk_size=DEFAULT_CHUNK_SIZE, flush_every=DEFAULT_FLUSH_EVERY, url_template=FORECAST_URL, incremental=False, rate=DEFAULT_RATE,
+             locations_path=None, cube_path=None):
+    """
+    Sweeps every ZIP code not already in the checkpoint and writes the results to a history store.
+
+    Args:
+        zip_codes (list): 5-digit zip codes to sweep.
+        db_path (str): Path of the `HistoryStore` SQLite file.
+        checkpoint_path (str): Optional file listing finished ZIP codes, read on start and appended after each flush.
+        workers (int): Number of worker processes. Defaults to the number of cores.
+        threads (int): Concurrent requests per worker.
+        chunk_size (int): Number of zip codes each worker fetches per batch.
+        flush_every (int): Number of finished ZIP codes between history flushes and checkpoint updates.
+        url_template (str): Forecast URL with a `{zip_code}` placeholder.
+        incremental (bool): Write to an `IncrementalHistoryStore`, storing only forecast days that changed.
+        rate (float): Requests per second to send upstream across all workers, 0 for no limit.
+        locations_path (str): Optional `LocationMap` SQLite file used to fetch each known forecast location once.
+        cube_path (str): Optional `ForecastCube` directory that every scrape is also written to.
+
+    Returns:
+        tuple: (written, errors) with the number of ZIP codes written and a mapping of failed ZIP codes to error messages.
+    """
+    done = load_checkpoint(checkpoint_path)
+    remaining = [zip_code for zip_code in dict.fromkeys(zip_codes) if zip_code not in done]
+    if done:
+        logger.info(f"Resuming sweep: {len(done)} ZIP codes already done, {len(remaining)} remaining")
+    if not remaining:
+        return 0, {}
+
+    # ZIP codes of one location go to the same worker, so the location is fetched once in the whole sweep
+    if locations_path:
+        groups = list(LocationMap(locations_path).plan(remaining).values())
+    else:
+        groups = [[zip_code] for zip_code in remaining]
+
+    workers = min(workers or os.cpu_count() or 1, len(groups))
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+    results = context.Queue(maxsize=workers * 4)
+    processes = [
+        context.Process(target=farm_worker, args=(i, [zip_code for group in group_shard for zip_code in group], results, threads,
+                                                  chunk_size, url_template, rate / workers, locations_path), daemon=True)
+        for i, group_shard in enumerate(shard(groups, workers))
+    ]
+    for process in processes:
+        process.start()
+
+    written = 0
+    errors = {}
+    unflushed = []
+    checkpoint = open(checkpoint_path, "a") if checkpoint_path else None
+    cube = ForecastCube(cube_path) if cube_path else None
+
+    def flush():
+        history.flush()
+        if cube is not None:
+            cube.flush()
+        if checkpoint is not None and unflushed:
+            checkpoint.write("".join(f"{zip_code}\n" for zip_code in unflushed))
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+        unflushed.clear()
+
+    try:
+        store_class = IncrementalHistoryStore if incremental else HistoryStore
+        with store_class(db_path) as history:
+            running = len(processes)
+            while running:
+                try:
+                    message = results.get(timeout=1)
+                except queue.Empty:
+                    # A worker killed mid-sweep never sends "done"; stop once none are left alive
+                    if not any(process.is_alive() for process in processes):
+                        break
+                    continue
+                if message[0] == "done":
+                    # Stage timings and counters were recorded in the worker process
+                    _, worker_id, metrics_snapshot = message
+                    REGISTRY.merge(metrics_snapshot)
+                    logger.debug(f"Worker {worker_id} finished")
+                    running -= 1
+                    continue
+
+                _, payload, batch_errors = message
+                for zip_code, parsed_forecasts in payload.items():
+                    history.append(zip_code, parsed_forecasts)
+                    if cube is not None:
+                        cube.append(zip_code, parsed_forecasts)
+                    unflushed.append(zip_code)
+                written += len(payload)
+                errors.update(batch_errors)
+                if len(unflushed) >= flush_every:
+                    flush()
+                    logger.info(f"{written}/{len(remaining)} ZIP codes written, {len(errors)} failed")
+            flush()
+            if incremental:
+                stats = history.stats()
+                logger.info(f"{stats['rows_written']} of {stats['rows_seen']} forecast days changed ({stats['saved']:.0%} of writes saved)")
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        if cube is not None:
+            cube.close()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    return written, errors
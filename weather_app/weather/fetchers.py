@@ -0,0 +1,108 @@
+'''
+Fetcher stage of the forecast pipeline: turns a ZIP code into the response for its ten day forecast page.
+Every fetcher has `fetch(zip_code, headers=None)` returning a response with `status_code`, `content`, `headers`
+and `raise_for_status()`, so live, cached and offline fetchers can be swapped freely in a `Pipeline`.
+
+'''
+
+from .cache import ForecastCache, MemoryBackend
+from .metrics import stage_timer, BYTES_DOWNLOADED, UPSTREAM_RESPONSES
+from .resilience import UPSTREAM
+
+# URL template for the ten day forecast page, overridable to point at a local stub server
+FORECAST_URL = "https://weather.com/weather/tenday/l/{zip_code}"
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_PAGE_TTL = 300
+
+def create_session(pool_size=DEFAULT_MAX_WORKERS):
+    """
+    Creates a keep-alive requests Session whose connection pool can hold one connection per worker thread.
+
+    Args:
+        pool_size (int): Maximum number of pooled connections kept open per host.
+
+    Returns:
+        session (Session): Session to share across forecast requests.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class PageResponse:
+    """
+    Minimal stand-in for a requests `Response`, returned by the fetchers that never touch the network.
+    """
+
+    def __init__(self, content, status_code=200, headers=None, url=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.url = url
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise IOError(f"{self.status_code} response for {self.url}")
+
+class HttpFetcher:
+    """
+    Downloads pages from weather.com (or `url_template`) through the resilience layer.
+    """
+
+    def __init__(self, session=None, url_template=FORECAST_URL, upstream=None):
+        """
+        Args:
+            session (Session): Optional shared session to reuse pooled connections. Defaults to a bare `requests.get`.
+            url_template (str): Forecast URL with a `{zip_code}` placeholder.
+            upstream (ResilientFetcher): Timeout, rate limit, retry and circuit breaker policy. Defaults to the process-wide `UPSTREAM`.
+        """
+        self.session = session
+        self.url_template = url_template
+        self.upstream = upstream
+
+    def fetch(self, zip_code, headers=None):
+        import requests
+
+        url = self.url_template.format(zip_code=zip_code)
+        try:
+            with stage_timer("fetch"):
+                response = (self.upstream or UPSTREAM).get(url, self.session, headers)
+        except requests.RequestException:
+            UPSTREAM_RESPONSES.inc(status="error")
+            raise
+        UPSTREAM_RESPONSES.inc(status=response.status_code)
+        BYTES_DOWNLOADED.inc(len(response.content))
+        return response
+
+class SnapshotFetcher:
+    """
+    Serves the latest stored page of each ZIP code from a `SnapshotStore`, entirely offline.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def fetch(self, zip_code, headers=None):
+        return PageResponse(self.store.load_page(zip_code), url=zip_code)
+
+class CachedFetcher:
+    """
+    Keeps successful responses of another fetcher in memory for `ttl` seconds, coalescing concurrent
+    fetches of the same ZIP code. Conditional request headers are ignored; cached pages are always full responses.
+    """
+
+    def __init__(self, fetcher, ttl=DEFAULT_PAGE_TTL, max_entries=1000):
+        self.fetcher = fetcher
+        self.cache = ForecastCache(self._load, MemoryBackend(max_entries), ttl)
+
+    def _load(self, zip_code):
+        response = self.fetcher.fetch(zip_code)
+        response.raise_for_status()
+        return PageResponse(response.content, response.status_code, dict(response.headers), zip_code)
+
+    def fetch(self, zip_code, headers=None):
+        return self.cache.get(zip_code)
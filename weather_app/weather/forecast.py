@@ -0,0 +1,248 @@
+'''
+Weather scraping functions that extract "ten day" weather forecasts for a given ZIP code from weather.com
+Convenience wrappers over the `Pipeline` stages, shared by the Flask app and the command line scripts
+
+'''
+
+# requests, pandas and matplotlib are imported inside the functions that use them,
+# so fetch-and-parse runs never pay for pandas or matplotlib and short-lived invocations start fast
+import re
+from concurrent.futures import ThreadPoolExecutor
+import io
+
+from .extractors import get_extractor
+from .fetchers import FORECAST_URL, DEFAULT_MAX_WORKERS, HttpFetcher, create_session
+from .metrics import stage_timer, record_lines
+from .pipeline import Pipeline, parse_lines
+from .line_parser import FORECAST_PARSER, FORECAST_LINE_PATTERN, CONDITION_OPTIONS, WIND_DIRECTION_OPTIONS
+
+__author__ = "Bao Dinh"
+__version__ = "2.0.1"
+__maintainer__ = "Bao Dinh"
+__email__ = "baondinh@bu.edu"
+
+def validate_zip_code(zip_code):
+    """
+    Validates if the provided zip code is in correct format.
+
+    Args:
+        zip_code (str): Input zip code to validate
+
+    Returns:
+        bool: True if valid, False otherwise
+    """
+    if not isinstance(zip_code, str):
+        return False
+    return bool(re.match(r'^\d{5}$', zip_code))
+
+def get_weather_forecast(zip_code, session=None, url_template=FORECAST_URL, store=None, upstream=None):
+    """
+    Retrieves weather forecast for a given zip code from weather.com.
+
+    Args:
+        zip_code (str): 5-digit zip code.
+        session (Session): Optional shared session to reuse pooled connections. Defaults to a bare `requests.get`.
+        url_template (str): Forecast URL with a `{zip_code}` placeholder.
+        store (SnapshotStore): Optional snapshot store. When given, the request is made conditional on the
+            last stored `ETag`/`Last-Modified` and a 304 response reuses the stored forecasts.
+        upstream (ResilientFetcher): Timeout, rate limit, retry and circuit breaker policy. Defaults to the process-wide `UPSTREAM`.
+
+    Returns:
+        forecasts (list): A list of strings representing the weather forecast for each day.
+
+    Raises:
+        ValueError: If the zip code is not 5 digits.
+        CircuitOpenError: If weather.com has been failing and the circuit breaker is open.
+    """
+    if not validate_zip_code(zip_code):
+        raise ValueError("Invalid ZIP code format. Please enter a 5-digit ZIP code.")
+    return Pipeline(HttpFetcher(session, url_template, upstream), store=store).forecasts(zip_code)
+
+def extract_forecasts(content, backend=None):
+    """
+    Extracts the daily forecast summary strings from a weather.com ten day forecast page.
+
+    Args:
+        content (bytes): Raw HTML of the forecast page.
+        backend (str): Extraction backend name from `extractors.EXTRACTORS`. Defaults to `WEATHER_EXTRACTOR` or `extractors.DEFAULT_BACKEND`.
+
+    Returns:
+        forecasts (list): A list of strings representing the weather forecast for each day.
+    """
+    return get_extractor(backend)(content)
+
+def get_weather_forecasts(zip_codes, max_workers=DEFAULT_MAX_WORKERS, session=None, url_template=FORECAST_URL, store=None, upstream=None):
+    """
+    Retrieves weather forecasts for many zip codes concurrently over one pooled keep-alive session.
+
+    Args:
+        zip_codes (list): 5-digit zip codes to fetch.
+        max_workers (int): Number of worker threads, and size of the connection pool.
+        session (Session): Optional session to use. A pooled session is created (and closed afterwards) if omitted.
+        url_template (str): Forecast URL with a `{zip_code}` placeholder.
+        store (SnapshotStore): Optional snapshot store used for conditional requests.
+        upstream (ResilientFetcher): Timeout, rate limit, retry and circuit breaker policy. Defaults to the process-wide `UPSTREAM`.
+
+    Returns:
+        tuple: (results, errors) where results maps each zip code to its forecast strings
+        and errors maps each failed zip code to the exception it raised.
+    """
+    own_session = session is None
+    if own_session:
+        session = create_session(max_workers)
+    pipeline = Pipeline(HttpFetcher(session, url_template, upstream), store=store)
+
+    results = {}
+    errors = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                zip_code: executor.submit(pipeline.forecasts, zip_code)
+                for zip_code in dict.fromkeys(zip_codes)
+            }
+            for zip_code, future in futures.items():
+                try:
+                    results[zip_code] = future.result()
+                except Exception as e:
+                    errors[zip_code] = e
+    finally:
+        if own_session:
+            session.close()
+
+    return results, errors
+
+def split_weather_line(forecasts):
+    """
+    Uses regex to extract weather data from string forecasts returned by `get_weather_forecast()`
+
+    Args:
+        forecasts (lst): A list of strings representing the weather forecast for each day.
+
+    Returns:
+        results (list): A list of dictionaries with weather information for daily forecasts.
+    """
+    return parse_lines(FORECAST_PARSER, forecasts)
+
+def parse_forecasts_frame(lines):
+    """
+    Vectorized alternative to `split_weather_line()` that builds the DataFrame straight from the regex groups
+    and converts whole columns at once, without going through a list of dictionaries.
+
+    Args:
+        lines (iterable): Forecast strings returned by `get_weather_forecast()`, possibly from many pages.
+
+    Returns:
+        df (DataFrame): The same columns and values as `pd.DataFrame(split_weather_line(lines))`, with compact dtypes:
+        categorical `condition`/`wind_direction`, nullable Int16 `high_temp` and small integer columns.
+    """
+    import pandas as pd
+
+    # Matching the compiled pattern directly is faster than `Series.str.extract`, which adds per-row overhead
+    match = FORECAST_LINE_PATTERN.match
+    fields = pd.DataFrame([match(line).groups() for line in lines], columns=list(FORECAST_LINE_PATTERN.groupindex), dtype="object")
+
+    # Drop lines missing a required field, as `split_weather_line()` does
+    valid = fields[["date", "condition", "low_temp", "wind_direction"]].notna().all(axis=1)
+    fields = fields[valid].reset_index(drop=True)
+    record_lines(len(valid), len(fields))
+
+    return pd.DataFrame({
+        "date": fields["date"].astype("object"),
+        "condition": pd.Categorical(fields["condition"], categories=CONDITION_OPTIONS),
+        "high_temp": pd.to_numeric(fields["high_temp"]).astype("Int16"),
+        "low_temp": fields["low_temp"].astype("int16"),
+        "wind_direction": pd.Categorical(fields["wind_direction"], categories=WIND_DIRECTION_OPTIONS),
+        "wind_speed": fields["wind_speed"].astype("int8"),
+        "rain_chance": fields["rain_chance"].fillna("0").astype("int16"),
+    })
+
+def analyze_weather_data(df):
+    """
+    Analyzes numerical weather data and generates a line graph of high/low temperatures from a DataFrame of the weather data.
+
+    Args:
+        df (DataFrame): DataFrame created from returned list of dictionaries from `split_weather_line()`.
+    """
+    print("\nData Analysis:")
+    print(df.describe())
+    
+    print("\nCorrelation Matrix:")
+    correlation_matrix = df[['high_temp', 'low_temp', 'wind_speed', 'rain_chance']].corr()
+    print(correlation_matrix)
+    
+def plot_weather_data(df):
+    """
+    Creates a matplotlip line graph of high and low temperatures extracted from weather data DataFrame.
+    Uses the object-oriented `Figure` API on the Agg canvas rather than global pyplot state, so it is safe to call from several threads.
+
+    Args:
+        df (DataFrame): DataFrame created from returned list of dictionaries from `split_weather_line()`.
+
+    Returns:
+        png (bytes): The rendered plot as PNG image data.
+    """
+    with stage_timer("plot_render"):
+        return _render_plot(df)
+
+def _render_plot(df):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(12, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    dates = df['date'].astype(str)
+    high_temps = df['high_temp'].astype('float')
+    low_temps = df['low_temp'].astype('float')
+    ax.plot(dates, high_temps, label='High Temp', color='red')
+    ax.plot(dates, low_temps, label='Low Temp', color='blue')
+    ax.fill_between(dates, high_temps, low_temps, alpha=0.2)
+    ax.set_title('Temperature Range Over Time')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Temperature (°F)')
+    ax.legend()
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+
+    # Save plot to a BytesIO object
+    img = io.BytesIO()
+    fig.savefig(img, format='png')
+    return img.getvalue()
+
+def get_parsed_forecast(zip_code):
+    """
+    Retrieves and parses the weather forecast for a given zip code.
+
+    Args:
+        zip_code (str): 5-digit zip code.
+
+    Returns:
+        parsed_forecasts (list): A list of dictionaries as returned by `split_weather_line()`.
+    """
+    return split_weather_line(get_weather_forecast(zip_code))
+
+def get_weather_data(zip_code, cache=None):
+    """
+    Makes calls to other functions to obtain weather data, parse weather data, and reformat data as a Pandas DataFrame.
+
+    Args:
+        zip_code (int): ZIP code to obtain weather data from weather.com instead of user ZIP code input.
+        cache (ForecastCache): Optional cache to serve parsed forecasts from instead of scraping every time.
+        
+    Returns:
+        df (DataFrame): Reformatted weather data as a Pandas DataFrame.
+    """
+    import pandas as pd
+
+    try:
+        parsed_forecasts = cache.get(zip_code) if cache is not None else get_parsed_forecast(zip_code)
+        
+        # Create DataFrame
+        with stage_timer("dataframe"):
+            df = pd.DataFrame(parsed_forecasts)
+        return df
+        
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return None
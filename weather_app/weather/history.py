@@ -0,0 +1,384 @@
+'''
+Forecast history store backed by one indexed SQLite table instead of one CSV file per ZIP code per day.
+Rows are keyed on (zip_code, scrape_time, forecast_date), written in batches, and queried per ZIP code and time range.
+
+`IncrementalHistoryStore` keeps the same interface but only writes the forecast days that changed since the
+previous scrape of a ZIP code, and rebuilds full forecasts from those changes when queried.
+
+'''
+
+import bisect
+import sqlite3
+from datetime import datetime
+
+from .records import CONDITION_CODES, WIND_DIRECTION_CODES
+from .line_parser import CONDITION_OPTIONS, WIND_DIRECTION_OPTIONS
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Stored value columns of one forecast day, in table order
+VALUE_COLUMNS = ["condition", "high_temp", "low_temp", "wind_direction", "wind_speed", "rain_chance"]
+
+def encode_values(weather_data):
+    """
+    Returns:
+        values (tuple): One parsed forecast day as stored, with `condition` and `wind_direction` as small-int codes.
+    """
+    return (
+        int(CONDITION_CODES[weather_data["condition"]]),
+        weather_data["high_temp"],
+        weather_data["low_temp"],
+        int(WIND_DIRECTION_CODES[weather_data["wind_direction"]]),
+        weather_data["wind_speed"],
+        weather_data["rain_chance"],
+    )
+
+def decode_frame(df):
+    """
+    Turns the stored codes of a history query back into the usual categorical and nullable columns.
+    """
+    import pandas as pd
+
+    df["condition"] = pd.Categorical.from_codes(df["condition"], CONDITION_OPTIONS)
+    df["wind_direction"] = pd.Categorical.from_codes(df["wind_direction"], WIND_DIRECTION_OPTIONS)
+    df["high_temp"] = df["high_temp"].astype("Int16")
+    return df
+
+class HistoryStore:
+    """
+    Appends parsed forecasts to a SQLite table clustered on ZIP code, so a query for one ZIP code and
+    time range only reads that ZIP code's rows. `condition` and `wind_direction` are stored as small-int codes.
+    """
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = []
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS forecast_history ("
+            "zip_code TEXT NOT NULL, scrape_time TEXT NOT NULL, forecast_date TEXT NOT NULL, lead_day INTEGER NOT NULL, "
+            "condition INTEGER NOT NULL, high_temp INTEGER, low_temp INTEGER NOT NULL, "
+            "wind_direction INTEGER NOT NULL, wind_speed INTEGER NOT NULL, rain_chance INTEGER NOT NULL, "
+            "PRIMARY KEY (zip_code, scrape_time, forecast_date)) WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS forecast_history_scrape_time ON forecast_history (scrape_time)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, zip_code, parsed_forecasts, scrape_time=None):
+        """
+        Queues one scrape of a ZIP code, writing queued rows once `batch_size` is reached.
+
+        Args:
+            zip_code (str): 5-digit zip code.
+            parsed_forecasts (list): Dictionaries as returned by `split_weather_line()`.
+            scrape_time (datetime): When the forecast was scraped. Defaults to now.
+        """
+        scrape_time = (scrape_time or datetime.now()).isoformat(timespec="seconds")
+        for lead_day, weather_data in enumerate(parsed_forecasts):
+            self._pending.append((zip_code, scrape_time, weather_data["date"], lead_day) + encode_values(weather_data))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes all queued rows in a single transaction. Re-writing a scrape that is already stored replaces it.
+        """
+        if not self._pending:
+            return
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO forecast_history VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self._pending)
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def zip_codes(self):
+        """
+        Returns:
+            zip_codes (list): Every ZIP code with stored scrapes, in sorted order.
+        """
+        self.flush()
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT zip_code FROM forecast_history ORDER BY zip_code")]
+
+    def query(self, zip_code, start=None, end=None):
+        """
+        Reads the stored scrapes of one ZIP code within an optional time range.
+
+        Args:
+            zip_code (str): 5-digit zip code.
+            start (datetime): Earliest scrape time to include.
+            end (datetime): Latest scrape time to include.
+
+        Returns:
+            df (DataFrame): One row per (scrape_time, forecast_date) with the usual forecast columns,
+            plus `lead_day`, the row's position within its scrape.
+        """
+        import pandas as pd
+
+        self.flush()
+        sql = "SELECT * FROM forecast_history WHERE zip_code = ?"
+        params = [zip_code]
+        if start is not None:
+            sql += " AND scrape_time >= ?"
+            params.append(start.isoformat(timespec="seconds"))
+        if end is not None:
+            sql += " AND scrape_time <= ?"
+            params.append(end.isoformat(timespec="seconds"))
+        sql += " ORDER BY scrape_time, lead_day"
+
+        return decode_frame(pd.read_sql_query(sql, self.conn, params=params, parse_dates=["scrape_time"]))
+
+# Separator of the forecast date labels recorded for each scrape
+DATE_SEPARATOR = "|"
+
+class IncrementalHistoryStore(HistoryStore):
+    """
+    History store that writes only the (zip_code, forecast_date) rows whose values changed since they were last stored.
+    Every scrape still records its time and the ordered forecast date labels it returned, so the full forecast as of
+    any scrape is rebuilt from the latest change of each of its days at or before that scrape.
+    """
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE):
+        self._pending_scrapes = []
+        # Last stored values per ZIP code, loaded from the database the first time a ZIP code is appended
+        self._latest = {}
+        # Latest scrape time per ZIP code, to spot scrapes that arrive out of order
+        self._latest_scrape = {}
+        self.rows_seen = 0
+        self.rows_written = 0
+        super().__init__(path, batch_size)
+
+    def _create_tables(self):
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS forecast_scrapes ("
+            "zip_code TEXT NOT NULL, scrape_time TEXT NOT NULL, forecast_dates TEXT NOT NULL, "
+            "PRIMARY KEY (zip_code, scrape_time)) WITHOUT ROWID"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS forecast_changes ("
+            "zip_code TEXT NOT NULL, forecast_date TEXT NOT NULL, scrape_time TEXT NOT NULL, "
+            "condition INTEGER NOT NULL, high_temp INTEGER, low_temp INTEGER NOT NULL, "
+            "wind_direction INTEGER NOT NULL, wind_speed INTEGER NOT NULL, rain_chance INTEGER NOT NULL, "
+            "PRIMARY KEY (zip_code, forecast_date, scrape_time)) WITHOUT ROWID"
+        )
+
+    def _load_latest(self, zip_code):
+        latest = self._latest.get(zip_code)
+        if latest is None:
+            cursor = self.conn.execute(
+                f"SELECT forecast_date, {', '.join(VALUE_COLUMNS)} FROM forecast_changes c WHERE zip_code = ? AND scrape_time = "
+                "(SELECT MAX(scrape_time) FROM forecast_changes WHERE zip_code = c.zip_code AND forecast_date = c.forecast_date)",
+                (zip_code,),
+            )
+            latest = self._latest[zip_code] = {row[0]: row[1:] for row in cursor}
+            self._latest_scrape[zip_code] = self.conn.execute(
+                "SELECT MAX(scrape_time) FROM forecast_scrapes WHERE zip_code = ?", (zip_code,)
+            ).fetchone()[0] or ""
+        return latest
+
+    def append(self, zip_code, parsed_forecasts, scrape_time=None):
+        """
+        Queues one scrape of a ZIP code, keeping only the forecast days that differ from the last stored values.
+        A scrape older than the latest stored one is diffed against the values stored as of its own time instead.
+
+        Args:
+            zip_code (str): 5-digit zip code.
+            parsed_forecasts (list): Dictionaries as returned by `split_weather_line()`.
+            scrape_time (datetime): When the forecast was scraped. Defaults to now.
+
+        Returns:
+            changed (int): Number of forecast days queued for writing.
+        """
+        scrape_time = (scrape_time or datetime.now()).isoformat(timespec="seconds")
+        latest = self._load_latest(zip_code)
+        if scrape_time < self._latest_scrape[zip_code]:
+            return self._append_out_of_order(zip_code, parsed_forecasts, scrape_time)
+
+        self._latest_scrape[zip_code] = scrape_time
+        changed = 0
+        for weather_data in parsed_forecasts:
+            values = encode_values(weather_data)
+            if latest.get(weather_data["date"]) != values:
+                latest[weather_data["date"]] = values
+                self._pending.append((zip_code, weather_data["date"], scrape_time) + values)
+                changed += 1
+
+        self._pending_scrapes.append((zip_code, scrape_time, DATE_SEPARATOR.join(d["date"] for d in parsed_forecasts)))
+        self.rows_seen += len(parsed_forecasts)
+        self.rows_written += changed
+        if len(self._pending) + len(self._pending_scrapes) >= self.batch_size:
+            self.flush()
+        return changed
+
+    def _append_out_of_order(self, zip_code, parsed_forecasts, scrape_time):
+        # Later scrapes of a day rebuild their values from the change at or before them, so a late change inserted
+        # before them also restores the value they relied on at the first of them that lists the day
+        self.flush()
+        later_scrapes = self.conn.execute(
+            "SELECT scrape_time, forecast_dates FROM forecast_scrapes WHERE zip_code = ? AND scrape_time > ? ORDER BY scrape_time",
+            (zip_code, scrape_time),
+        ).fetchall()
+        changed = 0
+        for weather_data in parsed_forecasts:
+            forecast_date = weather_data["date"]
+            values = encode_values(weather_data)
+            previous = self.conn.execute(
+                f"SELECT {', '.join(VALUE_COLUMNS)} FROM forecast_changes WHERE zip_code = ? AND forecast_date = ? AND scrape_time <= ? "
+                "ORDER BY scrape_time DESC LIMIT 1",
+                (zip_code, forecast_date, scrape_time),
+            ).fetchone()
+            if previous == values:
+                continue
+            self._pending.append((zip_code, forecast_date, scrape_time) + values)
+            changed += 1
+            if previous is None:
+                continue
+
+            next_change = self.conn.execute(
+                "SELECT MIN(scrape_time) FROM forecast_changes WHERE zip_code = ? AND forecast_date = ? AND scrape_time > ?",
+                (zip_code, forecast_date, scrape_time),
+            ).fetchone()[0]
+            for later_time, forecast_dates in later_scrapes:
+                if next_change is not None and later_time >= next_change:
+                    break
+                if forecast_date in forecast_dates.split(DATE_SEPARATOR):
+                    self._pending.append((zip_code, forecast_date, later_time) + previous)
+                    changed += 1
+                    break
+
+        self._pending_scrapes.append((zip_code, scrape_time, DATE_SEPARATOR.join(d["date"] for d in parsed_forecasts)))
+        self.rows_seen += len(parsed_forecasts)
+        self.rows_written += changed
+        self.flush()
+        # The latest change of a day may now be the late one, so reload on the next append
+        del self._latest[zip_code]
+        return changed
+
+    def flush(self):
+        """
+        Writes all queued scrapes and changed rows in a single transaction.
+        """
+        if not self._pending and not self._pending_scrapes:
+            return
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO forecast_scrapes VALUES (?, ?, ?)", self._pending_scrapes)
+            self.conn.executemany("INSERT OR REPLACE INTO forecast_changes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._pending)
+        self._pending = []
+        self._pending_scrapes = []
+
+    def zip_codes(self):
+        """
+        Returns:
+            zip_codes (list): Every ZIP code with stored scrapes, in sorted order.
+        """
+        self.flush()
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT zip_code FROM forecast_scrapes ORDER BY zip_code")]
+
+    def query(self, zip_code, start=None, end=None):
+        """
+        Rebuilds the full stored scrapes of one ZIP code within an optional time range.
+
+        Args:
+            zip_code (str): 5-digit zip code.
+            start (datetime): Earliest scrape time to include.
+            end (datetime): Latest scrape time to include.
+
+        Returns:
+            df (DataFrame): The same rows and columns `HistoryStore.query()` returns for the same scrapes.
+        """
+        import pandas as pd
+
+        self.flush()
+        sql = "SELECT scrape_time, forecast_dates FROM forecast_scrapes WHERE zip_code = ?"
+        params = [zip_code]
+        if start is not None:
+            sql += " AND scrape_time >= ?"
+            params.append(start.isoformat(timespec="seconds"))
+        if end is not None:
+            sql += " AND scrape_time <= ?"
+            params.append(end.isoformat(timespec="seconds"))
+        scrapes = self.conn.execute(sql + " ORDER BY scrape_time", params).fetchall()
+
+        # Change times and values of every forecast date, in scrape order
+        timeline = {}
+        changes_sql = f"SELECT forecast_date, scrape_time, {', '.join(VALUE_COLUMNS)} FROM forecast_changes WHERE zip_code = ?"
+        changes_params = [zip_code]
+        if end is not None:
+            changes_sql += " AND scrape_time <= ?"
+            changes_params.append(end.isoformat(timespec="seconds"))
+        for forecast_date, changed_at, *values in self.conn.execute(changes_sql + " ORDER BY forecast_date, scrape_time", changes_params):
+            times, stored = timeline.setdefault(forecast_date, ([], []))
+            times.append(changed_at)
+            stored.append(tuple(values))
+
+        rows = []
+        for scrape_time, forecast_dates in scrapes:
+            for lead_day, forecast_date in enumerate(forecast_dates.split(DATE_SEPARATOR) if forecast_dates else []):
+                times, stored = timeline[forecast_date]
+                rows.append((zip_code, scrape_time, forecast_date, lead_day) + stored[bisect.bisect_right(times, scrape_time) - 1])
+
+        df = pd.DataFrame(rows, columns=["zip_code", "scrape_time", "forecast_date", "lead_day"] + VALUE_COLUMNS)
+        df["scrape_time"] = pd.to_datetime(df["scrape_time"])
+        return decode_frame(df)
+
+    def as_of(self, zip_code, when=None):
+        """
+        Rebuilds the forecast of a ZIP code as it stood at the last scrape at or before `when`.
+
+        Args:
+            zip_code (str): 5-digit zip code.
+            when (datetime): Point in time. Defaults to the latest scrape.
+
+        Returns:
+            parsed_forecasts (list): Dictionaries as returned by `split_weather_line()`, or None if no scrape is that old.
+        """
+        self.flush()
+        when = (when or datetime.max).isoformat(timespec="seconds")
+        scrape = self.conn.execute(
+            "SELECT scrape_time, forecast_dates FROM forecast_scrapes WHERE zip_code = ? AND scrape_time <= ? "
+            "ORDER BY scrape_time DESC LIMIT 1",
+            (zip_code, when),
+        ).fetchone()
+        if scrape is None:
+            return None
+
+        scrape_time, forecast_dates = scrape
+        parsed_forecasts = []
+        for forecast_date in forecast_dates.split(DATE_SEPARATOR) if forecast_dates else []:
+            condition, high_temp, low_temp, wind_direction, wind_speed, rain_chance = self.conn.execute(
+                f"SELECT {', '.join(VALUE_COLUMNS)} FROM forecast_changes WHERE zip_code = ? AND forecast_date = ? AND scrape_time <= ? "
+                "ORDER BY scrape_time DESC LIMIT 1",
+                (zip_code, forecast_date, scrape_time),
+            ).fetchone()
+            parsed_forecasts.append({
+                "date": forecast_date,
+                "condition": CONDITION_OPTIONS[condition],
+                "high_temp": high_temp,
+                "low_temp": low_temp,
+                "wind_direction": WIND_DIRECTION_OPTIONS[wind_direction],
+                "wind_speed": wind_speed,
+                "rain_chance": rain_chance,
+            })
+        return parsed_forecasts
+
+    def stats(self):
+        """
+        Returns:
+            stats (dict): Forecast days appended and written since opening, and the fraction of writes saved.
+        """
+        return {
+            "rows_seen": self.rows_seen,
+            "rows_written": self.rows_written,
+            "saved": 1 - self.rows_written / self.rows_seen if self.rows_seen else 0.0,
+        }
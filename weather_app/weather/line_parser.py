@@ -0,0 +1,89 @@
+'''
+Precompiled single-pass parser for the daily forecast strings returned by `get_weather_forecast()`.
+Produces exactly the same dictionaries as the original per-field regex searches in `split_weather_line()`.
+
+'''
+
+import re
+
+# Weather options for use with f-string regex
+WIND_DIRECTION_OPTIONS = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE", "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+CONDITION_OPTIONS = [
+    "Mostly Sunny", "Sunny", "Partly Cloudy", "Mostly Cloudy", "Scattered Showers", "Few Showers", "Showers",
+    "Light Rain", "Rain and Snow", "Rain", "Snow", "Thunderstorms", "Scattered Thunderstorms", "Thunderstorms Early",
+]
+
+wind_direction_options = "|".join(WIND_DIRECTION_OPTIONS)
+condition_options = "|".join(CONDITION_OPTIONS)
+
+# Each field sits in its own lookahead anchored at the start of the line, so the lazy `.*?` finds the
+# leftmost match of that field exactly like a separate `re.search` would, all within one `match` call
+FORECAST_LINE_PATTERN = re.compile(
+    r"^(?:(?=(?P<date>Today|Tonight|\D{3} \d{1,2})))?"
+    fr"(?:(?=.*?(?P<condition>{condition_options})))?"
+    r"(?:(?=.*?(?:(?P<high_temp>\d{1,3})°|--)/(?P<low_temp>\d{1,3})°))?"
+    fr"(?:(?=.*?Wind(?P<wind_direction>{wind_direction_options})\s{{0,1}}(?P<wind_speed>\d{{1,2}})\s{{0,1}}mph))?"
+    r"(?:(?=.*?Rain(?P<rain_chance>\d{1,3})%))?",
+    re.DOTALL,
+)
+
+class ForecastLineParser:
+    """
+    Parses forecast strings with a single compiled pattern. Lines missing a date, condition,
+    temperature or wind field are dropped, matching `split_weather_line()`.
+    """
+
+    def __init__(self, pattern=FORECAST_LINE_PATTERN):
+        self.pattern = pattern
+
+    def parse_line(self, line):
+        """
+        Args:
+            line (str): A single daily forecast string.
+
+        Returns:
+            weather_data (dict): Parsed weather information, or None if a required field is missing.
+        """
+        date, condition, high_temp, low_temp, wind_direction, wind_speed, rain_chance = self.pattern.match(line).groups()
+        if date is None or condition is None or low_temp is None or wind_direction is None:
+            return None
+
+        return {
+            "date": date,
+            "condition": condition,
+            "high_temp": int(high_temp) if high_temp is not None else None,
+            "low_temp": int(low_temp),
+            "wind_direction": wind_direction,
+            "wind_speed": int(wind_speed),
+            "rain_chance": int(rain_chance) if rain_chance is not None else 0,
+        }
+
+    def iter_parse(self, lines):
+        """
+        Lazily parses a stream of forecast strings, skipping unparseable lines. Suited to re-parsing large archives.
+
+        Args:
+            lines (iterable): Forecast strings.
+
+        Yields:
+            weather_data (dict): Parsed weather information for each valid line.
+        """
+        parse_line = self.parse_line
+        for line in lines:
+            weather_data = parse_line(line)
+            if weather_data is not None:
+                yield weather_data
+
+    def parse_batch(self, lines):
+        """
+        Parses many forecast strings at once.
+
+        Args:
+            lines (iterable): Forecast strings.
+
+        Returns:
+            results (list): A list of dictionaries with weather information for each valid line.
+        """
+        return list(self.iter_parse(lines))
+
+FORECAST_PARSER = ForecastLineParser()
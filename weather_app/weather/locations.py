@@ -0,0 +1,175 @@
+'''
+ZIP code to weather.com forecast location mapping. Many ZIP codes resolve to the same forecast location, so a
+sweep or the Flask app only needs to fetch and parse each location once and can share the parsed forecast with
+every ZIP code mapped to it.
+
+Mappings are learned from fetched pages, whose canonical link names the location a ZIP code resolved to, or loaded
+from an offline CSV table of `zip_code,location_key` rows, and are persisted in SQLite. A location key can stand
+in for the ZIP code in the forecast URL (`.../tenday/l/{location_key}`), so fetchers need no changes.
+
+'''
+
+import csv
+import re
+import sqlite3
+import threading
+import time
+
+from .metrics import REGISTRY
+
+ZIP_CODE_PATTERN = re.compile(r"^\d{5}$")
+CANONICAL_MARKER = b'rel="canonical"'
+HREF_PATTERN = re.compile(rb'href="([^"]*)"')
+
+LOCATIONS_LEARNED = REGISTRY.counter(
+    "weather_locations_learned_total", "ZIP code to forecast location mappings learned or changed from fetched pages.")
+SHARED_FETCHES = REGISTRY.counter(
+    "weather_shared_fetches_total", "ZIP codes served from a fetch of the same forecast location made for another ZIP code.")
+
+def location_key(response):
+    """
+    Reads the forecast location a page was served for, from its canonical link or else its final (redirected) URL.
+
+    Args:
+        response: Response with `content` and optionally `url`.
+
+    Returns:
+        key (str): The path segment after `/l/`, or None if the page does not name its location.
+    """
+    content = response.content
+    marker = content.find(CANONICAL_MARKER)
+    if marker >= 0:
+        tag = content[content.rfind(b"<", 0, marker):content.find(b">", marker)]
+        href = HREF_PATTERN.search(tag)
+        if href is not None and b"/l/" in href.group(1):
+            return href.group(1).rsplit(b"/l/", 1)[1].split(b"?")[0].split(b"#")[0].decode() or None
+
+    url = getattr(response, "url", None) or ""
+    if "/l/" in url:
+        return url.rsplit("/l/", 1)[1].split("?")[0].split("#")[0] or None
+    return None
+
+class LocationMap:
+    """
+    Thread-safe ZIP code to location key mapping, held in memory and optionally persisted to a SQLite file
+    that several processes may share.
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): Optional SQLite file to load mappings from and persist new ones to.
+        """
+        self.path = path
+        self.learned = 0
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if path is not None:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS zip_locations ("
+                    "zip_code TEXT PRIMARY KEY, location_key TEXT NOT NULL, source TEXT NOT NULL, updated_at REAL NOT NULL)"
+                )
+                self._keys = dict(conn.execute("SELECT zip_code, location_key FROM zip_locations"))
+
+    def _connect(self):
+        # SQLite connections cannot be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        return len(self._keys)
+
+    def get(self, zip_code):
+        """
+        Returns:
+            key (str): The location key `zip_code` is mapped to, or None if it is unknown.
+        """
+        return self._keys.get(zip_code)
+
+    def resolve(self, zip_code):
+        """
+        Returns:
+            key (str): The key to fetch and cache `zip_code` under: its location key if known, else the ZIP code itself.
+        """
+        return self._keys.get(zip_code, zip_code)
+
+    def update(self, mapping, source="table"):
+        """
+        Stores many mappings in one transaction.
+
+        Args:
+            mapping (dict): Mapping of zip code to location key.
+            source (str): Where the mappings came from, recorded alongside them.
+
+        Returns:
+            changed (int): Number of mappings that were new or different.
+        """
+        with self._lock:
+            changed = {zip_code: key for zip_code, key in mapping.items() if self._keys.get(zip_code) != key}
+            self._keys.update(changed)
+        if changed and self.path is not None:
+            now = time.time()
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO zip_locations VALUES (?, ?, ?, ?)",
+                    [(zip_code, key, source, now) for zip_code, key in changed.items()],
+                )
+        return len(changed)
+
+    def load_table(self, path):
+        """
+        Loads an offline CSV table with `zip_code` and `location_key` columns.
+
+        Returns:
+            changed (int): Number of mappings that were new or different.
+        """
+        with open(path, newline="") as f:
+            return self.update({row["zip_code"].strip(): row["location_key"].strip() for row in csv.DictReader(f)})
+
+    def learn(self, zip_code, response):
+        """
+        Records the location a fetched page names for the ZIP code it was requested for.
+        Fetches made by location key rather than by ZIP code are ignored.
+
+        Returns:
+            key (str): The learned location key, or None if nothing was learned.
+        """
+        if not ZIP_CODE_PATTERN.match(zip_code):
+            return None
+        key = location_key(response)
+        # A page served under its own ZIP code adds nothing over `resolve()`
+        if key is not None and key != zip_code and self.update({zip_code: key}, source="learned"):
+            self.learned += 1
+            LOCATIONS_LEARNED.inc()
+        return key
+
+    def plan(self, zip_codes):
+        """
+        Groups ZIP codes by the key they should be fetched under, so each known location is fetched once.
+
+        Args:
+            zip_codes (iterable): 5-digit zip codes, duplicates allowed.
+
+        Returns:
+            groups (dict): Mapping of fetch key (a location key, or the ZIP code itself when unmapped)
+            to the ZIP codes it serves, in first-seen order.
+        """
+        groups = {}
+        for zip_code in dict.fromkeys(zip_codes):
+            groups.setdefault(self.resolve(zip_code), []).append(zip_code)
+        return groups
+
+    def stats(self):
+        """
+        Returns:
+            stats (dict): Mapped ZIP codes, distinct locations among them and mappings learned by this process.
+        """
+        with self._lock:
+            locations = len(set(self._keys.values()))
+        return {"zip_codes": len(self._keys), "locations": locations, "learned": self.learned}
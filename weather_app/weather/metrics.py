@@ -0,0 +1,274 @@
+'''
+Lightweight in-process metrics for the scraping pipeline: latency histograms per stage and counters for
+bytes downloaded, upstream status codes and dropped forecast lines.
+Metrics render in the Prometheus text exposition format for the Flask `/metrics` endpoint, or as a plain
+summary table for the command line scripts. Only the standard library is used.
+
+'''
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency bucket upper bounds in seconds, from sub-millisecond parsing up to slow upstream fetches
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value, quote=True):
+    # The exposition format escapes backslashes and newlines in help text, and double quotes too in label values
+    value = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quote else value
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """
+    Monotonically increasing count, optionally split by label values.
+    """
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: value for key, value in self._values.items()}
+
+    def merge(self, snapshot):
+        with self._lock:
+            for key, value in snapshot.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in sorted(self.snapshot().items())]
+
+class Histogram:
+    """
+    Distribution of observed values in cumulative buckets, optionally split by label values.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per label key: [count per bucket (last one is +Inf), total count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            state[0][index] += 1
+            state[1] += 1
+            state[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the wall-clock duration of the `with` block, whether or not it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: [list(counts), count, total] for key, (counts, count, total) in self._values.items()}
+
+    def merge(self, snapshot):
+        with self._lock:
+            for key, (counts, count, total) in snapshot.items():
+                state = self._values.get(key)
+                if state is None:
+                    state = self._values[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+                state[0] = [a + b for a, b in zip(state[0], counts)]
+                state[1] += count
+                state[2] += total
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    def quantile(self, q, **labels):
+        """
+        Estimates a quantile by linear interpolation within the bucket it falls in.
+
+        Args:
+            q (float): Quantile between 0 and 1.
+
+        Returns:
+            value (float): Estimated value, or None if nothing was observed.
+        """
+        state = self.snapshot().get(tuple(str(labels[name]) for name in self.labelnames))
+        if state is None or state[1] == 0:
+            return None
+        counts, count, _ = state
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                # Values above the largest bucket are reported as that bucket's bound
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def samples(self):
+        lines = []
+        for key, (counts, count, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+class Gauge:
+    """
+    Value read from a callback each time the metrics are rendered, such as a cache hit ratio.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, documentation, func):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+
+    def samples(self):
+        return [f"{self.name} {self.func()}"]
+
+class Registry:
+    """
+    Collection of metrics rendered together.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, func):
+        return self.register(Gauge(name, documentation, func))
+
+    def render(self):
+        """
+        Returns:
+            text (str): Every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation, quote=False)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        Returns:
+            snapshot (dict): Picklable copy of every counter and histogram, for sending from worker processes.
+        """
+        return {name: metric.snapshot() for name, metric in self.metrics.items() if hasattr(metric, "snapshot")}
+
+    def merge(self, snapshot):
+        """
+        Adds a snapshot taken in another process into this registry.
+        """
+        for name, values in snapshot.items():
+            if name in self.metrics:
+                self.metrics[name].merge(values)
+
+    def reset(self):
+        """
+        Zeroes every counter and histogram, e.g. in a forked worker process that inherited its parent's values.
+        """
+        for metric in self.metrics.values():
+            if hasattr(metric, "reset"):
+                metric.reset()
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "weather_stage_seconds", "Time spent in each pipeline stage.", ["stage"])
+BYTES_DOWNLOADED = REGISTRY.counter(
+    "weather_bytes_downloaded_total", "Bytes of forecast page content downloaded.")
+UPSTREAM_RESPONSES = REGISTRY.counter(
+    "weather_upstream_responses_total", "Forecast page responses by HTTP status code, or 'error' when no response arrived.", ["status"])
+FORECAST_LINES = REGISTRY.counter(
+    "weather_forecast_lines_total", "Forecast lines seen by the line parser, parsed or dropped for a missing field.", ["outcome"])
+
+# Pipeline stages, in the order they run
+STAGES = ["fetch", "html_parse", "container_lookup", "line_parse", "dataframe", "plot_render", "plot_write", "csv_write"]
+
+def stage_timer(stage):
+    """
+    Times a `with` block into `STAGE_SECONDS` under the given stage name.
+    """
+    return STAGE_SECONDS.time(stage=stage)
+
+def record_lines(total, parsed):
+    """
+    Counts forecast lines handed to the parser and how many it kept.
+    """
+    FORECAST_LINES.inc(parsed, outcome="parsed")
+    FORECAST_LINES.inc(total - parsed, outcome="dropped")
+
+def summary():
+    """
+    Formats stage latencies and pipeline counters as a table for printing at the end of a command line run.
+
+    Returns:
+        text (str): Multi-line summary.
+    """
+    lines = [f"{'stage':<18} {'count':>8} {'total s':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}"]
+    seen = {key[0] for key in STAGE_SECONDS.snapshot()}
+    for stage in STAGES + sorted(seen - set(STAGES)):
+        if stage not in seen:
+            continue
+        _, count, total = STAGE_SECONDS.snapshot()[(stage,)]
+        p50 = STAGE_SECONDS.quantile(0.5, stage=stage) * 1000
+        p95 = STAGE_SECONDS.quantile(0.95, stage=stage) * 1000
+        lines.append(f"{stage:<18} {count:>8} {total:>9.2f} {total / count * 1000:>9.1f} {p50:>9.1f} {p95:>9.1f}")
+
+    statuses = ", ".join(f"{key[0]}: {value}" for key, value in sorted(UPSTREAM_RESPONSES.snapshot().items()))
+    lines.append(f"Downloaded {BYTES_DOWNLOADED.value() / 1e6:.1f} MB; upstream responses {statuses or 'none'}")
+    lines.append(f"Forecast lines parsed: {FORECAST_LINES.value(outcome='parsed')}, dropped: {FORECAST_LINES.value(outcome='dropped')}")
+    return "\n".join(lines)
@@ -0,0 +1,126 @@
+'''
+Forecast pipeline: fetcher -> extractor -> parser -> sink.
+Each stage is swappable: any fetcher from `fetchers`, any extraction backend from `extractors`,
+any parser with `parse_batch(lines)`, and any sink with `append(zip_code, parsed_forecasts)` such as
+`CsvSink`, `HistoryStore`, `IncrementalHistoryStore` or the columnar `ForecastBatch`.
+With a `LocationMap`, ZIP codes that share a forecast location are fetched and parsed once.
+
+'''
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .extractors import get_extractor
+from .fetchers import HttpFetcher, DEFAULT_MAX_WORKERS
+from .line_parser import FORECAST_PARSER
+from .locations import SHARED_FETCHES
+from .metrics import stage_timer, record_lines
+
+def parse_lines(parser, lines):
+    """
+    Runs a parser over forecast strings, recording parse time and dropped lines.
+
+    Args:
+        parser: Object with `parse_batch(lines)`, such as `FORECAST_PARSER`.
+        lines (iterable): Forecast strings.
+
+    Returns:
+        results (list): A list of dictionaries with weather information for each valid line.
+    """
+    lines = list(lines)
+    with stage_timer("line_parse"):
+        results = parser.parse_batch(lines)
+    # Lines missing a required field are dropped silently by the parser, so count them here
+    record_lines(len(lines), len(results))
+    return results
+
+class Pipeline:
+    """
+    Fetches, extracts, parses and stores forecasts for ZIP codes.
+    """
+
+    def __init__(self, fetcher=None, extractor=None, parser=None, sink=None, store=None, locations=None):
+        """
+        Args:
+            fetcher: Object with `fetch(zip_code, headers=None)`. Defaults to an `HttpFetcher` without a pooled session.
+            extractor (callable or str): Function turning raw HTML into forecast strings, or a backend name for `get_extractor()`.
+            parser: Object with `parse_batch(lines)`. Defaults to `FORECAST_PARSER`.
+            sink: Optional object with `append(zip_code, parsed_forecasts)` that `run()` writes results to.
+            store (SnapshotStore): Optional snapshot store. When given, requests are conditional on the last stored
+                `ETag`/`Last-Modified` and a 304 response reuses the stored forecasts without extracting again.
+            locations (LocationMap): Optional ZIP code to forecast location mapping. Pages fetched by ZIP code teach
+                it their location, and `run()` fetches each known location once for all ZIP codes mapped to it.
+        """
+        self.fetcher = fetcher if fetcher is not None else HttpFetcher()
+        self.extractor = extractor if callable(extractor) else get_extractor(extractor)
+        self.parser = parser if parser is not None else FORECAST_PARSER
+        self.sink = sink
+        self.store = store
+        self.locations = locations
+
+    def forecasts(self, zip_code):
+        """
+        Args:
+            zip_code (str): 5-digit zip code, or a location key from the `LocationMap`.
+
+        Returns:
+            forecasts (list): A list of strings representing the weather forecast for each day.
+        """
+        headers = self.store.conditional_headers(zip_code) if self.store is not None else None
+        response = self.fetcher.fetch(zip_code, headers)
+        if response.status_code == 304 and self.store is not None:
+            return self.store.load_forecasts(zip_code)
+        response.raise_for_status()  # Raise an exception for bad status codes
+
+        forecasts = self.extractor(response.content)
+        if self.locations is not None:
+            self.locations.learn(zip_code, response)
+        if self.store is not None:
+            self.store.save(zip_code, response.content, response.headers, forecasts)
+        return forecasts
+
+    def parse(self, zip_code):
+        """
+        Returns:
+            parsed_forecasts (list): A list of dictionaries as returned by `split_weather_line()`.
+        """
+        return parse_lines(self.parser, self.forecasts(zip_code))
+
+    def run(self, zip_codes, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Fetches and parses many ZIP codes concurrently, appending each result to the sink from the calling thread
+        as soon as it is ready, so sinks never need to be thread-safe.
+
+        Args:
+            zip_codes (list): 5-digit zip codes to process.
+            max_workers (int): Number of worker threads.
+
+        Returns:
+            tuple: (results, errors) where results maps each zip code to its parsed forecasts
+            and errors maps each failed zip code to the exception it raised.
+        """
+        if self.locations is not None:
+            groups = self.locations.plan(zip_codes)
+        else:
+            groups = {zip_code: [zip_code] for zip_code in dict.fromkeys(zip_codes)}
+
+        results = {}
+        errors = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.parse, key): key for key in groups}
+            for future in as_completed(futures):
+                members = groups[futures[future]]
+                try:
+                    parsed_forecasts = future.result()
+                except Exception as e:
+                    errors.update(dict.fromkeys(members, e))
+                    continue
+                # Every ZIP code of a location shares the one parsed forecast
+                SHARED_FETCHES.inc(len(members) - 1)
+                for zip_code in members:
+                    results[zip_code] = parsed_forecasts
+                    if self.sink is not None:
+                        self.sink.append(zip_code, parsed_forecasts)
+
+        if hasattr(self.sink, "flush"):
+            self.sink.flush()
+        return results, errors
@@ -0,0 +1,61 @@
+'''
+Content-addressed cache of rendered temperature plots.
+Each PNG is stored under a hash of the data it was drawn from, so an unchanged forecast is never re-rendered
+and the image can be served with long-lived cache headers.
+
+'''
+
+import hashlib
+import os
+import tempfile
+
+from .forecast import plot_weather_data
+from .metrics import stage_timer
+
+# Bump whenever `plot_weather_data()` output changes so old images are not reused
+PLOT_VERSION = "1"
+
+def plot_hash(df):
+    """
+    Hashes the columns a temperature plot is drawn from.
+
+    Args:
+        df (DataFrame): DataFrame created from returned list of dictionaries from `split_weather_line()`.
+
+    Returns:
+        digest (str): Hex digest identifying the plot.
+    """
+    data = df[['date', 'high_temp', 'low_temp']].astype(str).to_json(orient='values')
+    return hashlib.sha256(f"{PLOT_VERSION}:{data}".encode()).hexdigest()[:32]
+
+class PlotCache:
+    """
+    Renders plots on demand into `directory`, reusing any PNG already rendered for the same data.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.directory, f"{digest}.png")
+
+    def get_or_render(self, df):
+        """
+        Args:
+            df (DataFrame): DataFrame created from returned list of dictionaries from `split_weather_line()`.
+
+        Returns:
+            digest (str): Hash naming the rendered PNG in the cache directory.
+        """
+        digest = plot_hash(df)
+        path = self.path(digest)
+        if not os.path.exists(path):
+            png = plot_weather_data(df)
+            # Write to a temporary file first so a concurrent request never serves a partial image
+            with stage_timer("plot_write"):
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(png)
+                os.replace(tmp_path, path)
+        return digest
@@ -0,0 +1,520 @@
+'''
+Leased work unit queues for distributed ZIP code sweeps (see `coordinator`).
+
+A work unit is a list of ZIP codes under a stable unit id. Workers lease one unit at a time for a limited time and
+renew the lease while they work on it; a unit whose lease runs out because its worker died goes back to the queue,
+until it has been leased `max_attempts` times and is given up as dead. A completed unit keeps its result until the
+coordinator has written it, and only the current lease holder can complete a unit, so a late result from a worker
+that lost its lease is discarded rather than written twice.
+
+Ships a SQLite backend for tests and single host sweeps, and a Redis backend for workers spread over several hosts.
+Both store results as JSON, and `open_queue()` picks one from a URL.
+
+'''
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+from .metrics import REGISTRY
+
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Unit states, in the order a unit normally passes through them
+UNIT_STATES = ["pending", "leased", "done", "written", "dead"]
+
+LEASES_EXPIRED = REGISTRY.counter(
+    "weather_sweep_leases_expired_total", "Work unit leases that ran out before their worker completed the unit.")
+STALE_RESULTS = REGISTRY.counter(
+    "weather_sweep_stale_results_total", "Work unit results discarded because their worker no longer held the lease.")
+
+@dataclass(slots=True)
+class Lease:
+    """
+    A worker's claim on one work unit. `token` identifies this particular lease, so renewals and the result
+    of an earlier, expired lease of the same unit are told apart.
+    """
+    unit_id: str
+    token: str
+    zip_codes: list
+
+class SqliteQueue:
+    """
+    Work unit queue in a SQLite file, shared by the threads and processes of one host.
+    Every state change is a single transaction, so concurrent workers never lease the same unit.
+    """
+
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Args:
+            path (str): SQLite file holding the units, their results and the per-worker progress.
+            max_attempts (int): Leases a unit may use up before it is marked dead.
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sweep_units ("
+                "unit_id TEXT PRIMARY KEY, zip_codes TEXT NOT NULL, state TEXT NOT NULL, worker_id TEXT, token TEXT, "
+                "lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sweep_units_state ON sweep_units (state, lease_expires)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sweep_workers ("
+                "worker_id TEXT PRIMARY KEY, units INTEGER NOT NULL, zip_codes INTEGER NOT NULL, errors INTEGER NOT NULL, "
+                "started_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        # SQLite connections cannot be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, units):
+        """
+        Adds work units. Units whose id is already queued, in any state, are left untouched, so submitting
+        the same sweep twice does not duplicate work.
+
+        Args:
+            units (dict): Mapping of unit id to its list of ZIP codes.
+
+        Returns:
+            added (int): Number of new units.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO sweep_units (unit_id, zip_codes, state, updated_at) VALUES (?, ?, 'pending', ?)",
+                [(unit_id, json.dumps(zip_codes), now) for unit_id, zip_codes in units.items()],
+            )
+            return conn.total_changes - before
+
+    def _expire(self, conn, now):
+        # Units of dead workers go back to the queue, or are given up once they used all their attempts
+        expired = conn.execute(
+            "UPDATE sweep_units SET state = CASE WHEN attempts >= ? THEN 'dead' ELSE 'pending' END, "
+            "error = 'lease expired', worker_id = NULL, token = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE state = 'leased' AND lease_expires < ?",
+            (self.max_attempts, now, now),
+        ).rowcount
+        if expired:
+            LEASES_EXPIRED.inc(expired)
+
+    def lease(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Leases the oldest pending unit, first returning expired leases to the queue.
+
+        Args:
+            worker_id (str): Name of the leasing worker, recorded for the progress view.
+            lease_seconds (float): Time the worker has to complete or renew the lease.
+
+        Returns:
+            lease (Lease): The leased unit, or None if no unit is pending.
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._connect() as conn:
+            self._expire(conn, now)
+            rows = conn.execute(
+                "UPDATE sweep_units SET state = 'leased', worker_id = ?, token = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE unit_id = (SELECT unit_id FROM sweep_units WHERE state = 'pending' ORDER BY rowid LIMIT 1) "
+                "RETURNING unit_id, zip_codes",
+                (worker_id, token, now + lease_seconds, now),
+            ).fetchall()
+            if not rows:
+                return None
+            conn.execute(
+                "INSERT INTO sweep_workers VALUES (?, 0, 0, 0, ?, ?) ON CONFLICT (worker_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (worker_id, now, now),
+            )
+        unit_id, zip_codes = rows[0]
+        return Lease(unit_id, token, json.loads(zip_codes))
+
+    def renew(self, lease, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Extends a lease that is still held.
+
+        Returns:
+            held (bool): False if the lease expired and the unit was handed to another worker or given up.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE sweep_units SET lease_expires = ?, updated_at = ? WHERE unit_id = ? AND token = ? AND state = 'leased'",
+                (now + lease_seconds, now, lease.unit_id, lease.token),
+            ).rowcount == 1
+
+    def complete(self, lease, worker_id, result):
+        """
+        Stores the result of a leased unit and counts it towards the worker's progress.
+
+        Args:
+            lease (Lease): The lease the result was produced under.
+            worker_id (str): Name of the worker.
+            result (dict): JSON serializable result with the unit's `parsed` forecasts and `errors` by ZIP code.
+
+        Returns:
+            accepted (bool): False if the lease was no longer held and the result was discarded.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            accepted = conn.execute(
+                "UPDATE sweep_units SET state = 'done', result = ?, error = NULL, token = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE unit_id = ? AND token = ? AND state = 'leased'",
+                (json.dumps(result), now, lease.unit_id, lease.token),
+            ).rowcount == 1
+            if accepted:
+                conn.execute(
+                    "UPDATE sweep_workers SET units = units + 1, zip_codes = zip_codes + ?, errors = errors + ?, updated_at = ? WHERE worker_id = ?",
+                    (len(result["parsed"]), len(result["errors"]), now, worker_id),
+                )
+        if not accepted:
+            STALE_RESULTS.inc()
+        return accepted
+
+    def release(self, lease, error):
+        """
+        Gives a leased unit back after the worker failed on it, or gives it up once it used all its attempts.
+
+        Returns:
+            held (bool): False if the lease had already expired.
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE sweep_units SET state = CASE WHEN attempts >= ? THEN 'dead' ELSE 'pending' END, "
+                "error = ?, worker_id = NULL, token = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE unit_id = ? AND token = ? AND state = 'leased'",
+                (self.max_attempts, error, time.time(), lease.unit_id, lease.token),
+            ).rowcount == 1
+
+    def completed(self, limit=100):
+        """
+        Returns:
+            results (list): Up to `limit` (unit_id, result) pairs of completed units not yet marked written.
+        """
+        rows = self._connect().execute(
+            "SELECT unit_id, result FROM sweep_units WHERE state = 'done' ORDER BY updated_at LIMIT ?", (limit,)
+        ).fetchall()
+        return [(unit_id, json.loads(result)) for unit_id, result in rows]
+
+    def mark_written(self, unit_ids):
+        """
+        Marks completed units as written and drops their stored results.
+        """
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE sweep_units SET state = 'written', result = NULL, updated_at = ? WHERE unit_id = ? AND state = 'done'",
+                [(time.time(), unit_id) for unit_id in unit_ids],
+            )
+
+    def mark_dead(self, errors):
+        """
+        Gives up completed units that could not be written, dropping their stored results.
+
+        Args:
+            errors (dict): Mapping of unit ids to the error to report for them.
+        """
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE sweep_units SET state = 'dead', result = NULL, error = ?, updated_at = ? WHERE unit_id = ? AND state = 'done'",
+                [(error, time.time(), unit_id) for unit_id, error in errors.items()],
+            )
+
+    def counts(self):
+        """
+        Returns:
+            counts (dict): Number of units in each of `UNIT_STATES`, with expired leases already returned to the queue.
+        """
+        with self._connect() as conn:
+            self._expire(conn, time.time())
+            counts = dict(conn.execute("SELECT state, COUNT(*) FROM sweep_units GROUP BY state"))
+        return {state: counts.get(state, 0) for state in UNIT_STATES}
+
+    def workers(self):
+        """
+        Returns:
+            workers (list): Per-worker dictionaries with the units, ZIP codes and errors completed,
+            and the times of the worker's first lease and last activity.
+        """
+        cursor = self._connect().execute(
+            "SELECT worker_id, units, zip_codes, errors, started_at, updated_at FROM sweep_workers ORDER BY worker_id"
+        )
+        return [dict(zip(["worker_id", "units", "zip_codes", "errors", "started_at", "updated_at"], row)) for row in cursor]
+
+    def failures(self):
+        """
+        Returns:
+            failures (dict): Mapping of dead unit ids to the last error they failed with.
+        """
+        return dict(self._connect().execute("SELECT unit_id, error FROM sweep_units WHERE state = 'dead' ORDER BY unit_id"))
+
+# Lease a unit: return expired leases to the queue or give them up, then pop the next pending unit.
+# Runs in Redis, so the lease is atomic across hosts and expiry uses the Redis server clock, not the workers' clocks.
+REDIS_LEASE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now)
+for _, unit in ipairs(expired) do
+    redis.call('ZREM', KEYS[3], unit)
+    redis.call('HDEL', KEYS[4], unit)
+    redis.call('HSET', KEYS[7], unit, 'lease expired')
+    if tonumber(redis.call('HGET', KEYS[5], unit) or '0') >= tonumber(ARGV[3]) then
+        redis.call('SADD', KEYS[6], unit)
+    else
+        redis.call('RPUSH', KEYS[2], unit)
+    end
+end
+local unit = redis.call('LPOP', KEYS[2])
+if not unit then
+    return {#expired}
+end
+redis.call('HINCRBY', KEYS[5], unit, 1)
+redis.call('HSET', KEYS[4], unit, ARGV[1])
+redis.call('ZADD', KEYS[3], now + tonumber(ARGV[2]), unit)
+return {#expired, unit, redis.call('HGET', KEYS[1], unit), tostring(now)}
+"""
+
+# Renew a lease if its token still holds it
+REDIS_RENEW_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+local now = redis.call('TIME')
+redis.call('ZADD', KEYS[1], 'XX', tonumber(now[1]) + tonumber(now[2]) / 1000000 + tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+# Complete a unit if its token still holds the lease, storing the result and counting the worker's progress
+REDIS_COMPLETE_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[3])
+redis.call('RPUSH', KEYS[4], ARGV[1])
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+redis.call('HSETNX', KEYS[5], 'started_at', now)
+redis.call('HSET', KEYS[5], 'updated_at', now)
+redis.call('HINCRBY', KEYS[5], 'units', 1)
+redis.call('HINCRBY', KEYS[5], 'zip_codes', ARGV[4])
+redis.call('HINCRBY', KEYS[5], 'errors', ARGV[5])
+redis.call('SADD', KEYS[6], ARGV[6])
+return 1
+"""
+
+# Release a unit after a worker failure if its token still holds the lease
+REDIS_RELEASE_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HSET', KEYS[6], ARGV[1], ARGV[4])
+if tonumber(redis.call('HGET', KEYS[3], ARGV[1]) or '0') >= tonumber(ARGV[3]) then
+    redis.call('SADD', KEYS[5], ARGV[1])
+else
+    redis.call('RPUSH', KEYS[4], ARGV[1])
+end
+return 1
+"""
+
+class RedisQueue:
+    """
+    Work unit queue in Redis, for workers on several hosts. Has the same interface as `SqliteQueue`.
+    Every state change runs as a Lua script, so it is atomic however many workers share the queue.
+    """
+
+    def __init__(self, url, name="sweep", max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Args:
+            url (str): Redis URL such as `redis://broker:6379/0`.
+            name (str): Key prefix, so several sweeps can share one Redis database. Used as the hash tag of every key,
+                so on Redis Cluster all keys of the queue land in the same slot, as its multi-key scripts require.
+            max_attempts (int): Leases a unit may use up before it is marked dead.
+        """
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+        self.max_attempts = max_attempts
+        prefix = f"weather:{{{name}}}:"
+        # units: id -> ZIP codes, pending: list of ids, leases: id -> expiry, tokens: id -> lease token,
+        # attempts: id -> leases used, results: id -> result, done: completed ids in order, written/dead: id sets
+        self.keys = {key: prefix + key for key in
+                     ["units", "pending", "leases", "tokens", "attempts", "dead", "errors", "results", "done", "written", "workers"]}
+        self._prefix = prefix
+        self._lease = self.redis.register_script(REDIS_LEASE_SCRIPT)
+        self._renew = self.redis.register_script(REDIS_RENEW_SCRIPT)
+        self._complete = self.redis.register_script(REDIS_COMPLETE_SCRIPT)
+        self._release = self.redis.register_script(REDIS_RELEASE_SCRIPT)
+
+    def _worker_key(self, worker_id):
+        return f"{self._prefix}worker:{worker_id}"
+
+    def enqueue(self, units):
+        """
+        Adds work units. Units whose id is already queued, in any state, are left untouched.
+
+        Returns:
+            added (int): Number of new units.
+        """
+        added = 0
+        for unit_id, zip_codes in units.items():
+            if self.redis.hsetnx(self.keys["units"], unit_id, json.dumps(zip_codes)):
+                self.redis.rpush(self.keys["pending"], unit_id)
+                added += 1
+        return added
+
+    def lease(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Leases the oldest pending unit, first returning expired leases to the queue.
+
+        Returns:
+            lease (Lease): The leased unit, or None if no unit is pending.
+        """
+        token = uuid.uuid4().hex
+        keys = [self.keys[key] for key in ["units", "pending", "leases", "tokens", "attempts", "dead", "errors"]]
+        reply = self._lease(keys=keys, args=[token, lease_seconds, self.max_attempts])
+        if reply[0]:
+            LEASES_EXPIRED.inc(reply[0])
+        if len(reply) == 1:
+            return None
+        worker_key = self._worker_key(worker_id)
+        self.redis.hsetnx(worker_key, "started_at", float(reply[3]))
+        self.redis.hset(worker_key, "updated_at", float(reply[3]))
+        self.redis.sadd(self.keys["workers"], worker_id)
+        return Lease(reply[1].decode(), token, json.loads(reply[2]))
+
+    def renew(self, lease, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Returns:
+            held (bool): False if the lease expired and the unit was handed to another worker or given up.
+        """
+        return bool(self._renew(keys=[self.keys["leases"], self.keys["tokens"]], args=[lease.unit_id, lease.token, lease_seconds]))
+
+    def complete(self, lease, worker_id, result):
+        """
+        Returns:
+            accepted (bool): False if the lease was no longer held and the result was discarded.
+        """
+        keys = [self.keys["leases"], self.keys["tokens"], self.keys["results"], self.keys["done"], self._worker_key(worker_id), self.keys["workers"]]
+        args = [lease.unit_id, lease.token, json.dumps(result), len(result["parsed"]), len(result["errors"]), worker_id]
+        accepted = bool(self._complete(keys=keys, args=args))
+        if not accepted:
+            STALE_RESULTS.inc()
+        return accepted
+
+    def release(self, lease, error):
+        """
+        Returns:
+            held (bool): False if the lease had already expired.
+        """
+        keys = [self.keys[key] for key in ["leases", "tokens", "attempts", "pending", "dead", "errors"]]
+        return bool(self._release(keys=keys, args=[lease.unit_id, lease.token, self.max_attempts, error]))
+
+    def completed(self, limit=100):
+        """
+        Returns:
+            results (list): Up to `limit` (unit_id, result) pairs of completed units not yet marked written.
+        """
+        unit_ids = [unit_id.decode() for unit_id in self.redis.lrange(self.keys["done"], 0, limit - 1)]
+        if not unit_ids:
+            return []
+        results = self.redis.hmget(self.keys["results"], unit_ids)
+        return [(unit_id, json.loads(result)) for unit_id, result in zip(unit_ids, results) if result is not None]
+
+    def mark_written(self, unit_ids):
+        """
+        Marks completed units as written and drops their stored results.
+        """
+        if not unit_ids:
+            return
+        pipe = self.redis.pipeline()
+        for unit_id in unit_ids:
+            pipe.lrem(self.keys["done"], 1, unit_id)
+        pipe.sadd(self.keys["written"], *unit_ids)
+        pipe.hdel(self.keys["results"], *unit_ids)
+        pipe.execute()
+
+    def mark_dead(self, errors):
+        """
+        Gives up completed units that could not be written, dropping their stored results.
+
+        Args:
+            errors (dict): Mapping of unit ids to the error to report for them.
+        """
+        if not errors:
+            return
+        pipe = self.redis.pipeline()
+        for unit_id in errors:
+            pipe.lrem(self.keys["done"], 1, unit_id)
+        pipe.sadd(self.keys["dead"], *errors)
+        pipe.hset(self.keys["errors"], mapping=errors)
+        pipe.hdel(self.keys["results"], *errors)
+        pipe.execute()
+
+    def counts(self):
+        """
+        Returns:
+            counts (dict): Number of units in each of `UNIT_STATES`. Expired leases count as leased until the next lease.
+        """
+        pipe = self.redis.pipeline()
+        pipe.llen(self.keys["pending"])
+        pipe.zcard(self.keys["leases"])
+        pipe.llen(self.keys["done"])
+        pipe.scard(self.keys["written"])
+        pipe.scard(self.keys["dead"])
+        return dict(zip(UNIT_STATES, pipe.execute()))
+
+    def workers(self):
+        """
+        Returns:
+            workers (list): Per-worker dictionaries with the units, ZIP codes and errors completed,
+            and the times of the worker's first lease and last activity.
+        """
+        workers = []
+        for worker_id in sorted(worker_id.decode() for worker_id in self.redis.smembers(self.keys["workers"])):
+            stats = {key.decode(): float(value) for key, value in self.redis.hgetall(self._worker_key(worker_id)).items()}
+            started_at = stats.get("started_at", 0.0)
+            workers.append({
+                "worker_id": worker_id,
+                "units": int(stats.get("units", 0)),
+                "zip_codes": int(stats.get("zip_codes", 0)),
+                "errors": int(stats.get("errors", 0)),
+                "started_at": started_at,
+                "updated_at": stats.get("updated_at", started_at),
+            })
+        return workers
+
+    def failures(self):
+        """
+        Returns:
+            failures (dict): Mapping of dead unit ids to the last error they failed with.
+        """
+        dead = sorted(unit_id.decode() for unit_id in self.redis.smembers(self.keys["dead"]))
+        errors = self.redis.hmget(self.keys["errors"], dead) if dead else []
+        return {unit_id: error.decode() if error is not None else None for unit_id, error in zip(dead, errors)}
+
+def open_queue(url, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Opens a queue backend from a URL: `redis://` or `rediss://` URLs use Redis (with an optional `#name` suffix
+    as the key prefix), anything else is taken as the path of a SQLite file.
+
+    Returns:
+        queue: A `RedisQueue` or `SqliteQueue`.
+    """
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        url, _, name = url.partition("#")
+        return RedisQueue(url, name or "sweep", max_attempts)
+    return SqliteQueue(url.removeprefix("sqlite:///"), max_attempts)
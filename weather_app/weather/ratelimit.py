@@ -0,0 +1,57 @@
+'''
+Thread-safe token bucket for holding upstream requests to a global requests-per-second budget.
+
+'''
+
+import threading
+import time
+
+class TokenBucket:
+    """
+    Refills `rate` tokens per second up to `burst`; each request takes one token.
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Takes `tokens` if they are available.
+
+        Returns:
+            wait (float): 0 if the tokens were taken, otherwise the seconds until they will be available.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Blocks until `tokens` are taken, or until `timeout` seconds have passed.
+
+        Returns:
+            bool: True if the tokens were taken.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining < wait:
+                    return False
+            time.sleep(wait)
@@ -0,0 +1,192 @@
+'''
+Compact typed representations of parsed forecasts.
+`ForecastRecord` replaces the per-day dictionaries from `split_weather_line()`, and `ForecastBatch` stores
+many ZIP codes' forecasts column by column in typed arrays. Both convert losslessly to and from the dictionary shape.
+
+'''
+
+from array import array
+from dataclasses import dataclass
+from enum import IntEnum
+
+from .line_parser import CONDITION_OPTIONS, WIND_DIRECTION_OPTIONS
+
+Condition = IntEnum("Condition", {label.upper().replace(" ", "_"): code for code, label in enumerate(CONDITION_OPTIONS)})
+WindDirection = IntEnum("WindDirection", {label: code for code, label in enumerate(WIND_DIRECTION_OPTIONS)})
+
+CONDITION_CODES = {label: Condition(code) for code, label in enumerate(CONDITION_OPTIONS)}
+WIND_DIRECTION_CODES = {label: WindDirection(code) for code, label in enumerate(WIND_DIRECTION_OPTIONS)}
+
+# Stored in place of a missing high temperature, as on "--/71°" nights
+MISSING_TEMP = -32768
+
+FIELDS = ["date", "condition", "high_temp", "low_temp", "wind_direction", "wind_speed", "rain_chance"]
+
+@dataclass(slots=True)
+class ForecastRecord:
+    """
+    One parsed forecast day with `condition` and `wind_direction` stored as small-int enums.
+    """
+    date: str
+    condition: Condition
+    high_temp: int
+    low_temp: int
+    wind_direction: WindDirection
+    wind_speed: int
+    rain_chance: int
+
+    @classmethod
+    def from_dict(cls, weather_data):
+        return cls(
+            weather_data["date"],
+            CONDITION_CODES[weather_data["condition"]],
+            weather_data["high_temp"],
+            weather_data["low_temp"],
+            WIND_DIRECTION_CODES[weather_data["wind_direction"]],
+            weather_data["wind_speed"],
+            weather_data["rain_chance"],
+        )
+
+    def to_dict(self):
+        return {
+            "date": self.date,
+            "condition": CONDITION_OPTIONS[self.condition],
+            "high_temp": self.high_temp,
+            "low_temp": self.low_temp,
+            "wind_direction": WIND_DIRECTION_OPTIONS[self.wind_direction],
+            "wind_speed": self.wind_speed,
+            "rain_chance": self.rain_chance,
+        }
+
+class ForecastBatch:
+    """
+    Columnar container of forecast days for many ZIP codes.
+    Every column is an `array.array`, so `numpy.frombuffer` can view it without copying.
+    Date labels and ZIP codes are interned into small lookup tables and stored as codes.
+    """
+
+    def __init__(self):
+        self.zip_codes = []
+        self.date_labels = []
+        self._zip_index = {}
+        self._date_index = {}
+        self.zip_code = array("I")
+        self.date = array("H")
+        self.condition = array("B")
+        self.high_temp = array("h")
+        self.low_temp = array("h")
+        self.wind_direction = array("B")
+        self.wind_speed = array("B")
+        self.rain_chance = array("H")
+
+    def __len__(self):
+        return len(self.zip_code)
+
+    @staticmethod
+    def _intern(value, values, index):
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(values)
+            values.append(value)
+        return code
+
+    def append(self, zip_code, parsed_forecasts, scrape_time=None):
+        """
+        Adds one ZIP code's parsed forecast.
+
+        Args:
+            zip_code (str): 5-digit zip code.
+            parsed_forecasts (list): Dictionaries as returned by `split_weather_line()`.
+            scrape_time (datetime): Ignored; accepted so a batch can sit in a `FanOutSink` next to a history store.
+        """
+        zip_code = self._intern(zip_code, self.zip_codes, self._zip_index)
+        for weather_data in parsed_forecasts:
+            # Both enums are looked up first, so an unknown value raises before any column grows
+            condition = CONDITION_CODES[weather_data["condition"]]
+            wind_direction = WIND_DIRECTION_CODES[weather_data["wind_direction"]]
+            self.zip_code.append(zip_code)
+            self.date.append(self._intern(weather_data["date"], self.date_labels, self._date_index))
+            self.condition.append(condition)
+            high_temp = weather_data["high_temp"]
+            self.high_temp.append(MISSING_TEMP if high_temp is None else high_temp)
+            self.low_temp.append(weather_data["low_temp"])
+            self.wind_direction.append(wind_direction)
+            self.wind_speed.append(weather_data["wind_speed"])
+            self.rain_chance.append(weather_data["rain_chance"])
+
+    def records(self):
+        """
+        Yields:
+            tuple: (zip_code, ForecastRecord) for every stored day.
+        """
+        for i in range(len(self)):
+            high_temp = self.high_temp[i]
+            yield self.zip_codes[self.zip_code[i]], ForecastRecord(
+                self.date_labels[self.date[i]],
+                Condition(self.condition[i]),
+                None if high_temp == MISSING_TEMP else high_temp,
+                self.low_temp[i],
+                WindDirection(self.wind_direction[i]),
+                self.wind_speed[i],
+                self.rain_chance[i],
+            )
+
+    @classmethod
+    def from_forecasts(cls, forecasts_by_zip):
+        """
+        Args:
+            forecasts_by_zip (dict): Mapping of zip code to the list of dictionaries from `split_weather_line()`.
+
+        Returns:
+            batch (ForecastBatch): Batch holding every zip code's forecast.
+        """
+        batch = cls()
+        for zip_code, parsed_forecasts in forecasts_by_zip.items():
+            batch.append(zip_code, parsed_forecasts)
+        return batch
+
+    def to_forecasts(self):
+        """
+        Returns:
+            forecasts_by_zip (dict): Mapping of zip code to a list of dictionaries shaped like `split_weather_line()` output.
+        """
+        forecasts_by_zip = {zip_code: [] for zip_code in self.zip_codes}
+        for zip_code, record in self.records():
+            forecasts_by_zip[zip_code].append(record.to_dict())
+        return forecasts_by_zip
+
+    def to_frame(self):
+        """
+        Returns:
+            df (DataFrame): One row per forecast day with a leading `zip_code` column and the usual forecast columns,
+            using categorical and small integer dtypes.
+        """
+        import numpy as np
+        import pandas as pd
+
+        high_temp = np.frombuffer(self.high_temp, dtype=np.int16)
+        return pd.DataFrame({
+            "zip_code": pd.Categorical.from_codes(np.frombuffer(self.zip_code, dtype=np.uint32).astype(np.int32), self.zip_codes),
+            "date": pd.Categorical.from_codes(np.frombuffer(self.date, dtype=np.uint16).astype(np.int32), self.date_labels),
+            "condition": pd.Categorical.from_codes(np.frombuffer(self.condition, dtype=np.uint8), CONDITION_OPTIONS),
+            "high_temp": pd.Series(high_temp, dtype="Int16").mask(high_temp == MISSING_TEMP),
+            "low_temp": np.frombuffer(self.low_temp, dtype=np.int16),
+            "wind_direction": pd.Categorical.from_codes(np.frombuffer(self.wind_direction, dtype=np.uint8), WIND_DIRECTION_OPTIONS),
+            "wind_speed": np.frombuffer(self.wind_speed, dtype=np.uint8),
+            "rain_chance": np.frombuffer(self.rain_chance, dtype=np.uint16),
+        })
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Args:
+            df (DataFrame): Frame with a `zip_code` column plus the forecast columns, such as one from `to_frame()`.
+
+        Returns:
+            batch (ForecastBatch): Batch holding the frame's rows.
+        """
+        batch = cls()
+        for zip_code, group in df.groupby("zip_code", sort=False, observed=True):
+            parsed_forecasts = group[FIELDS].astype(object).where(group[FIELDS].notna(), None).to_dict("records")
+            batch.append(str(zip_code), parsed_forecasts)
+        return batch
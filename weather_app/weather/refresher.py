@@ -0,0 +1,141 @@
+'''
+Stale-while-revalidate layer for the Flask app.
+Requests are answered straight from the forecast cache even when the entry is slightly stale,
+while a background thread keeps a "hot set" of recently requested ZIP codes warm by re-scraping them
+shortly before their TTL runs out.
+
+'''
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .resilience import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_MARGIN = 120
+DEFAULT_MAX_STALE = 3600
+DEFAULT_HOT_SET_SIZE = 1000
+DEFAULT_HOT_WINDOW = 3600
+DEFAULT_INTERVAL = 15
+
+class BackgroundRefresher:
+    """
+    Wraps a `ForecastCache` so reads never wait on upstream unless nothing usable is cached.
+    Exposes `get(key)` like the cache itself, so it can be passed anywhere a cache is accepted.
+    """
+
+    def __init__(self, cache, refresh_margin=DEFAULT_REFRESH_MARGIN, max_stale=DEFAULT_MAX_STALE,
+                 hot_set_size=DEFAULT_HOT_SET_SIZE, hot_window=DEFAULT_HOT_WINDOW, interval=DEFAULT_INTERVAL, max_workers=4):
+        self.cache = cache
+        self.refresh_margin = refresh_margin
+        self.max_stale = max_stale
+        self.hot_set_size = hot_set_size
+        self.hot_window = hot_window
+        self.interval = interval
+        self._hot = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="forecast-refresh")
+
+    def get(self, key):
+        """
+        Returns the cached value for `key` immediately, scheduling a background refresh when it is close to or past its TTL.
+        Only blocks on upstream when nothing is cached or the entry is older than `max_stale`, and falls back
+        to a cached entry of any age while the upstream circuit breaker is open.
+
+        Args:
+            key (str): 5-digit zip code.
+
+        Returns:
+            value: Parsed forecast for the zip code.
+        """
+        entry = self.cache.lookup(key, max_age=self.max_stale)
+        if entry is None:
+            try:
+                value = self.cache.refresh(key, max_age=self.cache.ttl)
+            except CircuitOpenError:
+                entry = self.cache.lookup(key)
+                if entry is None:
+                    raise
+                value = entry[0]
+        else:
+            value, age = entry
+            if age >= self.cache.ttl - self.refresh_margin:
+                self._schedule(key)
+
+        # Only keys that loaded successfully join the hot set
+        self._touch(key)
+        return value
+
+    def age(self, key):
+        return self.cache.age(key)
+
+    def is_stale(self, key):
+        age = self.cache.age(key)
+        return age is not None and age >= self.cache.ttl
+
+    def _touch(self, key):
+        with self._lock:
+            self._hot[key] = time.time()
+            self._hot.move_to_end(key)
+            while len(self._hot) > self.hot_set_size:
+                self._hot.popitem(last=False)
+
+    def _schedule(self, key):
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._executor.submit(self._refresh, key)
+
+    def _refresh(self, key):
+        try:
+            # Skipped if another caller refreshed the key since it was scheduled
+            self.cache.refresh(key, max_age=self.cache.ttl - self.refresh_margin)
+        except Exception as e:
+            # Keep serving the stale entry; the next sweep will try again
+            logger.warning(f"Background refresh failed for {key}: {str(e)}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def sweep(self):
+        """
+        Schedules a refresh for every hot key due to expire within `refresh_margin`, and forgets keys idle for longer than `hot_window`.
+        """
+        now = time.time()
+        with self._lock:
+            while self._hot and now - next(iter(self._hot.values())) > self.hot_window:
+                self._hot.popitem(last=False)
+            hot_keys = list(self._hot)
+
+        for key in hot_keys:
+            age = self.cache.age(key)
+            if age is None or age >= self.cache.ttl - self.refresh_margin:
+                self._schedule(key)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Refresh sweep failed: {str(e)}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="forecast-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=False)
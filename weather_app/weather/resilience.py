@@ -0,0 +1,238 @@
+'''
+Resilience layer for requests to weather.com.
+Every upstream request gets connect/read timeouts, and passes through a token-bucket rate limit when one is set.
+Throttled or failed attempts are retried with jittered exponential backoff, but only while a global retry budget
+allows it, so retries cannot multiply load on an upstream that is already struggling. A circuit breaker fails
+fast with `CircuitOpenError` after repeated failures, letting callers serve cached forecasts until upstream recovers.
+
+'''
+
+import logging
+import os
+import random
+import threading
+import time
+
+from .metrics import REGISTRY
+from .ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+
+# Requests per second to weather.com from this process. Off (0) unless WEATHER_UPSTREAM_RPS is set, so bulk sweeps
+# are not capped by default; the farm and sweep commands take their own --rps
+DEFAULT_RATE = float(os.environ.get("WEATHER_UPSTREAM_RPS", 0))
+
+# Status codes worth retrying: throttling and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "weather_upstream_retries_total", "Retried upstream attempts, and retries refused by the retry budget.", ["outcome"])
+CIRCUIT_REJECTIONS = REGISTRY.counter(
+    "weather_circuit_rejections_total", "Upstream requests failed fast because the circuit breaker was open.")
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of contacting upstream while the circuit breaker is open.
+    """
+
+def backoff_delay(attempt, retry_after=None, base=DEFAULT_BACKOFF):
+    """
+    Computes how long to wait before the next attempt, honouring a numeric `Retry-After` header when present.
+
+    Args:
+        attempt (int): Zero-based number of the attempt that just failed.
+        retry_after (str): Value of the `Retry-After` response header, if any.
+        base (float): Base delay in seconds, doubled on every attempt.
+
+    Returns:
+        delay (float): Seconds to sleep.
+    """
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), MAX_BACKOFF)
+    return random.uniform(0, min(base * 2 ** attempt, MAX_BACKOFF))
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of recent requests. Every first attempt deposits `ratio` tokens, every retry spends one,
+    and a trickle of `min_per_second` tokens keeps a few retries available when traffic is low.
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, max_tokens=20):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, amount):
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + amount + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def record_request(self):
+        with self._lock:
+            self._refill(self.ratio)
+
+    def try_spend(self):
+        """
+        Returns:
+            bool: True if a retry may be made.
+        """
+        with self._lock:
+            self._refill(0)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects requests for `recovery_time` seconds,
+    then lets a single probe through: its success closes the circuit again, its failure re-opens it.
+    Failures are requests that got no response or a retryable status; any other answer, 404 included,
+    shows upstream is up and counts as a success.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, recovery_time=30):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a probe already in flight.
+        """
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_time:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+        CIRCUIT_REJECTIONS.inc()
+        raise CircuitOpenError("weather.com circuit breaker is open")
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Opening circuit breaker after {self._failures} consecutive upstream failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """
+        Settles an attempt that ended without an upstream outcome, such as a local error or an interrupt,
+        freeing the half-open probe slot without counting a success or a failure.
+        """
+        with self._lock:
+            self._probing = False
+
+class ResilientFetcher:
+    """
+    Makes GET requests to weather.com with timeouts, rate limiting, budgeted retries and a circuit breaker.
+    One instance is shared by every caller in a process, so the limits apply across all sessions and threads.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF,
+                 retry_budget=None, breaker=None):
+        self.bucket = TokenBucket(rate) if rate else None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.retry_budget = retry_budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker()
+
+    def get(self, url, session=None, headers=None):
+        """
+        Args:
+            url (str): Page to download.
+            session (Session): Optional session to reuse pooled connections. Defaults to a bare `requests.get`.
+            headers (dict): Optional request headers.
+
+        Returns:
+            response (Response): The first non-retryable response, or the last one once retries are exhausted.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            RequestException: If the last attempt timed out or could not connect.
+        """
+        import requests
+
+        self.retry_budget.record_request()
+        for attempt in range(self.max_retries + 1):
+            # Wait for the rate limit before taking the half-open probe slot, so the probe is not held while waiting
+            if self.bucket is not None:
+                self.bucket.acquire()
+            self.breaker.before_request()
+
+            retry_after = None
+            try:
+                response = (session or requests).get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self.breaker.record_failure()
+                if not self.may_retry(attempt):
+                    raise
+            except requests.RequestException:
+                # Upstream failed in some other way, e.g. a truncated body; not worth retrying
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                # Local errors and interrupts say nothing about upstream, but must still free a half-open probe
+                self.breaker.release()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                if not self.may_retry(attempt):
+                    return response
+                retry_after = response.headers.get("Retry-After")
+            time.sleep(backoff_delay(attempt, retry_after, self.backoff))
+
+    def may_retry(self, attempt, max_retries=None):
+        """
+        Decides whether a failed attempt may be retried, spending from the retry budget if so.
+
+        Args:
+            attempt (int): Zero-based number of the attempt that just failed.
+            max_retries (int): Retry limit of the caller. Defaults to this fetcher's `max_retries`.
+
+        Returns:
+            bool: True if the caller should back off and try again.
+        """
+        if attempt >= (self.max_retries if max_retries is None else max_retries):
+            return False
+        if not self.retry_budget.try_spend():
+            UPSTREAM_RETRIES.inc(outcome="budget_exhausted")
+            return False
+        UPSTREAM_RETRIES.inc(outcome="retried")
+        return True
+
+# Shared by every fetch in this process
+UPSTREAM = ResilientFetcher()
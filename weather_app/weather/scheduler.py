@@ -0,0 +1,265 @@
+'''
+Adaptive polling scheduler for keeping many ZIP codes fresh under a global requests-per-second budget.
+Each ZIP code sits in a priority queue keyed on its next due time. Its polling interval shrinks when its
+parsed forecast keeps changing (condition, temperature and rain chance deltas) or when users keep requesting it,
+and grows back towards `base_interval` for stable, unrequested regions.
+
+'''
+
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RPS = 1.0
+DEFAULT_MIN_INTERVAL = 300
+DEFAULT_BASE_INTERVAL = 3 * 3600
+DEFAULT_MAX_INTERVAL = 12 * 3600
+DEFAULT_VOLATILITY_WEIGHT = 2.0
+DEFAULT_DEMAND_WEIGHT = 0.5
+DEMAND_HALF_LIFE = 3600
+VOLATILITY_SMOOTHING = 0.3
+
+def forecast_change_score(old, new):
+    """
+    Scores how much a forecast changed between two polls. Days are matched by their date label;
+    a condition change counts 1, every 5°F of high/low temperature change counts 1, and every 20 points of rain chance count 1.
+    Nearer days weigh more than days at the end of the ten day range.
+
+    Args:
+        old (list): Previous dictionaries as returned by `split_weather_line()`.
+        new (list): Current dictionaries as returned by `split_weather_line()`.
+
+    Returns:
+        score (float): 0 for an identical forecast, growing with the size of the changes.
+    """
+    previous = {weather_data["date"]: weather_data for weather_data in old}
+    score = 0.0
+    for lead_day, weather_data in enumerate(new):
+        before = previous.get(weather_data["date"])
+        if before is None:
+            continue
+        change = float(weather_data["condition"] != before["condition"])
+        for field in ("high_temp", "low_temp"):
+            if weather_data[field] is not None and before[field] is not None:
+                change += abs(weather_data[field] - before[field]) / 5
+        change += abs(weather_data["rain_chance"] - before["rain_chance"]) / 20
+        score += change / (1 + lead_day / 4)
+    return score
+
+class ZipState:
+    """
+    Polling history of one ZIP code.
+    """
+
+    def __init__(self, now):
+        self.due = now
+        self.last_poll = None
+        self.last_forecast = None
+        self.volatility = 0.0
+        self.demand = 0.0
+        self.demand_updated = now
+        self.last_request = None
+        self.polls = 0
+        self.failures = 0
+        self.in_flight = False
+
+    def demand_rate(self, now):
+        """
+        Returns:
+            rate (float): Exponentially decayed requests per hour.
+        """
+        decayed = self.demand * 0.5 ** ((now - self.demand_updated) / DEMAND_HALF_LIFE)
+        return decayed * math.log(2) * 3600 / DEMAND_HALF_LIFE
+
+class PollingScheduler:
+    """
+    Polls ZIP codes in order of their next due time from a background dispatcher thread, never starting more than
+    `rps` requests per second overall. `fetch(zip_code)` must return parsed forecasts as `split_weather_line()` does;
+    pass `ForecastCache.refresh` to keep a cache warm, or `get_parsed_forecast` with an `on_result` callback.
+    """
+
+    def __init__(self, fetch, rps=DEFAULT_RPS, min_interval=DEFAULT_MIN_INTERVAL, base_interval=DEFAULT_BASE_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL, volatility_weight=DEFAULT_VOLATILITY_WEIGHT,
+                 demand_weight=DEFAULT_DEMAND_WEIGHT, forget_after=None, on_result=None, max_workers=4):
+        self.fetch = fetch
+        self.bucket = TokenBucket(rps)
+        self.min_interval = min_interval
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.volatility_weight = volatility_weight
+        self.demand_weight = demand_weight
+        self.forget_after = forget_after
+        self.on_result = on_result
+        self._states = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="forecast-poll")
+
+    def interval(self, zip_code, now=None):
+        """
+        Computes how long to wait between polls of a ZIP code from its volatility and demand.
+
+        Returns:
+            interval (float): Seconds, between `min_interval` and `max_interval`.
+        """
+        now = now or time.time()
+        state = self._states[zip_code]
+        weight = 1 + self.volatility_weight * state.volatility + self.demand_weight * state.demand_rate(now)
+        return min(self.max_interval, max(self.min_interval, self.base_interval / weight))
+
+    def _push(self, zip_code, due):
+        self._states[zip_code].due = due
+        heapq.heappush(self._heap, (due, next(self._counter), zip_code))
+        self._wakeup.notify()
+
+    def add(self, zip_code, due=None):
+        """
+        Starts polling a ZIP code, first at `due` (defaults to now). ZIP codes already scheduled are left alone.
+        """
+        now = time.time()
+        with self._wakeup:
+            if zip_code not in self._states:
+                self._states[zip_code] = ZipState(now)
+                self._push(zip_code, due if due is not None else now)
+
+    def record_request(self, zip_code):
+        """
+        Counts a user request for a ZIP code, scheduling it if it is new and moving its next poll earlier
+        when the extra demand shortens its interval.
+        """
+        now = time.time()
+        with self._wakeup:
+            state = self._states.get(zip_code)
+            if state is None:
+                # The request just loaded a fresh forecast, so the first poll can wait a full interval
+                state = self._states[zip_code] = ZipState(now)
+                state.last_poll = now
+                state.due = math.inf
+            state.demand = state.demand * 0.5 ** ((now - state.demand_updated) / DEMAND_HALF_LIFE) + 1
+            state.demand_updated = now
+            state.last_request = now
+            if not state.in_flight:
+                due = max(now, (state.last_poll or now) + self.interval(zip_code, now))
+                if due < state.due:
+                    self._push(zip_code, due)
+
+    def remove(self, zip_code):
+        with self._wakeup:
+            self._states.pop(zip_code, None)
+
+    def _next_due(self):
+        """
+        Pops stale heap entries and returns the (due, zip_code) of the earliest live one, or None.
+        """
+        while self._heap:
+            due, _, zip_code = self._heap[0]
+            state = self._states.get(zip_code)
+            if state is None or state.in_flight or state.due != due:
+                heapq.heappop(self._heap)
+                continue
+            return due, zip_code
+        return None
+
+    def _poll(self, zip_code):
+        try:
+            forecast = self.fetch(zip_code)
+        except Exception as e:
+            forecast = None
+            logger.warning(f"Scheduled poll failed for {zip_code}: {str(e)}")
+
+        now = time.time()
+        with self._wakeup:
+            state = self._states.get(zip_code)
+            if state is None:
+                return
+            state.in_flight = False
+            if forecast is not None:
+                if state.last_forecast is not None:
+                    hours = max(now - state.last_poll, self.min_interval) / 3600
+                    rate = forecast_change_score(state.last_forecast, forecast) / hours
+                    state.volatility = VOLATILITY_SMOOTHING * rate + (1 - VOLATILITY_SMOOTHING) * state.volatility
+                state.last_forecast = forecast
+                state.last_poll = now
+                state.polls += 1
+                state.failures = 0
+            else:
+                state.failures += 1
+
+            if self.forget_after is not None and state.last_request is not None and now - state.last_request > self.forget_after:
+                # Requested ZIP codes are dropped once nobody has asked for them in a while
+                del self._states[zip_code]
+                return
+            if forecast is not None:
+                self._push(zip_code, now + self.interval(zip_code, now))
+            else:
+                # Failing ZIP codes back off exponentially so they cannot eat the request budget
+                self._push(zip_code, now + min(self.max_interval, self.min_interval * 2 ** (state.failures - 1)))
+
+        if forecast is not None and self.on_result is not None:
+            self.on_result(zip_code, forecast)
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._wakeup:
+                entry = self._next_due()
+                delay = None if entry is None else entry[0] - time.time()
+                if delay is None or delay > 0:
+                    self._wakeup.wait(delay)
+                    continue
+
+            wait = self.bucket.try_acquire()
+            if wait:
+                self._stop.wait(wait)
+                continue
+
+            with self._wakeup:
+                entry = self._next_due()
+                if entry is None or entry[0] > time.time():
+                    continue
+                heapq.heappop(self._heap)
+                self._states[entry[1]].in_flight = True
+            self._executor.submit(self._poll, entry[1])
+
+    def stats(self):
+        """
+        Returns:
+            stats (dict): Per ZIP code polling interval, volatility, demand and seconds until the next poll.
+        """
+        now = time.time()
+        with self._wakeup:
+            return {
+                zip_code: {
+                    "interval": round(self.interval(zip_code, now)),
+                    "volatility": round(state.volatility, 3),
+                    "demand_per_hour": round(state.demand_rate(now), 3),
+                    "next_poll_in": round(max(0, state.due - now)),
+                    "polls": state.polls,
+                }
+                for zip_code, state in self._states.items()
+            }
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="forecast-poller", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=False)
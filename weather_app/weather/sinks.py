@@ -0,0 +1,53 @@
+'''
+Sink stage of the forecast pipeline. A sink is any object with `append(zip_code, parsed_forecasts, scrape_time=None)`
+and optionally `flush()`; `HistoryStore`, `IncrementalHistoryStore`, `ForecastCube`, `ForecastBatch` and `RunningStats`
+already qualify.
+This module adds the per-ZIP CSV files the command line scripts have always written.
+
+'''
+
+import os
+from datetime import datetime
+
+from .metrics import stage_timer
+
+class CsvSink:
+    """
+    Writes one `weather_forecast_[ZIP_CODE]_[DATE].csv` file per ZIP code into `directory`.
+    """
+
+    def __init__(self, directory=".", date=None):
+        self.directory = directory
+        self.date = (date or datetime.now()).strftime("%Y%m%d")
+        self.paths = {}
+
+    def path(self, zip_code):
+        return os.path.join(self.directory, f"weather_forecast_{zip_code}_{self.date}.csv")
+
+    def append(self, zip_code, parsed_forecasts, scrape_time=None):
+        # Files are named by the date the sink was created with, so `scrape_time` is accepted and ignored
+        import pandas as pd
+
+        with stage_timer("dataframe"):
+            df = pd.DataFrame(parsed_forecasts)
+        with stage_timer("csv_write"):
+            df.to_csv(self.path(zip_code), index=False)
+        self.paths[zip_code] = self.path(zip_code)
+
+class FanOutSink:
+    """
+    Appends every result to several sinks, e.g. CSV files and a history store in the same run.
+    Extra arguments such as the `scrape_time` of a history store are passed on to every sink, so each must accept them.
+    """
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    def append(self, zip_code, parsed_forecasts, *args):
+        for sink in self.sinks:
+            sink.append(zip_code, parsed_forecasts, *args)
+
+    def flush(self):
+        for sink in self.sinks:
+            if hasattr(sink, "flush"):
+                sink.flush()
@@ -0,0 +1,157 @@
+'''
+On-disk store of compressed raw forecast pages and their HTTP validators.
+Lets `get_weather_forecast()` send conditional requests and reuse the previous parse on a 304,
+and lets the parser be re-run over historical pages without touching the network.
+
+'''
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+
+SNAPSHOT_SUFFIX = ".html.gz"
+TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S%f"
+
+# Process umask, read once at import as os.umask() can only be read by replacing it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+class SnapshotStore:
+    """
+    Keeps one directory per ZIP code holding gzipped page snapshots and a `meta.json` with the latest
+    `ETag`/`Last-Modified` validators and the forecast strings extracted from the latest page.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _zip_dir(self, zip_code):
+        return os.path.join(self.directory, zip_code)
+
+    def load_meta(self, zip_code):
+        try:
+            with open(os.path.join(self._zip_dir(zip_code), "meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def conditional_headers(self, zip_code):
+        """
+        Returns:
+            headers (dict): `If-None-Match`/`If-Modified-Since` headers for the latest snapshot, empty if there is none.
+        """
+        meta = self.load_meta(zip_code)
+        headers = {}
+        if meta is not None and meta.get("forecasts") is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def load_forecasts(self, zip_code):
+        """
+        Returns:
+            forecasts (list): Forecast strings extracted from the latest snapshot of a zip code.
+        """
+        meta = self.load_meta(zip_code)
+        if meta is None:
+            raise KeyError(f"No snapshot stored for ZIP code {zip_code}")
+        return meta["forecasts"]
+
+    def load_page(self, zip_code):
+        """
+        Returns:
+            content (bytes): Raw HTML of the latest snapshot of a zip code.
+        """
+        meta = self.load_meta(zip_code)
+        if meta is None or not meta.get("snapshot"):
+            raise KeyError(f"No snapshot stored for ZIP code {zip_code}")
+        with gzip.open(os.path.join(self._zip_dir(zip_code), meta["snapshot"]), "rb") as f:
+            return f.read()
+
+    def save(self, zip_code, content, headers, forecasts):
+        """
+        Stores a freshly downloaded page with its validators and extracted forecasts.
+        A new snapshot file is only written when the page content actually changed.
+
+        Args:
+            zip_code (str): 5-digit zip code.
+            content (bytes): Raw HTML of the forecast page.
+            headers (Mapping): Response headers.
+            forecasts (list): Forecast strings extracted from `content`.
+        """
+        zip_dir = self._zip_dir(zip_code)
+        os.makedirs(zip_dir, exist_ok=True)
+
+        meta = self.load_meta(zip_code) or {}
+        digest = hashlib.sha256(content).hexdigest()
+        fetched_at = datetime.now()
+        if digest != meta.get("sha256"):
+            snapshot = fetched_at.strftime(TIMESTAMP_FORMAT) + SNAPSHOT_SUFFIX
+            with gzip.open(os.path.join(zip_dir, snapshot), "wb") as f:
+                f.write(content)
+            meta["snapshot"] = snapshot
+            meta["sha256"] = digest
+
+        meta.update({
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": fetched_at.isoformat(),
+            "forecasts": forecasts,
+        })
+
+        # Write to a temporary file first so readers never see a half-written meta.json; the name is unique so
+        # concurrent writers of the same ZIP code never share one
+        with tempfile.NamedTemporaryFile("w", dir=zip_dir, prefix="meta.", suffix=".tmp", delete=False) as f:
+            try:
+                json.dump(meta, f)
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        # Temporary files are private (0600); give meta.json the permissions of a normally created file
+        os.chmod(f.name, 0o666 & ~UMASK)
+        os.replace(f.name, os.path.join(zip_dir, "meta.json"))
+
+    def iter_snapshots(self, zip_codes=None):
+        """
+        Yields every stored page, oldest first within each zip code.
+
+        Args:
+            zip_codes (list): Optional zip codes to restrict the replay to. Defaults to every stored zip code.
+
+        Yields:
+            tuple: (zip_code, fetched_at, content)
+        """
+        if zip_codes is None:
+            zip_codes = sorted(os.listdir(self.directory))
+        for zip_code in zip_codes:
+            zip_dir = self._zip_dir(zip_code)
+            if not os.path.isdir(zip_dir):
+                continue
+            for name in sorted(os.listdir(zip_dir)):
+                if not name.endswith(SNAPSHOT_SUFFIX):
+                    continue
+                fetched_at = datetime.strptime(name[:-len(SNAPSHOT_SUFFIX)], TIMESTAMP_FORMAT)
+                with gzip.open(os.path.join(zip_dir, name), "rb") as f:
+                    yield zip_code, fetched_at, f.read()
+
+def replay(store, extractor, zip_codes=None):
+    """
+    Re-runs an extractor over stored snapshots entirely offline.
+
+    Args:
+        store (SnapshotStore): Store holding the snapshots.
+        extractor (callable): Function turning raw HTML into forecast strings, such as `extract_forecasts()`.
+        zip_codes (list): Optional zip codes to restrict the replay to.
+
+    Yields:
+        tuple: (zip_code, fetched_at, forecasts)
+    """
+    for zip_code, fetched_at, content in store.iter_snapshots(zip_codes):
+        yield zip_code, fetched_at, extractor(content)
@@ -0,0 +1,286 @@
+'''
+Forecast verification: how close did the forecasts scraped N days ahead come to what the same ZIP code's
+"Today" row reported on the day itself?
+
+The relative date labels of a scrape (`Today`, `Tonight`, `Mon 12`) are resolved to absolute dates against the scrape
+time, every forecast made one or more days ahead is joined to the outcome of its ZIP code and date, and MAE, bias and
+Brier scores are reduced by lead day and optionally by region. Everything runs on whole columns, so one nightly run
+covers the full history of every ZIP code. Input is any long frame with `zip_code`, a scrape time column
+(`scrape_time` from `HistoryStore.query()` or `issue_time` from `ForecastCube.to_frame()`), a date label column
+(`forecast_date` or `date`) and the forecast columns.
+
+The scraped pages carry no observed precipitation, so a day counts as rainy when its last "Today" report gave a rain
+chance of at least `RAIN_THRESHOLD` percent.
+
+Usage: python -m weather.verification (--history DB [--incremental] | --cube DIR) [--start ISO] [--end ISO] [--by zip3] [--out CSV]
+
+'''
+
+import argparse
+from datetime import datetime
+
+from .analytics import REGION_KEY, group_keys
+
+# Labels of the forecast days that fall on the scrape date itself
+SAME_DAY_LABELS = ["Today", "Tonight"]
+# Label of the row whose values stand in for the observed outcome
+OUTCOME_LABEL = "Today"
+WEEKDAYS = {name: number for number, name in enumerate(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"])}
+# Longest lead a ten day forecast page can reach; labels resolving further out are treated as unresolvable
+MAX_LEAD_DAYS = 15
+RAIN_THRESHOLD = 50
+
+SCORE_COLUMNS = ["pairs", "high_mae", "high_bias", "low_mae", "low_bias", "brier", "rain_rate"]
+
+def _resolve(labels, issue_times):
+    """
+    Returns:
+        tuple: (dates, offsets) arrays of the resolved `datetime64[D]` dates, NaT where unresolvable,
+        and the days from the issue date to each of them.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if not isinstance(labels.dtype, pd.CategoricalDtype):
+        labels = labels.astype("category")
+    categories = pd.Series(labels.cat.categories.astype(str))
+    parts = categories.str.extract(r"^(\w{3}) (\d{1,2})$")
+    same_day = categories.isin(SAME_DAY_LABELS).to_numpy()
+    # Day of month and weekday of every distinct label: 0 for the issue date itself, -1 when it cannot be parsed
+    label_days = np.where(same_day, 0, pd.to_numeric(parts[1]).fillna(-1).to_numpy()).astype("int64")
+    label_weekdays = parts[0].map(WEEKDAYS).fillna(-1).to_numpy().astype("int64")
+
+    codes = labels.cat.codes.to_numpy()
+    known = codes >= 0
+    day = np.where(known, label_days[codes], -1)
+    weekday = np.where(known, label_weekdays[codes], -1)
+
+    issued = np.asarray(issue_times, dtype="datetime64[ns]").astype("datetime64[D]")
+    month = issued.astype("datetime64[M]")
+    month_start = month.astype("datetime64[D]")
+    issue_day = (issued - month_start).astype("int64") + 1
+    month_length = ((month + 1).astype("datetime64[D]") - month_start).astype("int64")
+    # Days ahead to the next date with the label's day of month, rolling over into the following month
+    offsets = np.where(day >= issue_day, day - issue_day, month_length - issue_day + day)
+    offsets = np.where(day == 0, 0, offsets)
+    dates = issued + offsets.astype("timedelta64[D]")
+
+    # 1970-01-01 was a Thursday, so Monday is 0 after shifting by 3
+    dates_weekday = (dates.astype("int64") + 3) % 7
+    invalid = (day < 0) | np.isnat(issued) | (offsets > MAX_LEAD_DAYS) | ((weekday >= 0) & (dates_weekday != weekday))
+    dates[invalid] = np.datetime64("NaT")
+    return dates, offsets
+
+def resolve_dates(labels, issue_times):
+    """
+    Resolves relative forecast date labels to absolute dates. `Today` and `Tonight` are the issue date, and a label such
+    as `Mon 12` is the first date on or after the issue date falling on the 12th, which must also be a Monday.
+    Labels are parsed once per distinct label, the date arithmetic runs on whole arrays.
+
+    Args:
+        labels (Series): Date labels as strings or a categorical.
+        issue_times (Series): Scrape times aligned with `labels`.
+
+    Returns:
+        dates (Series): Midnight of each resolved date, NaT where the label cannot be resolved.
+    """
+    import pandas as pd
+
+    dates, _ = _resolve(labels, pd.to_datetime(issue_times))
+    return pd.Series(dates.astype("datetime64[ns]"), index=labels.index, name="valid_date")
+
+def _columns(df):
+    """
+    Returns:
+        tuple: (issue_column, date_column) names of a history query or a cube frame.
+    """
+    issue_column = "issue_time" if "issue_time" in df else "scrape_time"
+    date_column = "date" if "date" in df else "forecast_date"
+    return issue_column, date_column
+
+def attach_dates(df):
+    """
+    Adds the resolved `valid_date` and the whole days `lead_days` between scrape date and valid date,
+    dropping rows whose date label cannot be resolved.
+
+    Args:
+        df (DataFrame): Long forecast frame with a scrape time and a date label column.
+
+    Returns:
+        df (DataFrame): The resolvable rows with the two extra columns.
+    """
+    import numpy as np
+    import pandas as pd
+
+    issue_column, date_column = _columns(df)
+    dates, offsets = _resolve(df[date_column], pd.to_datetime(df[issue_column]))
+    keep = ~np.isnat(dates)
+    df = df[keep].assign(valid_date=dates[keep].astype("datetime64[ns]"), lead_days=offsets[keep].astype("int8"))
+    # Categorical ZIP codes give the integer join keys below and let region prefixes be computed once per ZIP code
+    if not isinstance(df["zip_code"].dtype, pd.CategoricalDtype):
+        df["zip_code"] = df["zip_code"].astype(str).astype("category")
+    return df
+
+def _join_keys(df):
+    """
+    Returns:
+        keys (ndarray): One int64 per row combining the ZIP code's category code and the valid date's day number.
+    """
+    days = df["valid_date"].to_numpy().astype("datetime64[D]").astype("int64")
+    return df["zip_code"].cat.codes.to_numpy().astype("int64") * (1 << 32) + days
+
+def outcomes(df, rain_threshold=RAIN_THRESHOLD):
+    """
+    Picks the outcome of every (zip_code, valid_date): the "Today" row of the last scrape made on that date.
+
+    Args:
+        df (DataFrame): Frame returned by `attach_dates()`.
+        rain_threshold (int): Rain chance in percent at which the day counts as rainy.
+
+    Returns:
+        df (DataFrame): One row per (zip_code, valid_date) with `observed_high`, `observed_low` and the 0/1 `observed_rain`.
+    """
+    issue_column, date_column = _columns(df)
+    today = df[(df[date_column] == OUTCOME_LABEL).to_numpy()]
+    today = today.sort_values(issue_column, kind="stable").drop_duplicates(["zip_code", "valid_date"], keep="last")
+    return today[["zip_code", "valid_date"]].assign(
+        observed_high=today["high_temp"].to_numpy(dtype="float64", na_value=float("nan")),
+        observed_low=today["low_temp"].to_numpy(dtype="float64", na_value=float("nan")),
+        observed_rain=(today["rain_chance"].to_numpy(dtype="float64", na_value=float("nan")) >= rain_threshold).astype("float64"),
+    )
+
+def match_outcomes(data, rain_threshold=RAIN_THRESHOLD):
+    """
+    Joins every forecast made at least one day ahead to the outcome of its ZIP code and valid date.
+
+    Args:
+        data (DataFrame): Long forecast frame with a scrape time and a date label column (see the module docstring).
+        rain_threshold (int): Rain chance in percent at which the outcome day counts as rainy.
+
+    Returns:
+        df (DataFrame): One row per matched forecast with its `lead_days`, `valid_date`, forecast columns and the
+        `observed_*` columns of its outcome.
+    """
+    import numpy as np
+
+    df = attach_dates(data)
+    observed = outcomes(df, rain_threshold)
+    forecasts = df[(df["lead_days"] >= 1).to_numpy()]
+
+    # A binary search over the sorted outcome keys replaces a hash join over millions of forecasts
+    observed = observed.iloc[np.argsort(_join_keys(observed), kind="stable")]
+    observed_keys = _join_keys(observed)
+    keys = _join_keys(forecasts)
+    position = np.minimum(np.searchsorted(observed_keys, keys), max(len(observed_keys) - 1, 0))
+    found = observed_keys[position] == keys if len(observed_keys) else np.zeros(len(keys), dtype=bool)
+    position = position[found]
+    return forecasts[found].assign(**{
+        column: observed[column].to_numpy()[position] for column in ["observed_high", "observed_low", "observed_rain"]
+    })
+
+def score_frame(matched, by=None):
+    """
+    Reduces matched forecasts to verification scores per lead day.
+
+    Args:
+        matched (DataFrame): Frame returned by `match_outcomes()`.
+        by (str or list): Optional column name(s), or `REGION_KEY`, to score separately in addition to the lead day.
+
+    Returns:
+        scores (DataFrame): Indexed by `by` and `lead_days`, with the number of matched `pairs`, mean absolute error
+        and bias (forecast minus outcome) of the high and low temperatures, the Brier score of the rain chance and
+        the observed `rain_rate`. Errors skip pairs with a missing temperature.
+    """
+    import numpy as np
+    import pandas as pd
+
+    def values(column):
+        return matched[column].to_numpy(dtype="float64", na_value=np.nan)
+
+    high_error = values("high_temp") - values("observed_high")
+    low_error = values("low_temp") - values("observed_low")
+    rain_error = values("rain_chance") / 100 - values("observed_rain")
+    errors = pd.DataFrame({
+        "high_error": high_error, "high_abs": np.abs(high_error),
+        "low_error": low_error, "low_abs": np.abs(low_error),
+        "brier": rain_error * rain_error, "rain": values("observed_rain"),
+    }, index=matched.index)
+
+    keys = (group_keys(matched, by) if by is not None else []) + [matched["lead_days"]]
+    grouped = errors.groupby(keys, observed=True, sort=True)
+    scores = grouped.mean()
+    scores.insert(0, "pairs", grouped.size())
+    return scores.rename(columns={
+        "high_abs": "high_mae", "high_error": "high_bias", "low_abs": "low_mae", "low_error": "low_bias", "rain": "rain_rate",
+    })[SCORE_COLUMNS]
+
+def verify(data, by=None, rain_threshold=RAIN_THRESHOLD):
+    """
+    Scores a forecast history against its own outcomes.
+
+    Args:
+        data (DataFrame): Long forecast frame with a scrape time and a date label column (see the module docstring).
+        by (str or list): Optional column name(s), or `REGION_KEY`, to score separately in addition to the lead day.
+        rain_threshold (int): Rain chance in percent at which the outcome day counts as rainy.
+
+    Returns:
+        scores (DataFrame): See `score_frame()`.
+    """
+    return score_frame(match_outcomes(data, rain_threshold), by)
+
+def load_history(store, start=None, end=None):
+    """
+    Reads every ZIP code of a history store into one long frame.
+
+    Args:
+        store (HistoryStore): Plain or incremental history store.
+        start (datetime): Earliest scrape time to include.
+        end (datetime): Latest scrape time to include.
+
+    Returns:
+        df (DataFrame): Concatenated `query()` results.
+    """
+    import pandas as pd
+
+    frames = [store.query(zip_code, start, end) for zip_code in store.zip_codes()]
+    if not frames:
+        return store.query("", start, end)
+    return pd.concat(frames, ignore_index=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="weather.verification", description="Score scraped forecasts against the later same-day reports.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--history", help="History store SQLite file to verify")
+    source.add_argument("--cube", help="Forecast cube directory to verify")
+    parser.add_argument("--incremental", action="store_true", help="The history store was written with --incremental")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Earliest scrape time to include (ISO format)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Latest scrape time to include (ISO format)")
+    parser.add_argument("--by", choices=[REGION_KEY, "zip_code"], help="Also score each region or ZIP code separately")
+    parser.add_argument("--rain-threshold", type=int, default=RAIN_THRESHOLD, help="Same-day rain chance that counts as a rainy day")
+    parser.add_argument("--out", help="Write the scores to this CSV file instead of printing them")
+    args = parser.parse_args(argv)
+
+    if args.cube:
+        from .cube import ForecastCube
+
+        cube = ForecastCube(args.cube, readonly=True)
+        data = cube.to_frame(args.start, args.end)
+        cube.close()
+    else:
+        from .history import HistoryStore, IncrementalHistoryStore
+
+        store = IncrementalHistoryStore(args.history) if args.incremental else HistoryStore(args.history)
+        data = load_history(store, args.start, args.end)
+        store.close()
+
+    scores = verify(data, args.by, args.rain_threshold)
+    if args.out:
+        scores.to_csv(args.out)
+        print(f"Scores of {int(scores['pairs'].sum())} forecasts saved to {args.out}")
+    else:
+        print("\nForecast Verification by Lead Day:")
+        print(scores)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
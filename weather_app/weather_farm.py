@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+'''
+weather-farm: multi-process scrape farm for large ZIP code sweeps, a command line wrapper over `weather.farm`.
+Finished ZIP codes are checkpointed, so an interrupted sweep resumes where it stopped.
+With --incremental only forecast days that changed since the previous sweep are written.
+
+Usage: python weather_farm.py ZIP_FILE --db history.db [--checkpoint sweep.done] [--workers N]
+
+'''
+
+import argparse
+import logging
+import sys
+
+from weather.farm import run_farm, DEFAULT_THREADS_PER_WORKER, DEFAULT_FLUSH_EVERY
+from weather.fetchers import FORECAST_URL
+from weather.locations import LocationMap
+from weather.metrics import summary
+from weather.resilience import DEFAULT_RATE
+
+logging.basicConfig(level=logging.INFO)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="weather-farm", description="Sweep weather.com forecasts for many ZIP codes across all cores.")
+    parser.add_argument("zip_file", help="File with one 5-digit ZIP code per line, or - for stdin")
+    parser.add_argument("--db", required=True, help="History store SQLite file to write to")
+    parser.add_argument("--checkpoint", help="Checkpoint file of finished ZIP codes, used to resume interrupted sweeps")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: number of cores)")
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS_PER_WORKER, help="Concurrent requests per worker")
+    parser.add_argument("--flush-every", type=int, default=DEFAULT_FLUSH_EVERY, help="ZIP codes between flushes and checkpoints")
+    parser.add_argument("--url-template", default=FORECAST_URL, help="Forecast URL with a {zip_code} placeholder")
+    parser.add_argument("--rps", type=float, default=DEFAULT_RATE, help="Requests per second to weather.com across all workers (default: WEATHER_UPSTREAM_RPS, else no limit)")
+    parser.add_argument("--incremental", action="store_true", help="Only store forecast days that changed since the last sweep")
+    parser.add_argument("--cube", help="Also write every scrape to this memory-mapped forecast cube directory")
+    parser.add_argument("--locations", help="ZIP code to forecast location SQLite file, so ZIP codes sharing a location are fetched once")
+    parser.add_argument("--location-table", help="CSV file of zip_code,location_key rows to load into --locations first")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.zip_file == "-" else open(args.zip_file)
+    zip_codes = [line.strip() for line in source if line.strip()]
+
+    if args.location_table:
+        if not args.locations:
+            parser.error("--location-table requires --locations")
+        print(f"Loaded {LocationMap(args.locations).load_table(args.location_table)} ZIP code locations")
+
+    written, errors = run_farm(zip_codes, args.db, args.checkpoint, args.workers, args.threads,
+                               flush_every=args.flush_every, url_template=args.url_template, incremental=args.incremental, rate=args.rps,
+                               locations_path=args.locations, cube_path=args.cube)
+    print(f"Sweep finished: {written} ZIP codes written, {len(errors)} failed")
+    for zip_code, error in errors.items():
+        print(f"{zip_code}: {error}")
+    print(summary())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+'''
+weather-sweep: distributed ZIP code sweeps over a shared work queue, a command line wrapper over `weather.coordinator`.
+QUEUE is the path of a SQLite file for single host sweeps, or a redis:// URL (optionally ending in #NAME) for
+workers on several hosts.
+
+Usage:
+    python weather_sweep.py submit QUEUE ZIP_FILE [--unit-size N] [--locations DB]
+    python weather_sweep.py work QUEUE [--processes N] [--threads N] [--rps R]    (on every worker host)
+    python weather_sweep.py drain QUEUE --db history.db [--cube DIR] [--follow]   (on one host)
+    python weather_sweep.py progress QUEUE [--watch SECONDS]
+
+'''
+
+import argparse
+import logging
+import multiprocessing
+import sys
+import time
+
+from weather.coordinator import plan_units, sweep_worker, drain, run_coordinator, progress, format_progress
+from weather.farm import DEFAULT_THREADS_PER_WORKER, DEFAULT_CHUNK_SIZE
+from weather.fetchers import FORECAST_URL
+from weather.locations import LocationMap
+from weather.metrics import summary
+from weather.queues import open_queue, DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS
+from weather.resilience import DEFAULT_RATE
+
+logging.basicConfig(level=logging.INFO)
+
+def work(queue_url, max_attempts, **options):
+    # Each process opens its own queue, as SQLite connections must not cross a fork
+    completed = sweep_worker(open_queue(queue_url, max_attempts), **options)
+    logging.info(f"Worker finished after {completed} units")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="weather-sweep", description="Sweep weather.com forecasts for many ZIP codes across several hosts.")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS, help="Leases a unit may use up before it is given up")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="Split ZIP codes into work units on the queue")
+    submit.add_argument("queue", help="SQLite file or redis:// URL of the work queue")
+    submit.add_argument("zip_file", help="File with one 5-digit ZIP code per line, or - for stdin")
+    submit.add_argument("--unit-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Forecast locations per work unit")
+    submit.add_argument("--sweep", default="sweep", help="Sweep name, the prefix of the unit ids")
+    submit.add_argument("--locations", help="ZIP code to forecast location SQLite file, so ZIP codes sharing a location go in one unit")
+    submit.add_argument("--location-table", help="CSV file of zip_code,location_key rows to load into --locations first")
+
+    worker = commands.add_parser("work", help="Lease and scrape work units until the queue is empty")
+    worker.add_argument("queue", help="SQLite file or redis:// URL of the work queue")
+    worker.add_argument("--processes", type=int, default=1, help="Worker processes on this host")
+    worker.add_argument("--threads", type=int, default=DEFAULT_THREADS_PER_WORKER, help="Concurrent requests per worker process")
+    worker.add_argument("--url-template", default=FORECAST_URL, help="Forecast URL with a {zip_code} placeholder")
+    worker.add_argument("--rps", type=float, default=DEFAULT_RATE, help="Requests per second to weather.com from this host (default: WEATHER_UPSTREAM_RPS, else no limit)")
+    worker.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS, help="Lease duration in seconds")
+    worker.add_argument("--locations", help="ZIP code to forecast location SQLite file to persist learned locations to")
+    worker.add_argument("--worker-id", help="Worker name in the progress view (default: host:pid)")
+
+    writer = commands.add_parser("drain", help="Write completed work units to the history store")
+    writer.add_argument("queue", help="SQLite file or redis:// URL of the work queue")
+    writer.add_argument("--db", required=True, help="History store SQLite file to write to")
+    writer.add_argument("--incremental", action="store_true", help="Only store forecast days that changed since the last sweep")
+    writer.add_argument("--cube", help="Also write every scrape to this memory-mapped forecast cube directory")
+    writer.add_argument("--follow", action="store_true", help="Keep draining until every unit is written or dead")
+
+    report = commands.add_parser("progress", help="Show unit counts and the throughput of every worker")
+    report.add_argument("queue", help="SQLite file or redis:// URL of the work queue")
+    report.add_argument("--watch", type=float, help="Refresh every this many seconds until no unit is pending or leased")
+    args = parser.parse_args(argv)
+
+    if args.command == "submit":
+        source = sys.stdin if args.zip_file == "-" else open(args.zip_file)
+        zip_codes = [line.strip() for line in source if line.strip()]
+        locations = None
+        if args.location_table and not args.locations:
+            parser.error("--location-table requires --locations")
+        if args.locations:
+            locations = LocationMap(args.locations)
+            if args.location_table:
+                print(f"Loaded {locations.load_table(args.location_table)} ZIP code locations")
+        units = plan_units(zip_codes, args.unit_size, locations, args.sweep)
+        added = open_queue(args.queue, args.max_attempts).enqueue(units)
+        print(f"Submitted {added} new work units ({len(units) - added} already queued) for {len(set(zip_codes))} ZIP codes")
+
+    elif args.command == "work":
+        options = dict(threads=args.threads, url_template=args.url_template, rate=args.rps / args.processes,
+                       lease_seconds=args.lease, locations_path=args.locations, worker_id=args.worker_id)
+        if args.processes == 1:
+            work(args.queue, args.max_attempts, **options)
+            print(summary())
+            return
+        context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+        processes = [
+            context.Process(target=work, args=(args.queue, args.max_attempts),
+                            kwargs=dict(options, worker_id=f"{args.worker_id}-{i}" if args.worker_id else None))
+            for i in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+    elif args.command == "drain":
+        from weather.history import HistoryStore, IncrementalHistoryStore
+        from weather.sinks import FanOutSink
+
+        work_queue = open_queue(args.queue, args.max_attempts)
+        store_class = IncrementalHistoryStore if args.incremental else HistoryStore
+        with store_class(args.db) as history:
+            sinks = [history]
+            if args.cube:
+                from weather.cube import ForecastCube
+
+                sinks.append(ForecastCube(args.cube))
+            sink = FanOutSink(sinks)
+            try:
+                written, errors = run_coordinator(work_queue, sink) if args.follow else drain(work_queue, sink)
+            finally:
+                for store in sinks[1:]:
+                    store.close()
+        print(f"Drained {written} ZIP codes, {len(errors)} failed")
+        for key, error in errors.items():
+            print(f"{key}: {error}")
+
+    elif args.command == "progress":
+        work_queue = open_queue(args.queue, args.max_attempts)
+        while True:
+            report = progress(work_queue)
+            print(format_progress(report))
+            if not args.watch or not report["units"]["pending"] and not report["units"]["leased"]:
+                break
+            time.sleep(args.watch)
+            print()
+
+if __name__ == "__main__":
+    main()